@@ -1,12 +1,18 @@
 import os
 import logging
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+import json
+from flask import Flask, render_template, request, jsonify, redirect, url_for, Response, stream_with_context
 from config import Config
 from modules import initialize_modules
 from modules.speech_processor import speech_processor
 from modules.query_processor import query_processor
 from modules.data_manager import data_manager
+from modules.rag_system import rag_system
+from modules.knowledge_base import knowledge_base_registry
+from modules.batch_processor import batch_processor
+from modules.ingest_pipeline import ingest_pipelines, start_ingest_pipelines
 from models.investment_model import investment_model
+from utils.http_client import host_registry
 from utils.helpers import save_conversation, format_error_response, sanitize_input, get_timestamp
 
 # Import blueprints
@@ -33,6 +39,20 @@ Config.setup_directories()
 with app.app_context():
     initialize_modules()
 
+# With the debug reloader, `python app.py` runs this module in a watcher
+# process and again in the serving child; only one may run background work
+run_background_work = (__name__ != '__main__' or not Config.DEBUG
+                       or os.environ.get('WERKZEUG_RUN_MAIN') == 'true')
+
+# Index new and changed scraped articles into the running knowledge bases
+if Config.INGEST_ENABLED and run_background_work:
+    start_ingest_pipelines()
+
+# Keep watchlist and popular symbols warm in the investment cache, opt-in
+# as it calls NSE in the background
+if os.getenv('NSE_PREFETCH_ENABLED', 'false').lower() == 'true' and run_background_work:
+    investment_model.prefetcher.start()
+
 @app.route('/')
 def index():
     """Render the main application page."""
@@ -98,9 +118,13 @@ def process_query():
         if not query:
             return jsonify(format_error_response("No query received")), 400
         
+        knowledge_base = request.json.get('knowledge_base')
+        if knowledge_base and not knowledge_base_registry.exists(knowledge_base):
+            return jsonify(format_error_response(f"Unknown knowledge base: {knowledge_base}")), 400
+        
         sanitized_query = sanitize_input(query)
         
-        response = query_processor.process_query(sanitized_query)
+        response = query_processor.process_query(sanitized_query, knowledge_base)
         
         audio_data = speech_processor.text_to_speech_data(response)
         
@@ -116,11 +140,69 @@ def process_query():
         logger.error(f"Error processing query: {str(e)}")
         return jsonify(format_error_response(str(e))), 500
 
+@app.route('/batch_query', methods=['POST'])
+def batch_query():
+    """
+    Process many queries at once and stream results back as JSON lines.
+    Accepts either a JSON body {"queries": [...], "knowledge_base": ...,
+    "include_audio": false} or a JSONL body with one query object per line.
+    """
+    try:
+        if request.is_json:
+            payload = request.get_json(silent=True)
+            if not isinstance(payload, dict) or not isinstance(payload.get('queries', []), list):
+                return jsonify(format_error_response("Body must be a JSON object with a 'queries' list")), 400
+            records = payload.get('queries', [])
+            knowledge_base = payload.get('knowledge_base')
+            include_audio = bool(payload.get('include_audio', False))
+            items = [item for item in map(batch_processor.normalize_item, records) if item]
+        else:
+            knowledge_base = request.args.get('knowledge_base')
+            include_audio = request.args.get('include_audio', 'false').lower() == 'true'
+            items = batch_processor.parse_jsonl(request.get_data(as_text=True).splitlines())
+        
+        if not items:
+            return jsonify(format_error_response("No queries received")), 400
+        
+        if len(items) > Config.BATCH_MAX_QUERIES:
+            return jsonify(format_error_response(f"Too many queries (max {Config.BATCH_MAX_QUERIES})")), 400
+        
+        for name in {knowledge_base} | {item['knowledge_base'] for item in items}:
+            if name and not knowledge_base_registry.exists(name):
+                return jsonify(format_error_response(f"Unknown knowledge base: {name}")), 400
+        
+        def generate():
+            for result in batch_processor.run(items, include_audio, knowledge_base):
+                yield json.dumps(result) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    except Exception as e:
+        logger.error(f"Error processing batch query: {str(e)}")
+        return jsonify(format_error_response(str(e))), 500
+
+@app.route('/knowledge_bases', methods=['GET'])
+def get_knowledge_bases():
+    """Get all registered knowledge bases and the ones currently loaded."""
+    return jsonify({
+        "success": True,
+        "knowledge_bases": knowledge_base_registry.list(),
+        "loaded": rag_system.get_loaded_indexes()
+    })
+
+@app.route('/ingest', methods=['GET'])
+def get_ingest_status():
+    """Get the progress of the scrape-to-index pipelines."""
+    return jsonify({
+        "success": True,
+        "pipelines": [pipeline.status() for pipeline in ingest_pipelines.values()]
+    })
+
 @app.route('/categories', methods=['GET'])
 def get_categories():
     """Get all available categories."""
     try:
-        categories = data_manager.get_categories()
+        categories = data_manager.get_categories(request.args.get('knowledge_base'))
         return jsonify({
             "success": True,
             "categories": categories
@@ -133,7 +215,7 @@ def get_categories():
 def get_questions(category):
     """Get questions for a specific category."""
     try:
-        questions = data_manager.get_questions_by_category(category)
+        questions = data_manager.get_questions_by_category(category, request.args.get('knowledge_base'))
         return jsonify({
             "success": True,
             "category": category,
@@ -151,6 +233,14 @@ def health_check():
         "timestamp": get_timestamp()
     })
 
+@app.route('/http_stats', methods=['GET'])
+def get_http_stats():
+    """Get rate limit, circuit breaker and timing metrics of outbound hosts."""
+    return jsonify({
+        "success": True,
+        "hosts": host_registry.stats()
+    })
+
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
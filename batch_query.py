@@ -0,0 +1,58 @@
+import sys
+import json
+import time
+import logging
+import argparse
+from modules.batch_processor import batch_processor
+
+# Set up logging (stderr only, stdout may carry the JSONL results)
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("batch_query.log"),
+        logging.StreamHandler(sys.stderr)
+    ]
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    """Main function to run a batch of queries from a JSONL file."""
+    parser = argparse.ArgumentParser(description='Batch query runner for offline evaluation and cache warm-up')
+    parser.add_argument('input', help='JSONL file with one {"query": ...} per line, or - for stdin. '
+                                      'Conversation logs can be passed directly.')
+    parser.add_argument('--output', '-o', default='-', help='Output JSONL file (default: stdout)')
+    parser.add_argument('--knowledge-base', '-k', default=None, help='Knowledge base for lines that do not name one')
+    parser.add_argument('--workers', '-w', type=int, default=None, help='Number of concurrent workers')
+    parser.add_argument('--audio', action='store_true', help='Also synthesize speech for each answer')
+
+    args = parser.parse_args()
+
+    input_file = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+    output_file = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+
+    try:
+        items = batch_processor.parse_jsonl(input_file)
+        logger.info(f"Running {len(items)} queries")
+
+        started = time.perf_counter()
+        results = []
+        for result in batch_processor.run(items, args.audio, args.knowledge_base, args.workers):
+            output_file.write(json.dumps(result) + '\n')
+            output_file.flush()
+            # Keep only what the summary needs, audio can be large
+            results.append({key: result.get(key) for key in ('success', 'latency_ms', 'usage', 'source')})
+        elapsed = time.perf_counter() - started
+
+        summary = batch_processor.summarize(results)
+        summary['elapsed_seconds'] = round(elapsed, 2)
+        summary['queries_per_second'] = round(len(results) / elapsed, 2) if elapsed > 0 else 0
+        print(json.dumps(summary, indent=2), file=sys.stderr)
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+Load generator for the investment subsystem.
+
+Drives a weighted mix of the /invest API calls from concurrent workers for a
+fixed duration and reports throughput and latency percentiles per call.
+Symbols are drawn with a popularity skew, so cache hit rates look like real
+traffic rather than a uniform sweep.
+
+Against a running app (started with NSE_API_BASE_URL pointing at
+benchmarks/nse_simulator.py):
+    python benchmarks/invest_load.py --target http://127.0.0.1:5000 --sim http://127.0.0.1:8780
+
+Without the web app, calling InvestmentModel directly in a scratch
+directory:
+    python benchmarks/invest_load.py --in-process --sim http://127.0.0.1:8780
+
+--sim also reads the simulator's request counts, to show how many NSE calls
+the run cost, and --sim-profile switches its profile before the run.
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+import threading
+from collections import defaultdict
+from urllib.parse import quote
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.nse_simulator import NIFTY_50
+
+OPERATIONS = ('quote', 'orderbook', 'info', 'company', 'history', 'indicators', 'quotes', 'search', 'movers')
+
+DEFAULT_MIX = 'quote=30,orderbook=10,info=5,company=10,history=15,indicators=5,quotes=10,search=10,movers=5'
+
+# Symbols per batch quote call
+BATCH_SIZE = 10
+
+class HttpDriver:
+    """Calls the /invest API of a running app."""
+    def __init__(self, target, timeout=30):
+        self.target = target.rstrip('/')
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _session(self):
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def call(self, operation, symbols, query):
+        """
+        Make one call.
+
+        Args:
+            operation (str): Operation name from the mix
+            symbols (list): Symbols for the call, one unless batching
+            query (str): Search text
+
+        Returns:
+            str: Outcome, 'ok' or the HTTP status code
+        """
+        symbol = quote(symbols[0], safe='')
+        paths = {
+            'quote': f"/invest/api/company/{symbol}/quote",
+            'orderbook': f"/invest/api/company/{symbol}/orderbook",
+            'info': f"/invest/api/company/{symbol}/info",
+            'company': f"/invest/api/company/{symbol}",
+            'history': f"/invest/api/company/{symbol}/history?period=1Y",
+            'indicators': f"/invest/api/company/{symbol}/indicators",
+            'quotes': f"/invest/api/quotes?symbols={quote(','.join(symbols))}",
+            'search': f"/invest/api/search?q={quote(query)}",
+            'movers': "/invest/api/market-movers?category=gainers"
+        }
+        response = self._session().get(self.target + paths[operation], timeout=self.timeout)
+        # Read streamed bodies to the end, as a browser would
+        response.content
+        return 'ok' if response.status_code < 400 else str(response.status_code)
+
+class ModelDriver:
+    """Calls InvestmentModel in this process."""
+    def __init__(self, model):
+        self.model = model
+
+    def call(self, operation, symbols, query):
+        """
+        Make one call.
+
+        Args:
+            operation (str): Operation name from the mix
+            symbols (list): Symbols for the call, one unless batching
+            query (str): Search text
+
+        Returns:
+            str: Outcome, 'ok' or 'empty' when the model returned no data
+        """
+        model, symbol = self.model, symbols[0]
+        if operation in ('quote', 'orderbook', 'info'):
+            result = model.get_company_section(symbol, operation)
+        elif operation == 'company':
+            result = model.get_company_data(symbol)
+        elif operation == 'history':
+            result = model.get_history_series(symbol, '1Y')
+        elif operation == 'indicators':
+            result = model.get_indicators(symbol)
+        elif operation == 'quotes':
+            result = [quote for quote in model.get_quotes(symbols) if quote.get('data')]
+        elif operation == 'search':
+            result = model.search_companies(query)
+        else:
+            result = model.get_market_movers('gainers')
+        return 'ok' if result else 'empty'
+
+def parse_mix(text):
+    """
+    Parse an operation mix like 'quote=3,search=1'.
+
+    Returns:
+        tuple: (operations, weights)
+    """
+    operations, weights = [], []
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {name}")
+        operations.append(name)
+        weights.append(float(weight or 1))
+    return operations, weights
+
+def load_symbols(sim, count):
+    """Get the symbol universe, from the simulator's symbol master if given."""
+    symbols = list(NIFTY_50)
+    if sim:
+        try:
+            response = requests.get(f"{sim}/content/equities/EQUITY_L.csv", timeout=10)
+            symbols = [line.split(',')[0] for line in response.text.splitlines()[1:] if line]
+        except requests.RequestException as e:
+            logging.warning(f"Could not load simulator symbols, using NIFTY 50: {e}")
+    return symbols[:count] if count else symbols
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of sorted values."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def run(driver, operations, weights, symbols, skew, concurrency, duration, seed=None):
+    """
+    Run workers until the duration is over.
+
+    Returns:
+        tuple: (latencies, outcomes), per-operation lists of seconds and
+            counts of each outcome
+    """
+    # Zipf-like popularity: the symbol of rank r is drawn ~ 1 / r^skew
+    symbol_weights = [1.0 / (rank + 1) ** skew for rank in range(len(symbols))]
+    latencies = defaultdict(list)
+    outcomes = defaultdict(lambda: defaultdict(int))
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(number):
+        rng = random.Random(None if seed is None else seed + number)
+        while time.monotonic() < deadline:
+            operation = rng.choices(operations, weights)[0]
+            picked = rng.choices(symbols, symbol_weights, k=BATCH_SIZE if operation == 'quotes' else 1)
+            query = picked[0][:rng.randint(2, 4)]
+            started = time.perf_counter()
+            try:
+                outcome = driver.call(operation, list(dict.fromkeys(picked)), query)
+            except Exception as e:
+                outcome = type(e).__name__
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies[operation].append(elapsed)
+                outcomes[operation][outcome] += 1
+
+    threads = [threading.Thread(target=worker, args=(number,), daemon=True) for number in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, outcomes
+
+def summarize(latencies, outcomes, duration):
+    """
+    Build the per-operation report.
+
+    Returns:
+        list: One dict per operation, plus a 'total' row
+    """
+    rows = []
+    everything = []
+    for operation in sorted(latencies):
+        values = sorted(latencies[operation])
+        everything.extend(values)
+        counts = dict(outcomes[operation])
+        rows.append({
+            'operation': operation,
+            'requests': len(values),
+            'rps': len(values) / duration,
+            'failed': sum(count for outcome, count in counts.items() if outcome != 'ok'),
+            'p50_ms': percentile(values, 0.50) * 1000,
+            'p95_ms': percentile(values, 0.95) * 1000,
+            'p99_ms': percentile(values, 0.99) * 1000,
+            'max_ms': values[-1] * 1000,
+            'outcomes': counts
+        })
+    everything.sort()
+    rows.append({
+        'operation': 'total',
+        'requests': len(everything),
+        'rps': len(everything) / duration,
+        'failed': sum(row['failed'] for row in rows),
+        'p50_ms': percentile(everything, 0.50) * 1000,
+        'p95_ms': percentile(everything, 0.95) * 1000,
+        'p99_ms': percentile(everything, 0.99) * 1000,
+        'max_ms': everything[-1] * 1000 if everything else 0.0,
+        'outcomes': {}
+    })
+    return rows
+
+def sim_stats(sim):
+    """Total requests the simulator has served, None without a simulator."""
+    if not sim:
+        return None
+    try:
+        return requests.get(f"{sim}/__stats", timeout=10).json()
+    except (requests.RequestException, ValueError):
+        return None
+
+def make_model_driver(sim):
+    """
+    Import InvestmentModel against the simulator, in a scratch directory so
+    its caches and history store start empty.
+    """
+    if sim:
+        os.environ['NSE_API_BASE_URL'] = f"{sim}/api"
+        os.environ['NSE_COOKIE_URL'] = f"{sim}/get-quotes/equity?symbol=RELIANCE"
+        os.environ['NSE_SYMBOL_MASTER_URL'] = f"{sim}/content/equities/EQUITY_L.csv"
+    workdir = tempfile.mkdtemp(prefix='invest_load_')
+    os.chdir(workdir)
+    logging.info(f"In-process model working in {workdir}")
+
+    from models.investment_model import investment_model
+    return ModelDriver(investment_model)
+
+def main():
+    """Run the load test."""
+    parser = argparse.ArgumentParser(description='Load test the investment API')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--target', help='Base URL of a running app, e.g. http://127.0.0.1:5000')
+    target.add_argument('--in-process', action='store_true', help='Call InvestmentModel directly')
+    parser.add_argument('--sim', help='Base URL of nse_simulator.py, e.g. http://127.0.0.1:8780')
+    parser.add_argument('--sim-profile', help='Simulator profile to switch to before the run')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run (default: 30)')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent workers (default: 16)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Weighted operations (default: {DEFAULT_MIX})")
+    parser.add_argument('--symbols', type=int, default=100, help='Symbols to draw from (default: 100)')
+    parser.add_argument('--skew', type=float, default=1.0, help='Popularity skew of symbols, 0 for uniform (default: 1)')
+    parser.add_argument('--seed', type=int, help='Seed for the request sequence')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    sim = args.sim.rstrip('/') if args.sim else None
+    operations, weights = parse_mix(args.mix)
+    symbols = load_symbols(sim, args.symbols)
+
+    if sim and args.sim_profile:
+        requests.post(f"{sim}/__profile", json={'name': args.sim_profile}, timeout=10)
+
+    driver = make_model_driver(sim) if args.in_process else HttpDriver(args.target)
+    # Model logging on every call would dominate the timings
+    logging.disable(logging.WARNING)
+
+    before = sim_stats(sim)
+    started = time.monotonic()
+    latencies, outcomes = run(driver, operations, weights, symbols, args.skew, args.concurrency,
+                              args.duration, args.seed)
+    elapsed = time.monotonic() - started
+    after = sim_stats(sim)
+    logging.disable(logging.NOTSET)
+
+    rows = summarize(latencies, outcomes, elapsed)
+    upstream = after['total'] - before['total'] if before and after else None
+
+    if args.json:
+        print(json.dumps({'duration': elapsed, 'concurrency': args.concurrency, 'upstream_requests': upstream,
+                          'simulator': after, 'results': rows}, indent=2))
+        return
+
+    print(f"{args.concurrency} workers for {elapsed:.1f}s over {len(symbols)} symbols")
+    print(f"{'operation':<12} {'requests':>9} {'rps':>8} {'failed':>7} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9}")
+    for row in rows:
+        print(f"{row['operation']:<12} {row['requests']:>9} {row['rps']:>8.1f} {row['failed']:>7} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['max_ms']:>9.1f}")
+    for row in rows[:-1]:
+        failures = {outcome: count for outcome, count in row['outcomes'].items() if outcome != 'ok'}
+        if failures:
+            print(f"  {row['operation']}: {failures}")
+    if upstream is not None:
+        total = rows[-1]['requests']
+        print(f"NSE requests: {upstream} ({upstream / total:.2f} per call)" if total else f"NSE requests: {upstream}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,540 @@
+"""
+Local stand-in for the NSE API, for load testing the investment subsystem.
+
+Serves the endpoints InvestmentModel calls with deterministic synthetic
+data, behind a configurable latency, error and throttling profile.
+
+Usage:
+    python benchmarks/nse_simulator.py [--port 8780] [--profile nse] [--record]
+
+Point the app (or benchmarks/invest_load.py --in-process) at it with:
+    NSE_API_BASE_URL=http://127.0.0.1:8780/api
+    NSE_COOKIE_URL=http://127.0.0.1:8780/get-quotes/equity?symbol=RELIANCE
+    NSE_SYMBOL_MASTER_URL=http://127.0.0.1:8780/content/equities/EQUITY_L.csv
+
+No recorded responses ship with the repo. With --record, requests without a
+fixture are fetched from the real NSE once and saved under --fixtures
+(benchmarks/fixtures/nse by default), and later runs replay them in place
+of the synthetic data. GET /__stats
+reports served requests and POST /__profile switches profiles mid-run.
+"""
+import os
+import sys
+import json
+import math
+import time
+import zlib
+import random
+import asyncio
+import logging
+import argparse
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from aiohttp import web
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.rate_limiter import RateLimiter
+
+logger = logging.getLogger('nse_simulator')
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'nse')
+
+UPSTREAM_URL = 'https://www.nseindia.com'
+
+# NIFTY 50 constituents, always part of the synthetic universe
+NIFTY_50 = (
+    'ADANIENT ADANIPORTS APOLLOHOSP ASIANPAINT AXISBANK BAJAJ-AUTO BAJFINANCE BAJAJFINSV BEL BHARTIARTL '
+    'BPCL BRITANNIA CIPLA COALINDIA DRREDDY EICHERMOT GRASIM HCLTECH HDFCBANK HDFCLIFE HEROMOTOCO '
+    'HINDALCO HINDUNILVR ICICIBANK INDUSINDBK INFY ITC JSWSTEEL KOTAKBANK LT M&M MARUTI NESTLEIND NTPC '
+    'ONGC POWERGRID RELIANCE SBILIFE SBIN SHRIRAMFIN SUNPHARMA TATACONSUM TATAMOTORS TATASTEEL TCS '
+    'TECHM TITAN TRENT ULTRACEMCO WIPRO'
+).split()
+
+INDUSTRIES = ('Banks', 'IT - Software', 'Refineries', 'Pharmaceuticals', 'Automobiles', 'Cement',
+              'Power', 'FMCG', 'Steel', 'Insurance')
+
+# Latency is log-normal around latency_ms; errors are 500/502/503 at
+# error_rate; rate_limit answers 429 with Retry-After above that many
+# requests per second; outages answer 503 for outage_seconds of every
+# outage_every seconds
+PROFILES = {
+    'fast': {'latency_ms': 0, 'latency_sigma': 0.0, 'error_rate': 0.0, 'rate_limit': None},
+    'nse': {'latency_ms': 120, 'latency_sigma': 0.5, 'error_rate': 0.005, 'rate_limit': 20, 'burst': 40},
+    'slow': {'latency_ms': 800, 'latency_sigma': 0.6, 'error_rate': 0.01, 'rate_limit': None},
+    'flaky': {'latency_ms': 150, 'latency_sigma': 0.8, 'error_rate': 0.05, 'rate_limit': None},
+    'throttled': {'latency_ms': 100, 'latency_sigma': 0.4, 'error_rate': 0.0, 'rate_limit': 5, 'burst': 5,
+                  'retry_after': 2},
+    'outage': {'latency_ms': 120, 'latency_sigma': 0.5, 'error_rate': 0.0, 'rate_limit': None,
+               'outage_every': 60, 'outage_seconds': 15}
+}
+
+def _seed(*parts):
+    """Stable seed from strings, independent of PYTHONHASHSEED."""
+    return zlib.crc32('|'.join(str(part) for part in parts).encode('utf-8'))
+
+class SyntheticMarket:
+    """
+    Deterministic market data: the same symbol and day always give the same
+    prices, and the live price moves every few seconds.
+    """
+    def __init__(self, symbols):
+        """
+        Initialize the market.
+
+        Args:
+            symbols (list): Symbols in the universe
+        """
+        self.symbols = list(dict.fromkeys(symbols))
+
+    def base_price(self, symbol):
+        return 50 + _seed(symbol) % 4000
+
+    def close(self, symbol, day):
+        """Closing price on a day, a seeded random walk from the base price."""
+        days = (day - date(2020, 1, 1)).days
+        rng = random.Random(_seed(symbol, 'walk'))
+        # Slow trend plus a daily wobble, cheap to evaluate for any day
+        drift = rng.uniform(-0.0004, 0.0008)
+        wave = 0.15 * math.sin(days / (20 + rng.random() * 40))
+        noise = random.Random(_seed(symbol, day.isoformat())).gauss(0, 0.012)
+        return round(self.base_price(symbol) * math.exp(drift * days + wave + noise), 2)
+
+    def history_row(self, symbol, day):
+        """One NSE security archive row."""
+        close = self.close(symbol, day)
+        previous = self.close(symbol, day - timedelta(days=1))
+        rng = random.Random(_seed(symbol, day.isoformat(), 'range'))
+        high = round(max(close, previous) * (1 + rng.uniform(0, 0.02)), 2)
+        low = round(min(close, previous) * (1 - rng.uniform(0, 0.02)), 2)
+        volume = int(1e5 + rng.random() * 5e6)
+        return {
+            'CH_SYMBOL': symbol,
+            'CH_SERIES': 'EQ',
+            'CH_TIMESTAMP': day.isoformat(),
+            'mTIMESTAMP': day.strftime('%d-%b-%Y'),
+            'CH_OPENING_PRICE': previous,
+            'CH_TRADE_HIGH_PRICE': high,
+            'CH_TRADE_LOW_PRICE': low,
+            'CH_CLOSING_PRICE': close,
+            'CH_LAST_TRADED_PRICE': close,
+            'CH_PREVIOUS_CLS_PRICE': previous,
+            'CH_TOT_TRADED_QTY': volume,
+            'CH_TOT_TRADED_VAL': round(volume * close, 2)
+        }
+
+    def history(self, symbol, start, end):
+        """Security archive rows for the weekdays in a range."""
+        rows = []
+        day = start
+        while day <= end:
+            if day.weekday() < 5:
+                rows.append(self.history_row(symbol, day))
+            day += timedelta(days=1)
+        return {'data': rows[::-1], 'meta': {'series': ['EQ'], 'symbols': [symbol]}}
+
+    def live_price(self, symbol, now=None):
+        """Price now, moving every 5 seconds around today's close."""
+        now = now or time.time()
+        today = date.today()
+        tick = int(now // 5)
+        move = random.Random(_seed(symbol, tick)).gauss(0, 0.002)
+        return round(self.close(symbol, today) * (1 + move), 2), self.close(symbol, today - timedelta(days=1))
+
+    def name(self, symbol):
+        return f"{symbol.title()} Limited"
+
+    def industry(self, symbol):
+        return INDUSTRIES[_seed(symbol, 'industry') % len(INDUSTRIES)]
+
+    def quote(self, symbol):
+        """quote-equity document."""
+        last_price, previous = self.live_price(symbol)
+        change = round(last_price - previous, 2)
+        closes = [self.close(symbol, date.today() - timedelta(days=offset)) for offset in range(0, 365, 7)]
+        industry = self.industry(symbol)
+        return {
+            'info': {'symbol': symbol, 'companyName': self.name(symbol), 'industry': industry,
+                     'isin': f"INE{_seed(symbol) % 1000000:06d}01", 'isFNOSec': True, 'activeSeries': ['EQ']},
+            'metadata': {'series': 'EQ', 'symbol': symbol, 'status': 'Listed', 'listingDate': '01-Jan-2000',
+                         'industry': industry, 'lastUpdateTime': datetime.now().strftime('%d-%b-%Y %H:%M:%S'),
+                         'pdSectorPe': 24.5, 'pdSymbolPe': 20 + _seed(symbol, 'pe') % 30,
+                         'pdSectorInd': 'NIFTY 50'},
+            'securityInfo': {'boardStatus': 'Main', 'tradingStatus': 'Active', 'tradingSegment': 'Normal Market',
+                             'faceValue': 10, 'issuedSize': 1000000000 + _seed(symbol, 'size') % 5000000000},
+            'industryInfo': {'macro': 'Industrials', 'sector': industry, 'industry': industry,
+                             'basicIndustry': industry},
+            'priceInfo': {
+                'lastPrice': last_price,
+                'change': change,
+                'pChange': round(change / previous * 100, 2),
+                'previousClose': previous,
+                'open': previous,
+                'close': 0,
+                'vwap': round((last_price + previous) / 2, 2),
+                'lowerCP': round(previous * 0.8, 2),
+                'upperCP': round(previous * 1.2, 2),
+                'intraDayHighLow': {'min': min(last_price, previous), 'max': max(last_price, previous),
+                                    'value': last_price},
+                'weekHighLow': {'min': min(closes), 'max': max(closes), 'value': last_price}
+            }
+        }
+
+    def trade_info(self, symbol):
+        """quote-equity trade_info document."""
+        last_price, _ = self.live_price(symbol)
+        rng = random.Random(_seed(symbol, int(time.time() // 5), 'book'))
+        bids = [{'price': round(last_price - 0.05 * (level + 1), 2), 'quantity': rng.randint(1, 5000)}
+                for level in range(5)]
+        asks = [{'price': round(last_price + 0.05 * (level + 1), 2), 'quantity': rng.randint(1, 5000)}
+                for level in range(5)]
+        volume = rng.randint(100000, 10000000)
+        return {
+            'marketDeptOrderBook': {
+                'totalBuyQuantity': sum(bid['quantity'] for bid in bids),
+                'totalSellQuantity': sum(ask['quantity'] for ask in asks),
+                'bid': bids,
+                'ask': asks,
+                'tradeInfo': {'totalTradedVolume': volume, 'totalTradedValue': round(volume * last_price / 1e7, 2),
+                              'totalMarketCap': round(last_price * 1e9 / 1e7, 2)}
+            },
+            'securityWiseDP': {'quantityTraded': volume, 'deliveryQuantity': volume // 2,
+                               'deliveryToTradedQuantity': 50.0}
+        }
+
+    def company_info(self, symbol):
+        """quote-equity company_info document."""
+        return {
+            'symbol': symbol,
+            'companyName': self.name(symbol),
+            'industry': self.industry(symbol),
+            'corporate': {'announcements': [], 'boardMeetings': [], 'corporateActions': []}
+        }
+
+    def _row(self, symbol):
+        last_price, previous = self.live_price(symbol)
+        change = round(last_price - previous, 2)
+        volume = random.Random(_seed(symbol, date.today().isoformat(), 'vol')).randint(100000, 10000000)
+        return last_price, previous, change, volume
+
+    def stock_indices(self, index_name):
+        """equity-stockIndices document of the synthetic index."""
+        data = [{'priority': 1, 'symbol': index_name, 'lastPrice': 24000.0, 'change': 0.0, 'pChange': 0.0}]
+        for symbol in self.symbols[:50]:
+            last_price, previous, change, volume = self._row(symbol)
+            data.append({
+                'priority': 0, 'symbol': symbol, 'lastPrice': last_price, 'change': change,
+                'pChange': round(change / previous * 100, 2), 'previousClose': previous,
+                'totalTradedVolume': volume, 'totalTradedValue': round(volume * last_price, 2),
+                'meta': {'companyName': self.name(symbol), 'industry': self.industry(symbol)}
+            })
+        return {'name': index_name, 'data': data, 'timestamp': datetime.now().strftime('%d-%b-%Y %H:%M:%S')}
+
+    def pre_open(self, key):
+        """market-data-pre-open document."""
+        data = []
+        for symbol in self.symbols[:50]:
+            last_price, previous, change, volume = self._row(symbol)
+            data.append({'metadata': {
+                'symbol': symbol, 'identifier': f"{symbol}EQN", 'lastPrice': last_price, 'change': change,
+                'pChange': round(change / previous * 100, 2), 'previousClose': previous, 'iep': last_price,
+                'finalQuantity': volume // 100, 'totalTurnover': round(volume // 100 * last_price, 2)
+            }})
+        advances = sum(1 for item in data if item['metadata']['change'] > 0)
+        return {'declines': len(data) - advances, 'advances': advances, 'unchanged': 0, 'data': data}
+
+    def search(self, query):
+        """search/autocomplete document."""
+        query = query.upper()
+        matches = [symbol for symbol in self.symbols if symbol.startswith(query)]
+        matches += [symbol for symbol in self.symbols if query in symbol and symbol not in matches]
+        return {'symbols': [{'symbol': symbol, 'symbol_info': self.name(symbol), 'result_type': 'symbol',
+                             'result_sub_type': 'equity', 'url': f"/get-quotes/equity?symbol={symbol}"}
+                            for symbol in matches[:10]]}
+
+    def equity_list(self):
+        """EQUITY_L.csv for the symbol master."""
+        lines = ['SYMBOL,NAME OF COMPANY, SERIES, DATE OF LISTING, PAID UP VALUE, MARKET LOT, ISIN NUMBER, FACE VALUE']
+        for symbol in self.symbols:
+            lines.append(f"{symbol},{self.name(symbol)},EQ,01-JAN-2000,10,1,INE{_seed(symbol) % 1000000:06d}01,10")
+        return '\n'.join(lines) + '\n'
+
+class FixtureStore:
+    """
+    Recorded responses on disk, one JSON file per endpoint and key.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, endpoint, key):
+        safe_key = ''.join(char if char.isalnum() or char in '-_' else '_' for char in key.upper())
+        return os.path.join(self.directory, endpoint, f"{safe_key}.json")
+
+    def get(self, endpoint, key):
+        """
+        Get a recorded response.
+
+        Returns:
+            dict or None: The response body, None if not recorded
+        """
+        try:
+            with open(self._path(endpoint, key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, endpoint, key, body):
+        """Record a response."""
+        path = self._path(endpoint, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(body, f)
+
+    def symbols(self):
+        """Symbols with a recorded quote."""
+        directory = os.path.join(self.directory, 'quote')
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-5] for name in os.listdir(directory) if name.endswith('.json'))
+
+class Recorder:
+    """Fetches missing fixtures from the real NSE with primed cookies."""
+    def __init__(self, upstream=UPSTREAM_URL):
+        self.upstream = upstream
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            'Accept-Language': 'en-US,en;q=0.9',
+        })
+        self.primed_at = 0
+
+    def fetch(self, path_qs):
+        """
+        Fetch an API path from NSE.
+
+        Returns:
+            dict or None: Parsed JSON, None if NSE did not answer 200
+        """
+        if time.time() - self.primed_at > 240:
+            self.session.get(f"{self.upstream}/get-quotes/equity?symbol=RELIANCE", timeout=15)
+            self.primed_at = time.time()
+        response = self.session.get(f"{self.upstream}{path_qs}", timeout=15)
+        if response.status_code != 200:
+            logger.error(f"Upstream returned {response.status_code} for {path_qs}")
+            return None
+        return response.json()
+
+class NseSimulator:
+    """The simulator application."""
+    def __init__(self, profile, fixtures, record=False, symbol_count=200, require_cookies=False, seed=None):
+        """
+        Initialize the simulator.
+
+        Args:
+            profile (dict): Latency, error and throttling settings
+            fixtures (FixtureStore): Recorded responses
+            record (bool): Record missing fixtures from the real NSE
+            symbol_count (int): Size of the synthetic universe
+            require_cookies (bool): Answer 401 to API calls without the
+                cookies set by the quote page, like NSE
+            seed (int, optional): Seed of injected latency and errors
+        """
+        self.fixtures = fixtures
+        self.recorder = Recorder() if record else None
+        self.require_cookies = require_cookies
+        self.random = random.Random(seed)
+        extra = [f"SYN{number:04d}" for number in range(max(0, symbol_count - len(NIFTY_50)))]
+        self.market = SyntheticMarket(fixtures.symbols() + NIFTY_50 + extra)
+        self.stats = Counter()
+        self.started = time.monotonic()
+        self.set_profile(profile)
+
+    def set_profile(self, profile):
+        """Switch the latency, error and throttling profile."""
+        self.profile = dict(profile)
+        rate = self.profile.get('rate_limit')
+        self.limiter = RateLimiter(rate, self.profile.get('burst', rate)) if rate else None
+        logger.info(f"Profile: {self.profile}")
+
+    async def inject(self, request):
+        """
+        Apply the profile to a request.
+
+        Returns:
+            web.Response or None: Error response to send instead, if any
+        """
+        profile = self.profile
+        if self.limiter is not None and not self.limiter.try_acquire():
+            return web.json_response({'message': 'Too many requests'}, status=429,
+                                     headers={'Retry-After': str(profile.get('retry_after', 1))})
+
+        every = profile.get('outage_every')
+        if every and (time.monotonic() - self.started) % every < profile.get('outage_seconds', 0):
+            return web.json_response({'message': 'Service unavailable'}, status=503)
+
+        latency = profile.get('latency_ms', 0) / 1000.0
+        if latency > 0:
+            sigma = profile.get('latency_sigma', 0.0)
+            await asyncio.sleep(latency * math.exp(self.random.gauss(0, sigma)) if sigma else latency)
+
+        if profile.get('error_rate') and self.random.random() < profile['error_rate']:
+            return web.json_response({'message': 'Internal error'}, status=self.random.choice((500, 502, 503)))
+        return None
+
+    async def respond(self, request, endpoint, key, synthesize, select=None):
+        """
+        Serve a fixture, recording or synthesizing it if missing.
+
+        Args:
+            request (web.Request): The request
+            endpoint (str): Fixture directory
+            key (str): Fixture name within it
+            synthesize (callable): Builds the body without a fixture
+            select (callable, optional): Narrows a fixture body to the request
+        """
+        if self.require_cookies and 'nsit' not in request.cookies:
+            self.stats[(endpoint, 401)] += 1
+            return web.json_response({'message': 'Unauthorized'}, status=401)
+
+        failure = await self.inject(request)
+        if failure is not None:
+            self.stats[(endpoint, failure.status)] += 1
+            return failure
+
+        body = self.fixtures.get(endpoint, key)
+        if body is None and self.recorder is not None:
+            body = await asyncio.get_running_loop().run_in_executor(None, self.recorder.fetch, request.path_qs)
+            if body is not None:
+                self.fixtures.put(endpoint, key, body)
+        if body is None:
+            body = synthesize()
+        elif select is not None:
+            body = select(body)
+        self.stats[(endpoint, 200)] += 1
+        return web.json_response(body)
+
+    async def quote_page(self, request):
+        """HTML quote page that sets the session cookies."""
+        response = web.Response(text='<html><body>NSE simulator</body></html>', content_type='text/html')
+        response.set_cookie('nsit', 'simulated', max_age=300)
+        response.set_cookie('nseappid', 'simulated', max_age=300)
+        self.stats[('cookies', 200)] += 1
+        return response
+
+    async def quote_equity(self, request):
+        symbol = request.query.get('symbol', '').upper()
+        section = request.query.get('section')
+        if section == 'trade_info':
+            return await self.respond(request, 'trade_info', symbol, lambda: self.market.trade_info(symbol))
+        if section == 'company_info':
+            return await self.respond(request, 'company_info', symbol, lambda: self.market.company_info(symbol))
+        return await self.respond(request, 'quote', symbol, lambda: self.market.quote(symbol))
+
+    async def historical(self, request):
+        symbol = request.query.get('symbol', '').upper()
+        try:
+            start = datetime.strptime(request.query.get('from', ''), '%d-%m-%Y').date()
+            end = datetime.strptime(request.query.get('to', ''), '%d-%m-%Y').date()
+        except ValueError:
+            return web.json_response({'message': 'Invalid dates'}, status=400)
+
+        def select(body):
+            # One recording per symbol serves any range within it
+            rows = [row for row in body.get('data', [])
+                    if start.isoformat() <= str(row.get('CH_TIMESTAMP', ''))[:10] <= end.isoformat()]
+            return dict(body, data=rows)
+
+        return await self.respond(request, 'history', symbol, lambda: self.market.history(symbol, start, end), select)
+
+    async def stock_indices(self, request):
+        index_name = request.query.get('index', 'NIFTY 50')
+        return await self.respond(request, 'indices', index_name, lambda: self.market.stock_indices(index_name))
+
+    async def pre_open(self, request):
+        key = request.query.get('key', 'NIFTY')
+        return await self.respond(request, 'pre_open', key, lambda: self.market.pre_open(key))
+
+    async def autocomplete(self, request):
+        query = request.query.get('q', '')
+        return await self.respond(request, 'search', query, lambda: self.market.search(query))
+
+    async def equity_list(self, request):
+        self.stats[('equity_list', 200)] += 1
+        return web.Response(text=self.market.equity_list(), content_type='text/csv')
+
+    async def get_stats(self, request):
+        """Requests served by endpoint and status."""
+        by_endpoint = {}
+        for (endpoint, status), count in sorted(self.stats.items()):
+            by_endpoint.setdefault(endpoint, {})[str(status)] = count
+        return web.json_response({'profile': self.profile, 'total': sum(self.stats.values()),
+                                  'endpoints': by_endpoint})
+
+    async def post_profile(self, request):
+        """Switch profile: {"name": "throttled"} and/or individual settings."""
+        payload = await request.json()
+        if payload.pop('reset_stats', False):
+            self.stats.clear()
+        profile = dict(PROFILES.get(payload.pop('name', None), self.profile))
+        profile.update(payload)
+        self.set_profile(profile)
+        return web.json_response({'profile': self.profile})
+
+    async def delete_stats(self, request):
+        self.stats.clear()
+        return web.json_response({'success': True})
+
+    def app(self):
+        """Build the aiohttp application."""
+        app = web.Application()
+        app.add_routes([
+            web.get('/get-quotes/equity', self.quote_page),
+            web.get('/api/quote-equity', self.quote_equity),
+            web.get('/api/historical/securityArchives', self.historical),
+            web.get('/api/equity-stockIndices', self.stock_indices),
+            web.get('/api/market-data-pre-open', self.pre_open),
+            web.get('/api/search/autocomplete', self.autocomplete),
+            web.get('/content/equities/EQUITY_L.csv', self.equity_list),
+            web.get('/__stats', self.get_stats),
+            web.delete('/__stats', self.delete_stats),
+            web.post('/__profile', self.post_profile)
+        ])
+        return app
+
+def main():
+    """Run the simulator."""
+    parser = argparse.ArgumentParser(description='Local NSE API simulator for load tests')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8780, help='Port (default: 8780)')
+    parser.add_argument('--profile', default='nse', choices=sorted(PROFILES), help='Latency/error profile (default: nse)')
+    parser.add_argument('--latency-ms', type=float, help='Median latency in milliseconds')
+    parser.add_argument('--latency-sigma', type=float, help='Log-normal spread of the latency')
+    parser.add_argument('--error-rate', type=float, help='Share of requests answered with 5xx')
+    parser.add_argument('--rate-limit', type=float, help='Requests per second before answering 429')
+    parser.add_argument('--burst', type=float, help='Burst allowed above the rate limit')
+    parser.add_argument('--retry-after', type=int, help='Retry-After seconds sent with 429')
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help='Directory of recorded responses')
+    parser.add_argument('--record', action='store_true', help='Fetch and save missing fixtures from nseindia.com')
+    parser.add_argument('--symbols', type=int, default=200, help='Size of the synthetic symbol universe (default: 200)')
+    parser.add_argument('--require-cookies', action='store_true', help='Answer 401 to API calls without cookies')
+    parser.add_argument('--seed', type=int, help='Seed for injected latency and errors')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    profile = dict(PROFILES[args.profile])
+    for option, key in (('latency_ms', 'latency_ms'), ('latency_sigma', 'latency_sigma'),
+                        ('error_rate', 'error_rate'), ('rate_limit', 'rate_limit'), ('burst', 'burst'),
+                        ('retry_after', 'retry_after')):
+        if getattr(args, option) is not None:
+            profile[key] = getattr(args, option)
+
+    simulator = NseSimulator(profile, FixtureStore(args.fixtures), record=args.record, symbol_count=args.symbols,
+                             require_cookies=args.require_cookies, seed=args.seed)
+    logger.info(f"NSE simulator on http://{args.host}:{args.port}/api with {len(simulator.market.symbols)} symbols")
+    web.run_app(simulator.app(), host=args.host, port=args.port, print=None, access_log=None)
+
+if __name__ == '__main__':
+    main()
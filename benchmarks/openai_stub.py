@@ -0,0 +1,365 @@
+"""
+Local OpenAI-compatible stand-in for benchmarking the query pipeline.
+
+Serves chat completions (plain and streamed), embeddings and audio
+transcriptions with deterministic output and configurable latency, so runs
+of the real app measure our own framework, retrieval, serialization and TTS
+overhead rather than OpenAI's.
+
+Usage:
+    python benchmarks/openai_stub.py [--port 8790] [--profile openai]
+
+Point the app at it with:
+    OPENAI_BASE_URL=http://127.0.0.1:8790/v1 OPENAI_API_KEY=stub python app.py
+
+Embeddings are feature-hashed bags of words, so the same text always gets
+the same vector and texts sharing words are similar: retrieval still finds
+relevant nodes, and indexes built against the stub are reusable between
+runs. Chat answers are built from the words of the prompt. GET /__stats
+reports served requests and POST /__profile switches profiles mid-run.
+"""
+import os
+import re
+import sys
+import io
+import json
+import math
+import time
+import uuid
+import wave
+import zlib
+import base64
+import random
+import asyncio
+import logging
+import argparse
+from collections import Counter
+
+import numpy as np
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.rate_limiter import RateLimiter
+
+logger = logging.getLogger('openai_stub')
+
+# Embedding sizes of the models clients may ask for
+EMBEDDING_DIMENSIONS = {
+    'text-embedding-ada-002': 1536,
+    'text-embedding-3-small': 1536,
+    'text-embedding-3-large': 3072
+}
+
+DEFAULT_TRANSCRIPTS = (
+    'How do I send money abroad?',
+    'What are the fees for a transfer?',
+    'How long does a transfer take?',
+    'How do I verify my account?'
+)
+
+# Latencies are log-normal around their median in milliseconds: chat pays
+# ttft_ms before the first token and tpot_ms per token after it, embeddings
+# embed_ms per request plus embed_item_ms per input, transcriptions
+# transcribe_ms plus transcribe_audio_ms per second of audio
+PROFILES = {
+    'instant': {'ttft_ms': 0, 'tpot_ms': 0, 'embed_ms': 0, 'embed_item_ms': 0, 'transcribe_ms': 0,
+                'transcribe_audio_ms': 0, 'sigma': 0.0, 'error_rate': 0.0, 'rate_limit': None},
+    'openai': {'ttft_ms': 450, 'tpot_ms': 15, 'embed_ms': 150, 'embed_item_ms': 1, 'transcribe_ms': 400,
+               'transcribe_audio_ms': 50, 'sigma': 0.4, 'error_rate': 0.0, 'rate_limit': None},
+    'slow': {'ttft_ms': 1500, 'tpot_ms': 40, 'embed_ms': 600, 'embed_item_ms': 5, 'transcribe_ms': 1500,
+             'transcribe_audio_ms': 150, 'sigma': 0.7, 'error_rate': 0.01, 'rate_limit': None},
+    'throttled': {'ttft_ms': 450, 'tpot_ms': 15, 'embed_ms': 150, 'embed_item_ms': 1, 'transcribe_ms': 400,
+                  'transcribe_audio_ms': 50, 'sigma': 0.4, 'error_rate': 0.0, 'rate_limit': 5, 'burst': 5,
+                  'retry_after': 1}
+}
+
+def hashed_embedding(text, dimensions):
+    """
+    Embed text as a normalized, signed feature-hashed bag of words.
+
+    Args:
+        text (str): Text to embed
+        dimensions (int): Vector length
+
+    Returns:
+        numpy.ndarray: float32 unit vector
+    """
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for word in re.findall(r'\w+', text.lower()):
+        hashed = zlib.crc32(word.encode('utf-8'))
+        vector[hashed % dimensions] += 1.0 if hashed & 0x80000000 else -1.0
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        vector[0] = 1.0
+        return vector
+    return vector / norm
+
+def count_tokens(text):
+    """Rough token count, about four characters per token."""
+    return max(1, len(text) // 4) if text else 0
+
+def error_response(status, message, error_type, headers=None):
+    """Error in the OpenAI API shape."""
+    return web.json_response({'error': {'message': message, 'type': error_type, 'param': None, 'code': None}},
+                             status=status, headers=headers)
+
+class OpenAIStub:
+    """The stub application."""
+    def __init__(self, profile, completion_tokens=60, transcripts=DEFAULT_TRANSCRIPTS, seed=None):
+        """
+        Initialize the stub.
+
+        Args:
+            profile (dict): Latency, error and throttling settings
+            completion_tokens (int): Tokens per chat answer unless the
+                request asks for fewer
+            transcripts (tuple): Texts returned by transcriptions, picked by
+                a hash of the audio
+            seed (int, optional): Seed of injected latency and errors
+        """
+        self.completion_tokens = completion_tokens
+        self.transcripts = transcripts
+        self.random = random.Random(seed)
+        self.stats = Counter()
+        self.set_profile(profile)
+
+    def set_profile(self, profile):
+        """Switch the latency, error and throttling profile."""
+        self.profile = dict(profile)
+        rate = self.profile.get('rate_limit')
+        self.limiter = RateLimiter(rate, self.profile.get('burst', rate)) if rate else None
+        logger.info(f"Profile: {self.profile}")
+
+    def delay(self, milliseconds):
+        """Seconds of a log-normal delay around a median."""
+        if milliseconds <= 0:
+            return 0.0
+        sigma = self.profile.get('sigma', 0.0)
+        return milliseconds / 1000.0 * (math.exp(self.random.gauss(0, sigma)) if sigma else 1.0)
+
+    def failure(self, endpoint):
+        """
+        Decide whether to fail a request.
+
+        Returns:
+            web.Response or None: Error response to send instead, if any
+        """
+        if self.limiter is not None and not self.limiter.try_acquire():
+            self.stats[(endpoint, 429)] += 1
+            return error_response(429, 'Rate limit reached', 'requests',
+                                  headers={'Retry-After': str(self.profile.get('retry_after', 1))})
+        if self.profile.get('error_rate') and self.random.random() < self.profile['error_rate']:
+            self.stats[(endpoint, 500)] += 1
+            return error_response(500, 'The server had an error while processing your request', 'server_error')
+        self.stats[(endpoint, 200)] += 1
+        return None
+
+    def answer_words(self, messages, max_tokens):
+        """Deterministic answer built from the words of the last user message."""
+        prompt = ''
+        for message in messages:
+            if message.get('role') == 'user':
+                content = message.get('content') or ''
+                if isinstance(content, list):
+                    content = ' '.join(part.get('text', '') for part in content if isinstance(part, dict))
+                prompt = content
+        words = re.findall(r'\w+', prompt) or ['stub']
+        count = min(self.completion_tokens, max_tokens or self.completion_tokens)
+        start = zlib.crc32(prompt.encode('utf-8')) % len(words)
+        return [words[(start + index) % len(words)] for index in range(count)], prompt
+
+    async def chat_completions(self, request):
+        """POST /v1/chat/completions"""
+        try:
+            payload = await request.json()
+        except ValueError:
+            return error_response(400, 'Invalid JSON body', 'invalid_request_error')
+        failure = self.failure('chat')
+        if failure is not None:
+            return failure
+
+        model = payload.get('model', 'gpt-3.5-turbo')
+        messages = payload.get('messages') or []
+        words, _ = self.answer_words(messages, payload.get('max_tokens') or payload.get('max_completion_tokens'))
+        prompt_tokens = sum(count_tokens(json.dumps(message.get('content'))) for message in messages)
+        usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': len(words),
+                 'total_tokens': prompt_tokens + len(words)}
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        if not payload.get('stream'):
+            await asyncio.sleep(self.delay(self.profile['ttft_ms'])
+                                + sum(self.delay(self.profile['tpot_ms']) for _ in words))
+            return web.json_response({
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': ' '.join(words)},
+                             'finish_reason': 'stop', 'logprobs': None}],
+                'usage': usage
+            })
+
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'})
+        await response.prepare(request)
+
+        async def send(delta, finish_reason=None, chunk_usage=None):
+            chunk = {'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                     'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason, 'logprobs': None}]
+                     if delta is not None else []}
+            if chunk_usage is not None:
+                chunk['usage'] = chunk_usage
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+
+        await asyncio.sleep(self.delay(self.profile['ttft_ms']))
+        await send({'role': 'assistant', 'content': ''})
+        for index, word in enumerate(words):
+            if index:
+                await asyncio.sleep(self.delay(self.profile['tpot_ms']))
+            await send({'content': word if index == 0 else f" {word}"})
+        await send({}, finish_reason='stop')
+        if (payload.get('stream_options') or {}).get('include_usage'):
+            await send(None, chunk_usage=usage)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def embeddings(self, request):
+        """POST /v1/embeddings"""
+        try:
+            payload = await request.json()
+        except ValueError:
+            return error_response(400, 'Invalid JSON body', 'invalid_request_error')
+        failure = self.failure('embeddings')
+        if failure is not None:
+            return failure
+
+        model = payload.get('model', 'text-embedding-ada-002')
+        inputs = payload.get('input', '')
+        # A single string, a list of strings or token id lists
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        texts = [text if isinstance(text, str) else ' '.join(str(token) for token in text) for text in inputs]
+        dimensions = payload.get('dimensions') or EMBEDDING_DIMENSIONS.get(model, 1536)
+
+        await asyncio.sleep(self.delay(self.profile['embed_ms'] + self.profile['embed_item_ms'] * len(texts)))
+
+        data = []
+        for index, text in enumerate(texts):
+            vector = hashed_embedding(text, dimensions)
+            if payload.get('encoding_format') == 'base64':
+                embedding = base64.b64encode(vector.astype('<f4').tobytes()).decode('ascii')
+            else:
+                embedding = vector.tolist()
+            data.append({'object': 'embedding', 'index': index, 'embedding': embedding})
+        tokens = sum(count_tokens(text) for text in texts)
+        return web.json_response({'object': 'list', 'data': data, 'model': model,
+                                  'usage': {'prompt_tokens': tokens, 'total_tokens': tokens}})
+
+    async def transcriptions(self, request):
+        """POST /v1/audio/transcriptions"""
+        fields, audio = {}, b''
+        reader = await request.multipart()
+        async for part in reader:
+            if part.name == 'file':
+                audio = await part.read()
+            else:
+                fields[part.name] = await part.text()
+        if not audio:
+            return error_response(400, 'No audio file given', 'invalid_request_error')
+        failure = self.failure('transcriptions')
+        if failure is not None:
+            return failure
+
+        try:
+            with wave.open(io.BytesIO(audio)) as wav:
+                duration = wav.getnframes() / float(wav.getframerate())
+        except (wave.Error, EOFError):
+            # Not a WAV file: assume 16 kHz 16-bit mono
+            duration = len(audio) / 32000.0
+
+        await asyncio.sleep(self.delay(self.profile['transcribe_ms'] + self.profile['transcribe_audio_ms'] * duration))
+
+        text = self.transcripts[zlib.crc32(audio) % len(self.transcripts)]
+        response_format = fields.get('response_format', 'json')
+        if response_format in ('text', 'srt', 'vtt'):
+            return web.Response(text=text, content_type='text/plain')
+        if response_format == 'verbose_json':
+            return web.json_response({'task': 'transcribe', 'language': 'english', 'duration': duration,
+                                      'text': text, 'segments': []})
+        return web.json_response({'text': text})
+
+    async def models(self, request):
+        """GET /v1/models"""
+        names = ['gpt-3.5-turbo', 'gpt-4o-mini', 'whisper-1'] + list(EMBEDDING_DIMENSIONS)
+        return web.json_response({'object': 'list', 'data': [{'id': name, 'object': 'model', 'created': 0,
+                                                              'owned_by': 'stub'} for name in names]})
+
+    async def get_stats(self, request):
+        """Requests served by endpoint and status."""
+        by_endpoint = {}
+        for (endpoint, status), count in sorted(self.stats.items()):
+            by_endpoint.setdefault(endpoint, {})[str(status)] = count
+        return web.json_response({'profile': self.profile, 'total': sum(self.stats.values()),
+                                  'endpoints': by_endpoint})
+
+    async def post_profile(self, request):
+        """Switch profile: {"name": "slow"} and/or individual settings."""
+        payload = await request.json()
+        if payload.pop('reset_stats', False):
+            self.stats.clear()
+        profile = dict(PROFILES.get(payload.pop('name', None), self.profile))
+        profile.update(payload)
+        self.set_profile(profile)
+        return web.json_response({'profile': self.profile})
+
+    def app(self):
+        """Build the aiohttp application."""
+        app = web.Application(client_max_size=25 * 1024 * 1024)
+        app.add_routes([
+            web.post('/v1/chat/completions', self.chat_completions),
+            web.post('/v1/embeddings', self.embeddings),
+            web.post('/v1/audio/transcriptions', self.transcriptions),
+            web.get('/v1/models', self.models),
+            web.get('/__stats', self.get_stats),
+            web.post('/__profile', self.post_profile)
+        ])
+        return app
+
+def main():
+    """Run the stub."""
+    parser = argparse.ArgumentParser(description='Local OpenAI-compatible stub for benchmarks')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8790, help='Port (default: 8790)')
+    parser.add_argument('--profile', default='openai', choices=sorted(PROFILES), help='Latency profile (default: openai)')
+    parser.add_argument('--ttft-ms', type=float, help='Median time to the first chat token')
+    parser.add_argument('--tpot-ms', type=float, help='Median time per further chat token')
+    parser.add_argument('--embed-ms', type=float, help='Median embedding request latency')
+    parser.add_argument('--transcribe-ms', type=float, help='Median transcription request latency')
+    parser.add_argument('--sigma', type=float, help='Log-normal spread of all latencies')
+    parser.add_argument('--error-rate', type=float, help='Share of requests answered with 500')
+    parser.add_argument('--rate-limit', type=float, help='Requests per second before answering 429')
+    parser.add_argument('--completion-tokens', type=int, default=60, help='Tokens per chat answer (default: 60)')
+    parser.add_argument('--transcripts', help='File of transcription texts, one per line')
+    parser.add_argument('--seed', type=int, help='Seed for injected latency and errors')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    profile = dict(PROFILES[args.profile])
+    for option in ('ttft_ms', 'tpot_ms', 'embed_ms', 'transcribe_ms', 'sigma', 'error_rate', 'rate_limit'):
+        if getattr(args, option) is not None:
+            profile[option] = getattr(args, option)
+
+    transcripts = DEFAULT_TRANSCRIPTS
+    if args.transcripts:
+        with open(args.transcripts, 'r', encoding='utf-8') as f:
+            transcripts = tuple(line.strip() for line in f if line.strip()) or DEFAULT_TRANSCRIPTS
+
+    stub = OpenAIStub(profile, completion_tokens=args.completion_tokens, transcripts=transcripts, seed=args.seed)
+    logger.info(f"OpenAI stub on http://{args.host}:{args.port}/v1")
+    web.run_app(stub.app(), host=args.host, port=args.port, print=None, access_log=None)
+
+if __name__ == '__main__':
+    main()
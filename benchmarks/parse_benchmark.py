@@ -0,0 +1,96 @@
+"""
+Parse-time benchmark for the scraper HTML layer.
+
+Times, for every fixture page and every available parser backend, how long
+it takes to parse the page, build the element index and run the
+GeneralFaqScraper strategy chain on it.
+
+Usage:
+    python benchmarks/parse_benchmark.py [--repeat 20] [--fixtures DIR] [--json]
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.html_index import HtmlIndex, parse_html, available_backends
+from s import GeneralFaqScraper
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def time_page(html, backend, repeat):
+    """
+    Time parsing, indexing and extraction of one page.
+
+    Args:
+        html (str): Page HTML
+        backend (str): Parser backend
+        repeat (int): Number of runs
+
+    Returns:
+        dict: Median milliseconds per stage and the number of FAQs found
+    """
+    timings = {'parse': [], 'index': [], 'extract': []}
+    faqs = 0
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        soup = parse_html(html, backend)
+        parsed = time.perf_counter()
+        HtmlIndex(soup)
+        indexed = time.perf_counter()
+
+        # extract_from_soup builds its own index, so reparse for a clean tree
+        soup = parse_html(html, backend)
+        scraper = GeneralFaqScraper('https://example.com/faq')
+        extract_started = time.perf_counter()
+        scraper.extract_from_soup(soup)
+        extracted = time.perf_counter()
+
+        timings['parse'].append(parsed - started)
+        timings['index'].append(indexed - parsed)
+        timings['extract'].append(extracted - extract_started)
+        faqs = len(scraper.results)
+
+    result = {stage: statistics.median(values) * 1000 for stage, values in timings.items()}
+    result['faqs'] = faqs
+    return result
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark HTML parsing for the scrapers')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per page and backend (default: 20)')
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help='Directory of saved HTML pages')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    # Keep scraper logging out of the timings
+    logging.disable(logging.CRITICAL)
+
+    results = []
+    for name in sorted(os.listdir(args.fixtures)):
+        if not name.endswith('.html'):
+            continue
+        with open(os.path.join(args.fixtures, name), 'r', encoding='utf-8') as f:
+            html = f.read()
+        for backend in available_backends():
+            result = time_page(html, backend, args.repeat)
+            result.update({'page': name, 'backend': backend, 'kb': len(html) / 1024})
+            results.append(result)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'page':<28} {'backend':<12} {'KB':>6} {'parse ms':>9} {'index ms':>9} {'extract ms':>11} {'faqs':>5}")
+    for result in results:
+        print(f"{result['page']:<28} {result['backend']:<12} {result['kb']:>6.0f} {result['parse']:>9.2f} "
+              f"{result['index']:>9.2f} {result['extract']:>11.2f} {result['faqs']:>5}")
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,9 @@ load_dotenv()
 class Config:
     # API Keys
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+    # OpenAI-compatible server to use instead of api.openai.com, such as
+    # benchmarks/openai_stub.py (e.g. http://127.0.0.1:8790/v1)
+    OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL')
     
     # Paths
     STORAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'storage')
@@ -20,6 +23,44 @@ class Config:
     # RAG settings
     FALLBACK_MODEL = 'gpt-3.5-turbo'
     
+    # Knowledge base settings
+    # Each knowledge base gets its own index under STORAGE_DIR/<name>/.
+    # Extra knowledge bases can be registered in a JSON file pointed to by
+    # KNOWLEDGE_BASES_FILE using the same shape as the entries below.
+    DEFAULT_KNOWLEDGE_BASE = os.getenv('DEFAULT_KNOWLEDGE_BASE', 'wise')
+    KNOWLEDGE_BASES = {
+        'wise': {
+            'csv_path': CSV_PATH,
+            'description': 'Wise money transfers',
+            # Added, updated and removed articles written by scrape.py
+            'change_feed': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scraper_changes.jsonl')
+        },
+        'sbi': {
+            'csv_path': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'faqs.csv'),
+            'description': 'State Bank of India online banking'
+        }
+    }
+    KNOWLEDGE_BASES_FILE = os.getenv('KNOWLEDGE_BASES_FILE')
+    MAX_LOADED_INDEXES = int(os.getenv('MAX_LOADED_INDEXES', 8))
+    INDEX_MEMORY_LIMIT_MB = int(os.getenv('INDEX_MEMORY_LIMIT_MB', 1024))
+    
+    # Batch query settings
+    BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', 8))
+    BATCH_MAX_RETRIES = int(os.getenv('BATCH_MAX_RETRIES', 3))
+    BATCH_REQUESTS_PER_MINUTE = int(os.getenv('BATCH_REQUESTS_PER_MINUTE', 500))
+    BATCH_MAX_QUERIES = int(os.getenv('BATCH_MAX_QUERIES', 10000))
+    
+    # Ingest pipeline settings
+    # Knowledge bases with a 'change_feed' are kept up to date from it
+    # while the app runs
+    INGEST_ENABLED = os.getenv('INGEST_ENABLED', 'true').lower() == 'true'
+    INGEST_QUEUE_SIZE = int(os.getenv('INGEST_QUEUE_SIZE', 256))
+    INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', 64))
+    INGEST_BATCH_WAIT = float(os.getenv('INGEST_BATCH_WAIT', 2))
+    INGEST_POLL_INTERVAL = float(os.getenv('INGEST_POLL_INTERVAL', 10))
+    INGEST_PERSIST_INTERVAL = float(os.getenv('INGEST_PERSIST_INTERVAL', 60))
+    INGEST_CHUNK_SIZE = int(os.getenv('INGEST_CHUNK_SIZE', 1024))
+    
     # Flask settings
     DEBUG = True
     PORT = 5000
@@ -30,4 +71,4 @@ class Config:
     def setup_directories():
         os.makedirs(Config.STORAGE_DIR, exist_ok=True)
         os.makedirs(Config.AUDIO_INPUT_DIR, exist_ok=True)
-        os.makedirs(Config.AUDIO_OUTPUT_DIR, exist_ok=True)
\ No newline at end of file
+        os.makedirs(Config.AUDIO_OUTPUT_DIR, exist_ok=True)
@@ -0,0 +1,137 @@
+from datetime import datetime
+
+# Columns of a history series, in response order
+SERIES_COLUMNS = ('date', 'open', 'high', 'low', 'close', 'volume')
+
+# Interval used when the client asks for 'auto'
+AUTO_INTERVALS = {
+    '1M': '1d',
+    '3M': '1d',
+    '6M': '1d',
+    '1Y': '1w',
+    'ALL': '1w'
+}
+
+def resample_ohlc(rows, interval):
+    """
+    Aggregate daily rows into weekly or monthly OHLC bars.
+
+    Args:
+        rows (list): Daily rows sorted by date
+        interval (str): '1d', '1w' or '1M'
+
+    Returns:
+        list: Aggregated rows dated by the first trading day of each bar
+    """
+    if interval == '1d':
+        return rows
+    if interval not in ('1w', '1M'):
+        raise ValueError(f"Invalid interval: {interval}")
+
+    bars = []
+    current_key = None
+    for row in rows:
+        day = datetime.strptime(row['date'], '%Y-%m-%d')
+        key = day.isocalendar()[:2] if interval == '1w' else (day.year, day.month)
+
+        if key != current_key:
+            current_key = key
+            bars.append(dict(row))
+            continue
+
+        bar = bars[-1]
+        if row['high'] is not None:
+            bar['high'] = row['high'] if bar['high'] is None else max(bar['high'], row['high'])
+        if row['low'] is not None:
+            bar['low'] = row['low'] if bar['low'] is None else min(bar['low'], row['low'])
+        if row['close'] is not None:
+            bar['close'] = row['close']
+        bar['volume'] = (bar['volume'] or 0) + (row['volume'] or 0)
+
+    return bars
+
+def lttb(rows, threshold, key='close'):
+    """
+    Downsample rows with Largest-Triangle-Three-Buckets, which keeps the
+    visual shape of a line chart with far fewer points.
+
+    Args:
+        rows (list): Rows sorted by date
+        threshold (int): Number of points to keep
+        key (str): Column the triangle areas are computed on
+
+    Returns:
+        list: Selected rows, always including the first and last
+    """
+    rows = [row for row in rows if row.get(key) is not None]
+    if threshold >= len(rows) or threshold < 3:
+        return rows
+
+    sampled = [rows[0]]
+    bucket_size = (len(rows) - 2) / (threshold - 2)
+    selected = 0
+
+    for i in range(threshold - 2):
+        # Average point of the next bucket
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, len(rows))
+        next_bucket = rows[next_start:next_end] or [rows[-1]]
+        avg_x = sum(range(next_start, next_start + len(next_bucket))) / len(next_bucket)
+        avg_y = sum(row[key] for row in next_bucket) / len(next_bucket)
+
+        # Pick the point of this bucket forming the largest triangle
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        point_x, point_y = selected, rows[selected][key]
+        best_area = -1
+        best_index = start
+        for j in range(start, end):
+            area = abs((point_x - avg_x) * (rows[j][key] - point_y) - (point_x - j) * (avg_y - point_y))
+            if area > best_area:
+                best_area = area
+                best_index = j
+
+        sampled.append(rows[best_index])
+        selected = best_index
+
+    sampled.append(rows[-1])
+    return sampled
+
+def to_columns(rows):
+    """
+    Convert rows into a compact column layout.
+
+    Args:
+        rows (list): Rows with SERIES_COLUMNS keys
+
+    Returns:
+        dict: Column name to list of values
+    """
+    return {column: [row.get(column) for row in rows] for column in SERIES_COLUMNS}
+
+def build_history_series(rows, period, interval='auto', max_points=None):
+    """
+    Build a chart-ready history series.
+
+    Args:
+        rows (list): Daily rows of the period, sorted by date
+        period (str): Chart period, used to choose the 'auto' interval
+        interval (str): '1d', '1w', '1M' or 'auto'
+        max_points (int, optional): Downsample with LTTB above this many points
+
+    Returns:
+        dict: Series metadata and columns
+    """
+    if interval == 'auto':
+        interval = AUTO_INTERVALS.get(period, '1d')
+
+    bars = resample_ohlc(rows, interval)
+    if max_points and len(bars) > max_points:
+        bars = lttb(bars, max_points)
+
+    return {
+        'period': period,
+        'interval': interval,
+        'points': len(bars),
+        'series': to_columns(bars)
+    }
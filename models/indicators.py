@@ -0,0 +1,256 @@
+import numpy as np
+import pandas as pd
+
+# Trading days in a year, used to annualize volatility and for 52-week stats
+TRADING_DAYS = 252
+
+# Summary fields of every symbol, in response order
+SUMMARY_FIELDS = (
+    'close', 'sma_20', 'sma_50', 'sma_200', 'ema_12', 'ema_26', 'rsi_14',
+    'volatility_20d', 'volatility_1y', 'drawdown', 'max_drawdown_1y',
+    'high_52w', 'low_52w', 'pct_from_high_52w', 'pct_from_low_52w', 'return_1y'
+)
+
+def to_wide(records):
+    """
+    Pivot (symbol, date, high, low, close) records into date by symbol frames.
+
+    Args:
+        records (list): Tuples of symbol, date, high, low and close
+
+    Returns:
+        tuple: (close, high, low) DataFrames indexed by YYYY-MM-DD date with
+            one column per symbol
+    """
+    frame = pd.DataFrame.from_records(records, columns=['symbol', 'date', 'high', 'low', 'close'])
+    # ISO dates sort correctly as strings, no need to parse them
+    wide = frame.pivot(index='date', columns='symbol').sort_index()
+    return wide['close'], wide['high'], wide['low']
+
+def rsi(close, period=14):
+    """
+    Relative Strength Index with Wilder's smoothing.
+
+    Args:
+        close (DataFrame or Series): Closing prices
+        period (int): Lookback in rows
+
+    Returns:
+        Same type as close: RSI between 0 and 100
+    """
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / period, min_periods=period, adjust=False).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / period, min_periods=period, adjust=False).mean()
+    # No losses in the window gives gain / loss = inf, i.e. 100; a flat
+    # window has neither and is neutral
+    return (100 - 100 / (1 + gain / loss)).mask((gain == 0) & (loss == 0), 50)
+
+def compute_series(close, high=None, low=None):
+    """
+    Compute every indicator as a time series. Each column is a symbol, so
+    hundreds of symbols are handled by the same vectorized operations.
+
+    Args:
+        close (DataFrame): Closing prices, date by symbol
+        high (DataFrame, optional): Daily highs, defaults to close
+        low (DataFrame, optional): Daily lows, defaults to close
+
+    Returns:
+        dict: Indicator name to DataFrame
+    """
+    high = close if high is None else high.fillna(close)
+    low = close if low is None else low.fillna(close)
+    returns = np.log(close / close.shift(1))
+    high_52w = high.rolling(TRADING_DAYS, min_periods=1).max()
+    low_52w = low.rolling(TRADING_DAYS, min_periods=1).min()
+    peak = close.cummax()
+
+    return {
+        'close': close,
+        'sma_20': close.rolling(20).mean(),
+        'sma_50': close.rolling(50).mean(),
+        'sma_200': close.rolling(200).mean(),
+        'ema_12': close.ewm(span=12, adjust=False).mean(),
+        'ema_26': close.ewm(span=26, adjust=False).mean(),
+        'rsi_14': rsi(close, 14),
+        'volatility_20d': returns.rolling(20).std() * np.sqrt(TRADING_DAYS),
+        'volatility_1y': returns.rolling(TRADING_DAYS, min_periods=20).std() * np.sqrt(TRADING_DAYS),
+        'drawdown': close / peak - 1,
+        'max_drawdown_1y': (close / close.rolling(TRADING_DAYS, min_periods=1).max() - 1)
+                           .rolling(TRADING_DAYS, min_periods=1).min(),
+        'high_52w': high_52w,
+        'low_52w': low_52w,
+        'pct_from_high_52w': close / high_52w - 1,
+        'pct_from_low_52w': close / low_52w - 1,
+        'return_1y': close / close.shift(TRADING_DAYS - 1).fillna(close.bfill().iloc[0]) - 1
+    }
+
+def _clean(value):
+    """Convert a NumPy value to a JSON-friendly float, NaN to None."""
+    if value is None or pd.isna(value):
+        return None
+    return round(float(value), 4)
+
+def _ewm_last(values, alpha):
+    """
+    Get the final exponential moving average of each column, matching
+    pandas ewm(adjust=False) on series that only have leading NaNs.
+
+    Args:
+        values (ndarray): 2D array, rows in date order
+        alpha (float): Smoothing factor
+
+    Returns:
+        ndarray: Last average of each column
+    """
+    average = np.full(values.shape[1], np.nan)
+    for row in values:
+        average = np.where(np.isnan(average), row, (1 - alpha) * average + alpha * row)
+    return average
+
+def _rsi_last(values, period=14):
+    """Get the final RSI of each column, like rsi() on the full series."""
+    delta = np.diff(values, axis=0)
+    gain = _ewm_last(np.where(np.isnan(delta), np.nan, np.clip(delta, 0, None)), 1 / period)
+    loss = _ewm_last(np.where(np.isnan(delta), np.nan, np.clip(-delta, 0, None)), 1 / period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = 100 - 100 / (1 + gain / loss)
+    result[(gain == 0) & (loss == 0)] = 50
+    # Same warm-up as min_periods in rsi()
+    result[(~np.isnan(delta)).sum(axis=0) < period] = np.nan
+    return result
+
+def _first_valid(values):
+    """Get the first non-NaN value of each column of a 2D array."""
+    index = np.argmax(~np.isnan(values), axis=0)
+    return values[index, np.arange(values.shape[1])]
+
+def summarize(close, high=None, low=None):
+    """
+    Get the latest value of every indicator for every symbol.
+
+    Only the last value is needed, so this works on the trailing windows
+    as 2D arrays instead of building full series.
+
+    Args:
+        close (DataFrame): Closing prices, date by symbol
+        high (DataFrame, optional): Daily highs
+        low (DataFrame, optional): Daily lows
+
+    Returns:
+        list: One dict per symbol with 'symbol', 'lastDate' and SUMMARY_FIELDS
+    """
+    if close.empty:
+        return []
+
+    # Row of each symbol's own last trading day
+    present = ~np.isnan(close.to_numpy(dtype=float))
+    last_rows = len(close) - 1 - np.argmax(present[::-1], axis=0)
+    has_data = present.any(axis=0)
+
+    close = close.ffill()
+    high = close if high is None else high.fillna(close)
+    low = close if low is None else low.fillna(close)
+
+    values = close.to_numpy(dtype=float)
+    year = values[-TRADING_DAYS:]
+    last = values[-1]
+    returns = np.diff(np.log(values), axis=0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        high_52w = np.nanmax(high.to_numpy(dtype=float)[-TRADING_DAYS:], axis=0)
+        low_52w = np.nanmin(low.to_numpy(dtype=float)[-TRADING_DAYS:], axis=0)
+        year_peak = np.fmax.accumulate(np.nan_to_num(year, nan=-np.inf), axis=0)
+
+        latest = {
+            'close': last,
+            'sma_20': values[-20:].mean(axis=0) if len(values) >= 20 else np.full_like(last, np.nan),
+            'sma_50': values[-50:].mean(axis=0) if len(values) >= 50 else np.full_like(last, np.nan),
+            'sma_200': values[-200:].mean(axis=0) if len(values) >= 200 else np.full_like(last, np.nan),
+            'ema_12': _ewm_last(values, 2 / (12 + 1)),
+            'ema_26': _ewm_last(values, 2 / (26 + 1)),
+            'rsi_14': _rsi_last(values, 14),
+            'volatility_20d': np.std(returns[-20:], axis=0, ddof=1) * np.sqrt(TRADING_DAYS)
+                              if len(returns) >= 20 else np.full_like(last, np.nan),
+            'volatility_1y': np.nanstd(returns[-TRADING_DAYS:], axis=0, ddof=1) * np.sqrt(TRADING_DAYS)
+                             if len(returns) >= 20 else np.full_like(last, np.nan),
+            'drawdown': last / np.nanmax(values, axis=0) - 1,
+            'max_drawdown_1y': np.nanmin(year / year_peak - 1, axis=0),
+            'high_52w': high_52w,
+            'low_52w': low_52w,
+            'pct_from_high_52w': last / high_52w - 1,
+            'pct_from_low_52w': last / low_52w - 1,
+            'return_1y': last / _first_valid(year) - 1
+        }
+
+    dates = close.index
+    summaries = []
+    for i, symbol in enumerate(close.columns):
+        if not has_data[i]:
+            continue
+        summary = {'symbol': symbol, 'lastDate': dates[last_rows[i]]}
+        summary.update({field: _clean(latest[field][i]) for field in SUMMARY_FIELDS})
+        summaries.append(summary)
+    return summaries
+
+def build_indicator_series(rows):
+    """
+    Build chart-ready indicator columns for one symbol.
+
+    Args:
+        rows (list): Daily rows sorted by date, as stored in PriceHistoryStore
+
+    Returns:
+        dict: 'summary' of the latest values and 'series' of columns
+    """
+    if not rows:
+        return {'summary': None, 'series': {}}
+
+    frame = pd.DataFrame(rows).set_index('date').sort_index()
+    close, high, low = frame[['close']], frame[['high']], frame[['low']]
+    high.columns = low.columns = close.columns
+
+    series = compute_series(close.ffill(), high, low)
+    columns = {'date': list(frame.index)}
+    for name in ('close', 'sma_20', 'sma_50', 'sma_200', 'ema_12', 'ema_26', 'rsi_14', 'drawdown'):
+        columns[name] = [_clean(value) for value in series[name].iloc[:, 0].to_numpy()]
+
+    summary = summarize(close, high, low)[0]
+    summary.pop('symbol')
+    return {'summary': summary, 'series': columns}
+
+def screen(summaries, filters=None, sort=None, descending=True, limit=None):
+    """
+    Filter and rank indicator summaries.
+
+    Args:
+        summaries (list): Output of summarize
+        filters (dict, optional): Field to (minimum, maximum), either may
+            be None
+        sort (str, optional): Field to rank by
+        descending (bool): Rank highest first
+        limit (int, optional): Maximum results
+
+    Returns:
+        list: Matching summaries
+    """
+    results = []
+    for summary in summaries:
+        matched = True
+        for field, (minimum, maximum) in (filters or {}).items():
+            value = summary.get(field)
+            if value is None or (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+                matched = False
+                break
+        if matched:
+            results.append(summary)
+
+    if sort:
+        if sort not in SUMMARY_FIELDS:
+            raise ValueError(f"Invalid sort field: {sort}")
+        # Symbols without the value go last either way
+        present = [summary for summary in results if summary.get(sort) is not None]
+        missing = [summary for summary in results if summary.get(sort) is None]
+        results = sorted(present, key=lambda summary: summary[sort], reverse=descending) + missing
+
+    return results[:limit] if limit else results
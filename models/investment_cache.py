@@ -0,0 +1,412 @@
+import os
+import sys
+import gzip
+import json
+import time
+import argparse
+import tempfile
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class _Flight:
+    """An in-progress load that concurrent callers for the same key wait on."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+class TieredCache:
+    """
+    Two-tier cache for investment data: an in-process LRU above gzipped
+    compact JSON files on disk.
+
+    Loads are coalesced so that concurrent misses for the same key run the
+    loader once and share its result. Entries past their TTL but within
+    their stale window are served immediately while a background refresh
+    replaces them.
+
+    Disk files are written to a temporary file and renamed into place, so
+    other processes sharing the directory never read a partial file. The
+    disk tier is capped in size and pruned least recently used first.
+    """
+    def __init__(self, cache_dir, max_entries=512, refresh_workers=4, max_disk_bytes=None):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir (str): Directory for the disk tier
+            max_entries (int): Maximum entries kept in memory
+            refresh_workers (int): Threads for stale-while-revalidate refreshes
+            max_disk_bytes (int, optional): Size cap of the disk tier
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        if max_disk_bytes is None:
+            max_disk_bytes = int(float(os.getenv('INVESTMENT_CACHE_MAX_MB', 256)) * 1024 * 1024)
+        self.max_disk_bytes = max_disk_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.flights = {}
+        self.refreshing = set()
+        self.refresh_executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix='cache-refresh')
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stale_hits': 0, 'coalesced': 0, 'pruned': 0}
+
+        # Estimated size of the disk tier, corrected on every prune
+        self.disk_bytes = self.disk_usage()['bytes']
+        self.prune_lock = threading.Lock()
+
+    def get(self, key, loader, ttl, stale_ttl=0, persist=True):
+        """
+        Get a value, loading it if it is missing or expired.
+
+        Args:
+            key (str): Cache key
+            loader (callable): Returns the fresh value, or None on failure
+            ttl (float): Seconds a value stays fresh
+            stale_ttl (float): Extra seconds an expired value may be served
+                while it is refreshed in the background
+            persist (bool): Whether to keep the value in the disk tier
+
+        Returns:
+            The cached or freshly loaded value, or None
+        """
+        entry = self.get_entry(key, persist)
+        if entry is not None:
+            age = time.time() - entry['cached_at']
+            if age <= ttl:
+                return entry['data']
+            if age <= ttl + stale_ttl:
+                self.stats['stale_hits'] += 1
+                self._refresh_async(key, loader, persist)
+                return entry['data']
+
+        self.stats['misses'] += 1
+        data = self._load(key, loader, persist)
+
+        # Serve an expired value rather than nothing if the refresh failed
+        if data is None and entry is not None:
+            logger.warning(f"Refresh failed for {key}, serving expired data")
+            return entry['data']
+        return data
+
+    def get_entry(self, key, persist=True):
+        """
+        Look up an entry in memory, then on disk.
+
+        Args:
+            key (str): Cache key
+            persist (bool): Whether to look in the disk tier
+
+        Returns:
+            dict or None: Entry with 'data' and 'cached_at'
+        """
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return entry
+
+        entry = self._read_disk(key) if persist else None
+        if entry is not None:
+            self.stats['disk_hits'] += 1
+            self._remember(key, entry)
+        return entry
+
+    def peek(self, key, persist=True):
+        """
+        Look up an entry without counting a hit or changing LRU order.
+
+        Args:
+            key (str): Cache key
+            persist (bool): Whether to look in the disk tier
+
+        Returns:
+            dict or None: Entry with 'data' and 'cached_at'
+        """
+        with self.lock:
+            entry = self.memory.get(key)
+        if entry is None and persist:
+            entry = self._read_disk(key)
+        return entry
+
+    def refresh(self, key, loader, persist=True):
+        """
+        Load a value now regardless of its age, coalescing with other loads.
+
+        Args:
+            key (str): Cache key
+            loader (callable): Returns the fresh value, or None on failure
+            persist (bool): Whether to keep the value in the disk tier
+
+        Returns:
+            The loaded value, or None
+        """
+        return self._load(key, loader, persist)
+
+    def set(self, key, data, persist=True):
+        """
+        Store a value in both tiers.
+
+        Args:
+            key (str): Cache key
+            data: JSON-serializable value
+            persist (bool): Whether to write the disk tier too
+        """
+        entry = {'data': data, 'cached_at': time.time()}
+        self._remember(key, entry)
+        if persist:
+            self._write_disk(key, entry)
+
+    def invalidate(self, key):
+        """
+        Remove a value from both tiers.
+
+        Args:
+            key (str): Cache key
+        """
+        with self.lock:
+            self.memory.pop(key, None)
+        for path in (self._path(key), self._legacy_path(key)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _load(self, key, loader, persist=True):
+        """Run the loader once for all concurrent callers of a key."""
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = _Flight()
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            flight.done.wait()
+            return flight.result
+
+        try:
+            flight.result = loader()
+            if flight.result is not None:
+                self.set(key, flight.result, persist)
+        except Exception as e:
+            logger.error(f"Error loading {key}: {e}")
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.done.set()
+
+        return flight.result
+
+    def _refresh_async(self, key, loader, persist=True):
+        """Refresh a stale key in the background, once at a time."""
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+
+        def refresh():
+            try:
+                self._load(key, loader, persist)
+            finally:
+                with self.lock:
+                    self.refreshing.discard(key)
+
+        self.refresh_executor.submit(refresh)
+
+    def _remember(self, key, entry):
+        """Put an entry in the memory tier, evicting the least recently used."""
+        with self.lock:
+            self.memory[key] = entry
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.max_entries:
+                self.memory.popitem(last=False)
+
+    def _path(self, key):
+        """Get the disk tier path of a key."""
+        return os.path.join(self.cache_dir, f"{key.lower()}.json.gz")
+
+    def _legacy_path(self, key):
+        """Get the path of a key in the old pretty-printed format."""
+        return os.path.join(self.cache_dir, f"{key.lower()}.json")
+
+    def _read_disk(self, key):
+        """Read an entry from the disk tier."""
+        cache_file = self._path(key)
+        try:
+            with gzip.open(cache_file, 'rt', encoding='utf-8') as f:
+                cached = json.load(f)
+        except FileNotFoundError:
+            return self._read_legacy(key)
+        except Exception as e:
+            logger.error(f"Error reading cache for {key}: {e}")
+            return None
+
+        # Mark the file as recently used for pruning
+        try:
+            os.utime(cache_file)
+        except OSError:
+            pass
+        return {'data': cached.get('data'), 'cached_at': cached.get('cached_at', 0)}
+
+    def _read_legacy(self, key):
+        """Read an entry written before the disk tier was compressed."""
+        cache_file = self._legacy_path(key)
+        if not os.path.exists(cache_file):
+            return None
+
+        try:
+            with open(cache_file, 'r') as f:
+                cached = json.load(f)
+            return {'data': cached.get('data'), 'cached_at': cached.get('cached_at', 0)}
+        except Exception as e:
+            logger.error(f"Error reading cache for {key}: {e}")
+            return None
+
+    def _write_disk(self, key, entry):
+        """Write an entry to the disk tier atomically."""
+        cache_file = self._path(key)
+        try:
+            payload = gzip.compress(json.dumps(entry, separators=(',', ':')).encode('utf-8'), compresslevel=6)
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp-', suffix='.gz')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(payload)
+                # Overwriting a key only grows the tier by the difference
+                replaced_bytes = self._file_size(cache_file)
+                os.replace(tmp_path, cache_file)
+            except Exception:
+                os.remove(tmp_path)
+                raise
+
+            # The compressed copy supersedes any old-format file
+            legacy_path = self._legacy_path(key)
+            legacy_bytes = self._file_size(legacy_path)
+            try:
+                os.remove(legacy_path)
+            except OSError:
+                legacy_bytes = 0
+        except Exception as e:
+            logger.error(f"Error caching data for {key}: {e}")
+            return
+
+        with self.lock:
+            self.disk_bytes += len(payload) - replaced_bytes - legacy_bytes
+            over_cap = self.max_disk_bytes and self.disk_bytes > self.max_disk_bytes
+        if over_cap:
+            self.prune()
+
+    def _file_size(self, path):
+        """Get the size of a file, 0 if it does not exist."""
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _disk_files(self):
+        """List (path, size, mtime) of every disk tier file."""
+        files = []
+        try:
+            with os.scandir(self.cache_dir) as entries:
+                for item in entries:
+                    if not item.is_file() or not item.name.endswith(('.json.gz', '.json', '.gz')):
+                        continue
+                    try:
+                        stat = item.stat()
+                    except OSError:
+                        # Removed by another process
+                        continue
+                    # Temporary files may still be written by another process
+                    if item.name.startswith('.tmp-') and time.time() - stat.st_mtime < 60:
+                        continue
+                    files.append((item.path, stat.st_size, stat.st_mtime))
+        except OSError as e:
+            logger.error(f"Error listing cache directory {self.cache_dir}: {e}")
+        return files
+
+    def disk_usage(self):
+        """
+        Get the size of the disk tier.
+
+        Returns:
+            dict: Number of files, total bytes and oldest/newest use times
+        """
+        files = self._disk_files()
+        return {
+            'files': len(files),
+            'bytes': sum(size for _, size, _ in files),
+            'legacy_files': sum(1 for path, _, _ in files if path.endswith('.json')),
+            'oldest_used': min((mtime for _, _, mtime in files), default=None),
+            'newest_used': max((mtime for _, _, mtime in files), default=None)
+        }
+
+    def prune(self, target_ratio=0.9):
+        """
+        Remove the least recently used disk files until the disk tier is
+        below a share of its cap.
+
+        Args:
+            target_ratio (float): Share of the cap to prune down to
+
+        Returns:
+            int: Number of files removed
+        """
+        if not self.prune_lock.acquire(blocking=False):
+            return 0
+        try:
+            files = sorted(self._disk_files(), key=lambda item: item[2])
+            total = sum(size for _, size, _ in files)
+            target = self.max_disk_bytes * target_ratio
+            removed = 0
+
+            for path, size, _ in files:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.error(f"Error pruning cache file {path}: {e}")
+                    continue
+                total -= size
+
+            with self.lock:
+                self.disk_bytes = total
+            self.stats['pruned'] += removed
+            if removed:
+                logger.info(f"Pruned {removed} files from {self.cache_dir}, {total} bytes remain")
+            return removed
+        finally:
+            self.prune_lock.release()
+
+def main():
+    """Inspect or prune an investment cache directory."""
+    parser = argparse.ArgumentParser(description='Investment disk cache tools')
+    parser.add_argument('command', choices=['stats', 'prune'], help='Show disk usage or prune to the size cap')
+    parser.add_argument('--dir', default='./cache/investments', help='Cache directory')
+    parser.add_argument('--max-mb', type=float, help='Size cap in MB (default: INVESTMENT_CACHE_MAX_MB or 256)')
+    args = parser.parse_args()
+
+    max_disk_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None
+    cache = TieredCache(args.dir, refresh_workers=1, max_disk_bytes=max_disk_bytes)
+
+    if args.command == 'prune':
+        removed = cache.prune()
+        print(f"Removed {removed} files", file=sys.stderr)
+
+    usage = cache.disk_usage()
+    usage['max_bytes'] = cache.max_disk_bytes
+    print(json.dumps(usage, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,20 @@
 import os
-import json
+import time
 import requests
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed
 import logging
 from dotenv import load_dotenv
+from models.nse_session import NSESessionManager
+from models.investment_cache import TieredCache
+from models.price_history import PriceHistoryStore, PERIOD_DAYS
+from models.chart_data import build_history_series
+from models.indicators import build_indicator_series, summarize, to_wide, screen
+from models.prefetcher import WatchlistPrefetcher
+from models.symbol_master import SymbolMaster
+from models.market_movers import MarketMoversService
+from models.quote_stream import QuoteStreamHub
+from utils.http_client import CircuitOpenError, RateLimitedError
 
 # Configure logging
 logging.basicConfig(
@@ -19,16 +30,36 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Days of stored history read for indicators, enough for a 200-day average
+INDICATOR_LOOKBACK_DAYS = 400
+
+# Bounds and step of the chart points a client may ask for, which keep the
+# number of memoized series per symbol small
+MIN_CHART_POINTS = 50
+MAX_CHART_POINTS = 2000
+CHART_POINTS_STEP = 50
+
 class InvestmentModel:
     """Model for handling investment data and NSE API interactions"""
     
     def __init__(self):
         """Initialize the Investment Model"""
         self.cache_dir = './cache/investments'
-        self.cache_expiry = 60 * 60  # 1 hour in seconds
         
-        # Create cache directory if it doesn't exist
-        os.makedirs(self.cache_dir, exist_ok=True)
+        # Per-section freshness in seconds, and how much longer expired data
+        # may still be served while it is refreshed in the background
+        self.section_ttls = {
+            'quote': (int(os.getenv('NSE_QUOTE_TTL', 15)), 5 * 60),
+            'tradeInfo': (int(os.getenv('NSE_TRADE_INFO_TTL', 15)), 5 * 60),
+            'companyInfo': (int(os.getenv('NSE_COMPANY_INFO_TTL', 3 * 24 * 60 * 60)), 30 * 24 * 60 * 60),
+            'historicalData': (int(os.getenv('NSE_HISTORY_TTL', 24 * 60 * 60)), 7 * 24 * 60 * 60)
+        }
+        
+        # In-process LRU above the disk cache
+        self.cache = TieredCache(self.cache_dir, max_entries=int(os.getenv('INVESTMENT_CACHE_ENTRIES', 1024)))
+        
+        # Daily OHLCV history, refreshed incrementally
+        self.price_history = PriceHistoryStore()
         
         # NSE API configuration
         self.api_base_url = os.getenv('NSE_API_BASE_URL', 'https://www.nseindia.com/api')
@@ -38,155 +69,409 @@ class InvestmentModel:
             'Accept-Encoding': 'gzip, deflate, br',
             'Connection': 'keep-alive',
         }
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
+        self.request_timeout = float(os.getenv('NSE_REQUEST_TIMEOUT', 10))
+        self.max_workers = int(os.getenv('NSE_MAX_WORKERS', 8))
+        
+        # Shared session that keeps NSE cookies fresh, with a connection pool
+        # sized for the worker pool
+        self.nse = NSESessionManager(self.headers, pool_size=self.max_workers, timeout=self.request_timeout)
+        self.session = self.nse.session
+        
+        # Shared pool for concurrent NSE section requests
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='nse')
+        
+        # Local symbol list for autocomplete
+        self.symbol_master = SymbolMaster(self.nse)
+        
+        # Shared market movers snapshot
+        self.market_movers = MarketMoversService(self)
+        
+        # Live quote fan-out for streaming clients
+        self.quote_stream = QuoteStreamHub(self)
+        
+        # Keeps watchlist and popular symbols warm, started by the app
+        self.prefetcher = WatchlistPrefetcher(self)
     
-    def get_company_data(self, symbol):
+    def get_company_data(self, symbol, include_history=True):
         """
         Get company data either from cache or NSE API
         
+        Each section (quote, trade info, company info, history) is cached
+        with its own TTL and fetched concurrently when missing. The quote is
+        required, the other sections are optional and are left out (and
+        listed under 'missingSections') if they cannot be fetched.
+        
         Args:
             symbol (str): The company symbol to search for
+            include_history (bool): Whether to include the full year of
+                'historicalData'; charts can use get_history_series instead
             
         Returns:
             dict: Company data
         """
-        # Check if data exists in cache and is not expired
-        cached_data = self._get_from_cache(symbol)
-        if cached_data:
-            logger.info(f"Returning cached data for {symbol}")
-            return cached_data
+        self.prefetcher.record(symbol)
+        names = [name for name in self.section_ttls if include_history or name != 'historicalData']
+        sections = self.get_sections(symbol, names)
         
-        # If not in cache or expired, fetch from API
-        logger.info(f"Fetching fresh data for {symbol}")
-        company_data = self._fetch_from_api(symbol)
+        quote_data = sections['quote']
+        if not quote_data:
+            logger.error(f"Failed to get quote data for {symbol}")
+            return None
+        
+        # Copy so the cached quote is not modified
+        company_data = dict(quote_data)
+        missing = []
+        for section in names:
+            if section == 'quote':
+                continue
+            if sections[section] is None:
+                missing.append(section)
+            else:
+                company_data[section] = sections[section]
         
-        # Save to cache if data was fetched successfully
-        if company_data:
-            self._save_to_cache(symbol, company_data)
+        if missing:
+            company_data['missingSections'] = missing
         
         return company_data
     
-    def _get_from_cache(self, symbol):
+    def get_company_section(self, symbol, section):
         """
-        Get data from cache if available and not expired
+        Get one independently cached part of the company payload
         
         Args:
             symbol (str): Company symbol
+            section (str): 'quote' (live price fields only), 'info' (company
+                details) or 'orderbook' (market depth)
             
         Returns:
-            dict or None: Cached data if valid, None otherwise
+            dict or None: Section data
         """
-        cache_file = os.path.join(self.cache_dir, f"{symbol.lower()}.json")
+        if section == 'quote':
+            return self._quote_fields(self.get_section(symbol, 'quote'))
         
-        if not os.path.exists(cache_file):
+        if section == 'info':
+            # Loaded once per company page view
+            self.prefetcher.record(symbol)
+            sections = self.get_sections(symbol, ['quote', 'companyInfo'])
+            quote = sections['quote']
+            if not quote:
+                return None
+            info = {field: quote.get(field, {}) for field in ('info', 'metadata', 'securityInfo', 'industryInfo')}
+            info['companyInfo'] = sections['companyInfo']
+            return info
+        
+        if section == 'orderbook':
+            return self.get_section(symbol, 'tradeInfo')
+        
+        raise ValueError(f"Invalid section: {section}")
+    
+    def _quote_fields(self, quote):
+        """Pick the live price fields of a quote."""
+        if not quote:
             return None
+        return {
+            'priceInfo': quote.get('priceInfo', {}),
+            'lastUpdateTime': quote.get('metadata', {}).get('lastUpdateTime')
+        }
+    
+    def get_quotes(self, symbols):
+        """
+        Get the quotes of several symbols, yielding each as soon as it is known
         
-        try:
-            with open(cache_file, 'r') as f:
-                cached = json.load(f)
-            
-            # Check if cache is expired
-            timestamp = cached.get('cached_at', 0)
-            current_time = datetime.now().timestamp()
+        Cached quotes (including stale ones being refreshed) are yielded
+        first without waiting. Missing quotes are fetched concurrently; the
+        NSE host limit fails requests that would wait longer than
+        NSE_MAX_WAIT instead of holding pool threads, and those symbols are
+        reported as not found.
+        
+        Args:
+            symbols (list): Company symbols
             
-            if current_time - timestamp > self.cache_expiry:
-                logger.info(f"Cache expired for {symbol}")
-                return None
+        Yields:
+            dict: 'symbol', 'success', 'cached' and 'data' or 'message'
+        """
+        ttl, stale_ttl = self.section_ttls['quote']
+        misses = []
+        
+        for symbol in dict.fromkeys(symbols):
+            entry = self.cache.peek(f"{symbol}.quote")
+            if entry is not None and time.time() - entry['cached_at'] <= ttl + stale_ttl:
+                yield self._quote_result(symbol, self.get_section(symbol, 'quote'), cached=True)
+            else:
+                misses.append(symbol)
+        
+        futures = {self.executor.submit(self.get_section, symbol, 'quote'): symbol for symbol in misses}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                quote = future.result()
+            except Exception as e:
+                logger.warning(f"Error getting quote for {symbol}: {e}")
+                quote = None
+            yield self._quote_result(symbol, quote, cached=False)
+    
+    def _quote_result(self, symbol, quote, cached):
+        """Build one result of get_quotes."""
+        if not quote:
+            return {'symbol': symbol, 'success': False, 'cached': cached, 'message': f"No quote found for {symbol}"}
+        return {'symbol': symbol, 'success': True, 'cached': cached, 'data': self._quote_fields(quote)}
+    
+    def get_history_series(self, symbol, period='1Y', interval='auto', max_points=None):
+        """
+        Get a downsampled chart series of a symbol's price history
+        
+        Series are memoized per symbol, parameters and latest stored date,
+        so they are rebuilt only when new history arrives.
+        
+        Args:
+            symbol (str): Company symbol
+            period (str): '1M', '3M', '6M', '1Y' or 'ALL'
+            interval (str): '1d', '1w', '1M' or 'auto'
+            max_points (int, optional): Maximum points to return, clamped to
+                MIN_CHART_POINTS..MAX_CHART_POINTS and rounded down to a
+                multiple of CHART_POINTS_STEP
             
-            return cached.get('data')
-        except Exception as e:
-            logger.error(f"Error reading cache for {symbol}: {e}")
+        Returns:
+            dict or None: Series as built by build_history_series
+        """
+        if period not in PERIOD_DAYS:
+            raise ValueError(f"Invalid period: {period}")
+        if interval not in ('auto', '1d', '1w', '1M'):
+            raise ValueError(f"Invalid interval: {interval}")
+        if max_points is not None:
+            max_points = min(max(int(max_points), MIN_CHART_POINTS), MAX_CHART_POINTS)
+            max_points -= max_points % CHART_POINTS_STEP
+        
+        # Makes sure the local store is up to date
+        if self.get_section(symbol, 'historicalData') is None:
             return None
+        
+        last_date = self.price_history.last_date(symbol)
+        ttl, _ = self.section_ttls['historicalData']
+        series = self.cache.get(
+            f"{symbol}.series.{period}.{interval}.{max_points}.{last_date}",
+            lambda: build_history_series(self.price_history.get_window(symbol, period), period, interval, max_points),
+            ttl,
+            persist=False
+        )
+        if series is not None:
+            series = dict(series, symbol=symbol, lastDate=last_date)
+        return series
     
-    def _save_to_cache(self, symbol, data):
+    def get_indicators(self, symbol):
         """
-        Save data to cache
+        Get technical indicators of a symbol computed from its stored history
+        
+        Memoized per symbol and latest stored date.
         
         Args:
             symbol (str): Company symbol
-            data (dict): Data to cache
+            
+        Returns:
+            dict or None: 'summary' of the latest values and indicator 'series'
         """
-        cache_file = os.path.join(self.cache_dir, f"{symbol.lower()}.json")
+        # Makes sure the local store is up to date
+        if self.get_section(symbol, 'historicalData') is None:
+            return None
         
-        try:
-            cached_data = {
-                'data': data,
-                'cached_at': datetime.now().timestamp()
-            }
-            
-            with open(cache_file, 'w') as f:
-                json.dump(cached_data, f, indent=2)
-                
-            logger.info(f"Data cached for {symbol}")
-        except Exception as e:
-            logger.error(f"Error caching data for {symbol}: {e}")
+        last_date = self.price_history.last_date(symbol)
+        start_date = (datetime.now() - timedelta(days=INDICATOR_LOOKBACK_DAYS)).strftime('%Y-%m-%d')
+        ttl, _ = self.section_ttls['historicalData']
+        indicators = self.cache.get(
+            f"{symbol}.indicators.{last_date}",
+            lambda: build_indicator_series(self.price_history.get_range(symbol, start_date)),
+            ttl,
+            persist=False
+        )
+        if indicators is not None:
+            indicators = dict(indicators, symbol=symbol, lastDate=last_date)
+        return indicators
+    
+    def screen_symbols(self, symbols=None, filters=None, sort=None, descending=True, limit=None):
+        """
+        Screen symbols by their latest technical indicators
+        
+        Only history already in the local store is used, nothing is fetched
+        from NSE. Indicators of every stored symbol are computed together in
+        one vectorized pass and memoized until new history is stored.
+        
+        Args:
+            symbols (list, optional): Symbols to screen, defaults to all stored
+            filters (dict, optional): Field to (minimum, maximum)
+            sort (str, optional): Field to rank by
+            descending (bool): Rank highest first
+            limit (int, optional): Maximum results
+            
+        Returns:
+            list: Indicator summaries of the matching symbols
+        """
+        latest_date, row_count = self.price_history.version()
+        start_date = (datetime.now() - timedelta(days=INDICATOR_LOOKBACK_DAYS)).strftime('%Y-%m-%d')
+        ttl, _ = self.section_ttls['historicalData']
+        
+        def build():
+            records = self.price_history.get_closes(start_date=start_date)
+            return summarize(*to_wide(records)) if records else []
+        
+        summaries = self.cache.get(f"screen.{latest_date}.{row_count}", build, ttl, persist=False) or []
+        if symbols:
+            wanted = set(symbols)
+            summaries = [summary for summary in summaries if summary['symbol'] in wanted]
+        return screen(summaries, filters, sort, descending, limit)
     
-    def _fetch_from_api(self, symbol):
+    def get_sections(self, symbol, sections):
         """
-        Fetch company data from NSE API
+        Get several sections of company data concurrently.
         
         Args:
             symbol (str): Company symbol
+            sections (list): Section names
             
         Returns:
-            dict: Company data or None if failed
+            dict: Section name to data, None for sections that failed
         """
-        try:
-            # First visit NSE homepage to get cookies
-            self.session.get('https://www.nseindia.com/get-quotes/equity?symbol=' + symbol, 
-                            timeout=10)
+        futures = {section: self.executor.submit(self.get_section, symbol, section) for section in sections}
+        wait(futures.values(), timeout=self.request_timeout * 2)
+        
+        results = {}
+        for section, future in futures.items():
+            if not future.done():
+                logger.warning(f"Timed out getting {section} for {symbol}")
+                results[section] = None
+                continue
+            try:
+                results[section] = future.result()
+            except Exception as e:
+                logger.warning(f"Error getting {section} for {symbol}: {e}")
+                results[section] = None
+        
+        return results
+    
+    def get_section(self, symbol, section):
+        """
+        Get one section of company data from cache or NSE API
+        
+        Args:
+            symbol (str): Company symbol
+            section (str): 'quote', 'tradeInfo', 'companyInfo' or 'historicalData'
             
-            # Get quote data
-            quote_url = f"{self.api_base_url}/quote-equity?symbol={symbol}"
-            quote_resp = self.session.get(quote_url, timeout=10)
+        Returns:
+            dict or list or None: Section data
+        """
+        ttl, stale_ttl = self.section_ttls[section]
+        return self.cache.get(
+            f"{symbol}.{section}",
+            lambda: self._fetch_section(symbol, section),
+            ttl,
+            stale_ttl,
+            # History is persisted in the price history store instead
+            persist=section != 'historicalData'
+        )
+    
+    def refresh_section(self, symbol, section):
+        """
+        Fetch one section of company data now, regardless of its cache age
+        
+        Args:
+            symbol (str): Company symbol
+            section (str): Section name
             
-            if quote_resp.status_code != 200:
-                logger.error(f"Failed to fetch quote data: {quote_resp.status_code}")
-                return None
+        Returns:
+            dict or list or None: Fresh section data
+        """
+        return self.cache.refresh(
+            f"{symbol}.{section}",
+            lambda: self._fetch_section(symbol, section),
+            persist=section != 'historicalData'
+        )
+    
+    def _get_json(self, url):
+        """
+        GET a JSON document from the NSE API.
+        
+        Args:
+            url (str): URL to fetch
             
-            quote_data = quote_resp.json()
+        Returns:
+            dict or None: Parsed JSON, or None if the response was not 200 or
+                the request was not sent
+        """
+        try:
+            response = self.nse.get(url)
+        except (CircuitOpenError, RateLimitedError) as e:
+            # Failing fast, callers fall back to cached data
+            logger.warning(f"Not fetching {url}: {e}")
+            return None
+        if response.status_code != 200:
+            logger.error(f"Failed to fetch {url}: {response.status_code}")
+            return None
+        return response.json()
+    
+    def _fetch_section(self, symbol, section):
+        """
+        Fetch one section of company data from NSE API
+        
+        Args:
+            symbol (str): Company symbol
+            section (str): Section name
             
-            # Get trade info
-            trade_url = f"{self.api_base_url}/quote-equity?symbol={symbol}&section=trade_info"
-            trade_resp = self.session.get(trade_url, timeout=10)
-            if trade_resp.status_code == 200:
-                trade_data = trade_resp.json()
-                quote_data['tradeInfo'] = trade_data.get('marketDeptOrderBook', {})
+        Returns:
+            dict or list or None: Section data or None if failed
+        """
+        try:
+            logger.info(f"Fetching fresh {section} for {symbol}")
             
-            # Get company info
-            info_url = f"{self.api_base_url}/quote-equity?symbol={symbol}&section=company_info"
-            info_resp = self.session.get(info_url, timeout=10)
-            if info_resp.status_code == 200:
-                info_data = info_resp.json()
-                quote_data['companyInfo'] = info_data
+            if section == 'quote':
+                return self._get_json(f"{self.api_base_url}/quote-equity?symbol={symbol}")
             
-            # Get historical data for charts (1 year)
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=365)
+            if section == 'tradeInfo':
+                trade_data = self._get_json(f"{self.api_base_url}/quote-equity?symbol={symbol}&section=trade_info")
+                return trade_data.get('marketDeptOrderBook', {}) if trade_data is not None else None
             
-            historical_url = (f"{self.api_base_url}/historical/securityArchives?"
-                             f"symbol={symbol}&from={start_date.strftime('%d-%m-%Y')}"
-                             f"&to={end_date.strftime('%d-%m-%Y')}&series=EQ")
+            if section == 'companyInfo':
+                return self._get_json(f"{self.api_base_url}/quote-equity?symbol={symbol}&section=company_info")
             
-            hist_resp = self.session.get(historical_url, timeout=10)
-            if hist_resp.status_code == 200:
-                hist_data = hist_resp.json()
-                quote_data['historicalData'] = hist_data.get('data', [])
+            if section == 'historicalData':
+                # Only fetch the days missing from the local store
+                if not self.price_history.refresh(symbol, self._fetch_history_range):
+                    return None
+                return self.price_history.get_window(symbol, '1Y')
             
-            return quote_data
+            logger.error(f"Unknown company data section: {section}")
+            return None
             
         except requests.RequestException as e:
-            logger.error(f"Request error fetching data for {symbol}: {e}")
+            logger.error(f"Request error fetching {section} for {symbol}: {e}")
             return None
         except Exception as e:
-            logger.error(f"Error fetching data for {symbol}: {e}")
+            logger.error(f"Error fetching {section} for {symbol}: {e}")
             return None
     
+    def _fetch_history_range(self, symbol, start_date, end_date):
+        """
+        Fetch daily price history for a date range from NSE API
+        
+        Args:
+            symbol (str): Company symbol
+            start_date (date): First day to fetch
+            end_date (date): Last day to fetch
+            
+        Returns:
+            list or None: Raw NSE history rows, None if the request failed
+        """
+        historical_url = (f"{self.api_base_url}/historical/securityArchives?"
+                          f"symbol={symbol}&from={start_date.strftime('%d-%m-%Y')}"
+                          f"&to={end_date.strftime('%d-%m-%Y')}&series=EQ")
+        hist_data = self._get_json(historical_url)
+        return hist_data.get('data', []) if hist_data is not None else None
+    
     def get_market_movers(self, category='gainers', count=5):
         """
         Get market movers (gainers, losers, most active)
         
+        All categories are served from one snapshot that is fetched at most
+        once per refresh interval, however many clients ask.
+        
         Args:
             category (str): Category of market movers ('gainers', 'losers', 'active')
             count (int): Number of stocks to return
@@ -195,26 +480,7 @@ class InvestmentModel:
             list: List of market movers
         """
         try:
-            url_map = {
-                'gainers': f"{self.api_base_url}/market-data-pre-open?key=NIFTY&cat=gainers",
-                'losers': f"{self.api_base_url}/market-data-pre-open?key=NIFTY&cat=losers",
-                'active': f"{self.api_base_url}/market-data-pre-open?key=NIFTY&cat=active"
-            }
-            
-            if category not in url_map:
-                logger.error(f"Invalid market mover category: {category}")
-                return []
-            
-            url = url_map[category]
-            response = self.session.get(url, timeout=10)
-            
-            if response.status_code != 200:
-                logger.error(f"Failed to fetch market movers: {response.status_code}")
-                return []
-            
-            data = response.json()
-            return data.get('data', [])[:count]
-            
+            return self.market_movers.get_movers(category, count)
         except Exception as e:
             logger.error(f"Error fetching market movers: {e}")
             return []
@@ -223,15 +489,24 @@ class InvestmentModel:
         """
         Search for companies by name or symbol
         
+        Searches are answered from the local symbol master. NSE autocomplete
+        is only used until the symbol master has been downloaded.
+        
         Args:
             query (str): Search query
             
         Returns:
             list: List of matching companies
         """
+        if self.symbol_master.is_loaded():
+            return self.symbol_master.search(query)
+        
+        # First run, download the symbol master in the background
+        self.symbol_master.refresh_if_stale()
+        
         try:
             url = f"{self.api_base_url}/search/autocomplete?q={query}"
-            response = self.session.get(url, timeout=10)
+            response = self.nse.get(url)
             
             if response.status_code != 200:
                 logger.error(f"Failed to search companies: {response.status_code}")
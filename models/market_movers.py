@@ -0,0 +1,151 @@
+import os
+import logging
+from urllib.parse import quote
+from models.prefetcher import is_market_open
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ('gainers', 'losers', 'active')
+
+class MarketMoversService:
+    """
+    Serves market movers from one shared in-memory snapshot.
+
+    The whole index dataset is fetched at most once per refresh interval
+    (live constituents during market hours, the pre-open session otherwise),
+    all categories are computed from it once, and every request is answered
+    by slicing the precomputed lists.
+    """
+    def __init__(self, model):
+        """
+        Initialize the service.
+
+        Args:
+            model (InvestmentModel): Model providing the NSE session, cache
+                and symbol master
+        """
+        self.model = model
+        self.index_name = os.getenv('NSE_MOVERS_INDEX', 'NIFTY 50')
+        self.pre_open_key = os.getenv('NSE_MOVERS_PRE_OPEN_KEY', 'NIFTY')
+        self.market_ttl = int(os.getenv('NSE_MOVERS_TTL', 30))
+        self.closed_ttl = int(os.getenv('NSE_MOVERS_CLOSED_TTL', 15 * 60))
+
+    def get_movers(self, category='gainers', count=5):
+        """
+        Get the top movers of a category.
+
+        Args:
+            category (str): 'gainers', 'losers' or 'active'
+            count (int): Number of stocks to return
+
+        Returns:
+            list: Market movers
+        """
+        if category not in CATEGORIES:
+            logger.error(f"Invalid market mover category: {category}")
+            return []
+
+        snapshot = self.get_snapshot()
+        if not snapshot:
+            return []
+        return snapshot['categories'][category][:max(0, count)]
+
+    def get_snapshot(self):
+        """
+        Get the current snapshot, refreshing it when it is older than the
+        refresh interval. Concurrent callers share one fetch.
+
+        Returns:
+            dict or None: Snapshot with 'rows', 'categories' and 'source'
+        """
+        market_open = is_market_open()
+        ttl = self.market_ttl if market_open else self.closed_ttl
+        return self.model.cache.get(
+            'market.movers',
+            lambda: self._build_snapshot(market_open),
+            ttl,
+            stale_ttl=ttl,
+            persist=False
+        )
+
+    def _build_snapshot(self, market_open):
+        """Fetch the dataset and precompute every category."""
+        if market_open:
+            rows = self._fetch_live()
+            source = 'live'
+        else:
+            rows = self._fetch_pre_open()
+            source = 'pre-open'
+
+        if rows is None:
+            return None
+
+        return {
+            'source': source,
+            'rows': rows,
+            'categories': {
+                'gainers': sorted((row for row in rows if row['change'] > 0), key=lambda row: row['change'], reverse=True),
+                'losers': sorted((row for row in rows if row['change'] < 0), key=lambda row: row['change']),
+                'active': sorted(rows, key=lambda row: row['turnover'], reverse=True)
+            }
+        }
+
+    def _fetch_live(self):
+        """Fetch live index constituents."""
+        data = self.model._get_json(f"{self.model.api_base_url}/equity-stockIndices?index={quote(self.index_name)}")
+        if data is None:
+            return None
+
+        rows = []
+        for item in data.get('data', []):
+            # The first entry is the index itself
+            if item.get('priority') == 1 or item.get('symbol') == self.index_name:
+                continue
+            rows.append(self._normalize(
+                item,
+                name=(item.get('meta') or {}).get('companyName'),
+                volume=item.get('totalTradedVolume'),
+                turnover=item.get('totalTradedValue')
+            ))
+        return rows
+
+    def _fetch_pre_open(self):
+        """Fetch the pre-open session of the index."""
+        data = self.model._get_json(f"{self.model.api_base_url}/market-data-pre-open?key={self.pre_open_key}")
+        if data is None:
+            return None
+
+        rows = []
+        for item in data.get('data', []):
+            metadata = item.get('metadata', {})
+            rows.append(self._normalize(
+                metadata,
+                volume=metadata.get('finalQuantity'),
+                turnover=metadata.get('totalTurnover')
+            ))
+        return rows
+
+    def _normalize(self, item, name=None, volume=None, turnover=None):
+        """Convert an NSE row into the shape the investment page renders."""
+        symbol = item.get('symbol', '')
+        if not name:
+            record = self.model.symbol_master.get(symbol)
+            name = record['name'] if record else symbol
+
+        return {
+            'symbol': symbol,
+            'name': name,
+            'lastPrice': self._number(item.get('lastPrice')),
+            'change': self._number(item.get('pChange')),
+            'priceChange': self._number(item.get('change')),
+            'previousClose': self._number(item.get('previousClose')),
+            'volume': self._number(volume),
+            'turnover': self._number(turnover)
+        }
+
+    def _number(self, value):
+        """Parse an NSE number that may be a string with commas."""
+        try:
+            return float(str(value).replace(',', ''))
+        except (TypeError, ValueError):
+            return 0.0
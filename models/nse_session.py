@@ -0,0 +1,174 @@
+import os
+import time
+import threading
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from utils.http_client import HttpClient, HostPolicy
+
+logger = logging.getLogger(__name__)
+
+class NSESessionManager:
+    """
+    Shared HTTP session for the NSE API that keeps its cookies fresh.
+
+    NSE only answers API calls that carry the cookies set by its HTML pages.
+    The manager primes those cookies once, refreshes them in the background
+    shortly before they expire, and retries a request once with fresh
+    cookies when NSE answers 401/403. Requests go through a shared HTTP
+    client that keeps to NSE's rate limit, backs off when NSE throttles and
+    fails fast instead of queueing when it is down or saturated. It is safe
+    to share across threads.
+    """
+    def __init__(self, headers, pool_size=8, timeout=10):
+        """
+        Initialize the session manager.
+
+        Args:
+            headers (dict): Default headers for every request
+            pool_size (int): Connection pool size, normally the worker count
+            timeout (float): Default request timeout in seconds
+        """
+        self.timeout = timeout
+        self.prime_url = os.getenv('NSE_COOKIE_URL', 'https://www.nseindia.com/get-quotes/equity?symbol=RELIANCE')
+        self.cookie_ttl = int(os.getenv('NSE_COOKIE_TTL', 5 * 60))
+        self.refresh_margin = int(os.getenv('NSE_COOKIE_REFRESH_MARGIN', 30))
+        # Cookies the API checks; tracking cookies may expire much sooner
+        self.session_cookies = {name.strip() for name in
+                                os.getenv('NSE_SESSION_COOKIES', 'nsit,nseappid').split(',') if name.strip()}
+        # Expiries closer than this are ignored, so one short-lived cookie
+        # cannot force a re-prime on every request
+        self.min_cookie_lifetime = int(os.getenv('NSE_MIN_COOKIE_LIFETIME', 60))
+
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        # Waiting longer than max_wait for NSE would stall the worker pool,
+        # callers serve stale data instead
+        self.client = HttpClient(
+            self.session,
+            policy=HostPolicy(
+                rate=float(os.getenv('NSE_RATE_LIMIT', 5)),
+                burst=int(os.getenv('NSE_RATE_BURST', 10)),
+                min_rate=float(os.getenv('NSE_MIN_RATE', 0.5)),
+                max_rate=float(os.getenv('NSE_MAX_RATE', 10)),
+                max_wait=float(os.getenv('NSE_MAX_WAIT', 2)),
+                failure_threshold=int(os.getenv('NSE_CIRCUIT_FAILURES', 5)),
+                reset_timeout=float(os.getenv('NSE_CIRCUIT_RESET', 30))
+            ),
+            max_retries=1,
+            timeout=timeout
+        )
+
+        self.expires_at = 0
+        self.primed_at = 0
+        self.lock = threading.Lock()
+        self.refresh_timer = None
+        self.stats = {'primes': 0, 'background_refreshes': 0, 'auth_retries': 0}
+
+    def is_fresh(self):
+        """Check if the current cookies are still valid."""
+        return time.time() < self.expires_at
+
+    def prime(self, force=False):
+        """
+        Obtain cookies from the NSE quote page.
+
+        Args:
+            force (bool): Refresh even if the current cookies are still valid
+
+        Returns:
+            bool: True if the cookies are valid afterwards
+        """
+        with self.lock:
+            if not force and self.is_fresh():
+                return True
+            # Several threads hitting 403 at once only need one refresh
+            if force and time.time() - self.primed_at < 2:
+                return self.is_fresh()
+
+            try:
+                response = self.client.get(self.prime_url, timeout=self.timeout)
+                response.raise_for_status()
+            except requests.RequestException as e:
+                logger.error(f"Error priming NSE cookies: {e}")
+                self.expires_at = 0
+                return False
+
+            # Use the earliest expiry of the session cookies (of all cookies
+            # if NSE sent none of them), capped by the configured TTL
+            now = time.time()
+            cookies = [cookie for cookie in self.session.cookies if cookie.name in self.session_cookies]
+            expires_at = now + self.cookie_ttl
+            for cookie in cookies or self.session.cookies:
+                if cookie.expires and cookie.expires >= now + self.min_cookie_lifetime:
+                    expires_at = min(expires_at, cookie.expires)
+
+            self.expires_at = expires_at
+            self.primed_at = time.time()
+            self.stats['primes'] += 1
+            logger.info(f"Primed NSE cookies, valid for {expires_at - time.time():.0f} seconds")
+
+            self._schedule_refresh()
+            return True
+
+    def _schedule_refresh(self):
+        """Schedule a background refresh shortly before the cookies expire."""
+        if self.refresh_timer:
+            self.refresh_timer.cancel()
+
+        delay = max(1, self.expires_at - time.time() - self.refresh_margin)
+        self.refresh_timer = threading.Timer(delay, self._background_refresh)
+        self.refresh_timer.daemon = True
+        self.refresh_timer.start()
+
+    def _background_refresh(self):
+        """Refresh the cookies before they lapse."""
+        self.stats['background_refreshes'] += 1
+        if not self.prime(force=True):
+            # Try again soon rather than waiting for a request to fail
+            with self.lock:
+                self.expires_at = 0
+                self.refresh_timer = threading.Timer(self.refresh_margin, self._background_refresh)
+                self.refresh_timer.daemon = True
+                self.refresh_timer.start()
+
+    def get(self, url, timeout=None, **kwargs):
+        """
+        GET an NSE URL with valid cookies.
+
+        Args:
+            url (str): URL to fetch
+            timeout (float, optional): Request timeout, defaults to self.timeout
+
+        Returns:
+            requests.Response: The response
+            
+        Raises:
+            requests.RequestException: If the request failed, or NSE is
+                rate limited or down and the request was not sent
+        """
+        timeout = timeout or self.timeout
+        if not self.is_fresh():
+            self.prime()
+
+        response = self.client.get(url, timeout=timeout, **kwargs)
+
+        if response.status_code in (401, 403):
+            logger.warning(f"NSE returned {response.status_code} for {url}, retrying with fresh cookies")
+            self.stats['auth_retries'] += 1
+            self.prime(force=True)
+            response = self.client.get(url, timeout=timeout, **kwargs)
+
+        return response
+
+    def close(self):
+        """Stop background refreshes and close the connection pool."""
+        with self.lock:
+            if self.refresh_timer:
+                self.refresh_timer.cancel()
+                self.refresh_timer = None
+        self.session.close()
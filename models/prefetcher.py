@@ -0,0 +1,209 @@
+import os
+import time
+import math
+import threading
+import logging
+from datetime import datetime, timedelta, timezone
+from utils.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# NSE regular session, Monday to Friday
+MARKET_OPEN = (9, 15)
+MARKET_CLOSE = (15, 30)
+
+DEFAULT_WATCHLIST = 'RELIANCE,TCS,HDFCBANK,ICICIBANK,INFY,BHARTIARTL,ITC,SBIN,LT,HINDUNILVR'
+
+def is_market_open(now=None):
+    """
+    Check if the NSE regular session is open (exchange holidays are not known).
+
+    Args:
+        now (datetime, optional): Time to check, defaults to now
+
+    Returns:
+        bool: True during market hours
+    """
+    now = (now or datetime.now(IST)).astimezone(IST)
+    if now.weekday() >= 5:
+        return False
+    return MARKET_OPEN <= (now.hour, now.minute) < MARKET_CLOSE
+
+class WatchlistPrefetcher:
+    """
+    Keeps hot symbols warm in the investment cache.
+
+    Popularity is tracked from page views with exponential decay. The
+    configured watchlist plus the most popular symbols are refreshed in the
+    background shortly before their cache entries expire, more often during
+    market hours, and never beyond a global budget of NSE requests. When
+    the budget runs out, the next cycle resumes at the symbol it stopped
+    at, so every hot symbol gets its turn.
+    """
+    def __init__(self, model):
+        """
+        Initialize the prefetcher.
+
+        Args:
+            model (InvestmentModel): Model whose cache is kept warm
+        """
+        self.model = model
+        self.watchlist = [symbol.strip().upper() for symbol in
+                          os.getenv('NSE_WATCHLIST', DEFAULT_WATCHLIST).split(',') if symbol.strip()]
+        self.max_popular = int(os.getenv('NSE_PREFETCH_POPULAR', 20))
+        self.market_interval = int(os.getenv('NSE_PREFETCH_MARKET_INTERVAL', 10))
+        self.closed_interval = int(os.getenv('NSE_PREFETCH_CLOSED_INTERVAL', 15 * 60))
+        self.half_life = float(os.getenv('NSE_POPULARITY_HALF_LIFE', 6 * 60 * 60))
+        # Refresh entries once this share of their TTL has passed
+        self.refresh_ratio = 0.8
+        # Global NSE request budget for background refreshes
+        self.budget = RateLimiter(rate=int(os.getenv('NSE_PREFETCH_BUDGET', 60)) / 60.0,
+                                  capacity=int(os.getenv('NSE_PREFETCH_BUDGET', 60)))
+
+        self.scores = {}
+        # Symbol the last cycle ran out of budget at
+        self.resume_symbol = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.stats = {'cycles': 0, 'refreshes': 0, 'skipped_budget': 0}
+
+    def record(self, symbol):
+        """
+        Record a view of a symbol.
+
+        Args:
+            symbol (str): Company symbol
+        """
+        now = time.time()
+        with self.lock:
+            score, updated_at = self.scores.get(symbol, (0.0, now))
+            self.scores[symbol] = (self._decay(score, now - updated_at) + 1.0, now)
+
+    def _decay(self, score, elapsed):
+        """Apply exponential decay to a popularity score."""
+        return score * math.pow(0.5, elapsed / self.half_life)
+
+    def popular_symbols(self, limit=None):
+        """
+        Get the most viewed symbols.
+
+        Args:
+            limit (int, optional): Maximum number of symbols
+
+        Returns:
+            list: (symbol, score) pairs, most popular first
+        """
+        now = time.time()
+        with self.lock:
+            ranked = sorted(
+                ((symbol, self._decay(score, now - updated_at)) for symbol, (score, updated_at) in self.scores.items()),
+                key=lambda item: item[1],
+                reverse=True
+            )
+            # Forget symbols nobody has looked at for a long time
+            for symbol, score in ranked:
+                if score < 0.01:
+                    del self.scores[symbol]
+        return [item for item in ranked if item[1] >= 0.01][:limit or self.max_popular]
+
+    def hot_symbols(self):
+        """
+        Get the symbols to keep warm, watchlist first.
+
+        Returns:
+            list: Symbols
+        """
+        symbols = list(self.watchlist)
+        for symbol, _ in self.popular_symbols():
+            if symbol not in symbols:
+                symbols.append(symbol)
+        return symbols
+
+    def sections_due(self, symbol, market_open):
+        """
+        Get the sections of a symbol that are about to expire.
+
+        Args:
+            symbol (str): Company symbol
+            market_open (bool): Whether live sections need refreshing
+
+        Returns:
+            list: Section names
+        """
+        due = []
+        for section, (ttl, _) in self.model.section_ttls.items():
+            entry = self.model.cache.peek(f"{symbol}.{section}", persist=section != 'historicalData')
+
+            # Live sections do not change while the market is closed
+            if entry is not None and not market_open and section in ('quote', 'tradeInfo'):
+                continue
+
+            if entry is None or time.time() - entry['cached_at'] >= ttl * self.refresh_ratio:
+                due.append(section)
+        return due
+
+    def run_once(self):
+        """
+        Refresh every hot symbol section that is due, within the budget.
+
+        Returns:
+            int: Number of sections refreshed
+        """
+        market_open = is_market_open()
+        refreshed = 0
+        self.stats['cycles'] += 1
+
+        symbols = self.hot_symbols()
+        if self.resume_symbol in symbols:
+            start = symbols.index(self.resume_symbol)
+            symbols = symbols[start:] + symbols[:start]
+        self.resume_symbol = None
+
+        for symbol in symbols:
+            if self.stop_event.is_set():
+                break
+
+            for section in self.sections_due(symbol, market_open):
+                if not self.budget.try_acquire():
+                    self.stats['skipped_budget'] += 1
+                    logger.info("NSE prefetch budget exhausted, waiting for the next cycle")
+                    self.stats['refreshes'] += refreshed
+                    self.resume_symbol = symbol
+                    return refreshed
+
+                if self.model.refresh_section(symbol, section) is not None:
+                    refreshed += 1
+
+        self.stats['refreshes'] += refreshed
+        return refreshed
+
+    def _run(self):
+        """Background loop."""
+        logger.info(f"Watchlist prefetcher started with {len(self.watchlist)} watchlist symbols")
+        while not self.stop_event.is_set():
+            try:
+                refreshed = self.run_once()
+                if refreshed:
+                    logger.info(f"Prefetched {refreshed} sections")
+            except Exception as e:
+                logger.error(f"Error prefetching watchlist: {e}")
+
+            interval = self.market_interval if is_market_open() else self.closed_interval
+            self.stop_event.wait(interval)
+
+    def start(self):
+        """Start the background prefetch thread."""
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name='nse-prefetcher', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the background prefetch thread."""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
@@ -0,0 +1,265 @@
+import os
+import sqlite3
+import threading
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Chart windows in days, None means all stored history
+PERIOD_DAYS = {
+    '1M': 30,
+    '3M': 90,
+    '6M': 180,
+    '1Y': 365,
+    'ALL': None
+}
+
+# NSE archive fields, in the order of the stored columns
+NSE_FIELDS = {
+    'open': 'CH_OPENING_PRICE',
+    'high': 'CH_TRADE_HIGH_PRICE',
+    'low': 'CH_TRADE_LOW_PRICE',
+    'close': 'CH_CLOSING_PRICE',
+    'volume': 'CH_TOT_TRADED_QTY'
+}
+
+class PriceHistoryStore:
+    """
+    Local OHLCV time series per symbol, stored in SQLite with a
+    (symbol, date) primary key.
+
+    Refreshes only fetch the days after the latest stored date, and chart
+    windows are served with range queries instead of refetching a year.
+    """
+    def __init__(self, db_path=None, history_days=365):
+        """
+        Initialize the store.
+
+        Args:
+            db_path (str, optional): SQLite database path
+            history_days (int): Days of history to load for a new symbol
+        """
+        self.db_path = db_path or os.getenv('PRICE_HISTORY_DB', './cache/price_history.db')
+        self.history_days = history_days
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+        self.local = threading.local()
+        self.refresh_locks = {}
+        self.lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS prices (
+                    symbol TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    open REAL,
+                    high REAL,
+                    low REAL,
+                    close REAL,
+                    volume REAL,
+                    PRIMARY KEY (symbol, date)
+                ) WITHOUT ROWID
+            ''')
+
+    def _connect(self):
+        """Get this thread's connection."""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def normalize_row(self, row):
+        """
+        Convert an NSE archive row (or an already normalized row) to
+        date/open/high/low/close/volume.
+
+        Args:
+            row (dict): Raw row
+
+        Returns:
+            dict or None: Normalized row, None if it has no usable date
+        """
+        if 'CH_TIMESTAMP' in row:
+            date = row.get('CH_TIMESTAMP')
+            values = {name: row.get(field) for name, field in NSE_FIELDS.items()}
+        else:
+            date = row.get('date')
+            values = {name: row.get(name) for name in NSE_FIELDS}
+
+        date = self._parse_date(date)
+        if date is None:
+            return None
+
+        normalized = {'date': date}
+        for name, value in values.items():
+            try:
+                normalized[name] = float(str(value).replace(',', '')) if value not in (None, '', '-') else None
+            except ValueError:
+                normalized[name] = None
+        return normalized
+
+    def _parse_date(self, value):
+        """Parse the date formats NSE uses into YYYY-MM-DD."""
+        if not value:
+            return None
+        for fmt in ('%Y-%m-%d', '%d-%b-%Y', '%d-%m-%Y'):
+            try:
+                return datetime.strptime(str(value)[:11].strip(), fmt).strftime('%Y-%m-%d')
+            except ValueError:
+                continue
+        return None
+
+    def upsert(self, symbol, rows):
+        """
+        Store rows for a symbol, replacing existing rows for the same dates.
+
+        Args:
+            symbol (str): Company symbol
+            rows (list): Raw or normalized rows
+
+        Returns:
+            int: Number of rows stored
+        """
+        records = []
+        for row in rows:
+            normalized = self.normalize_row(row)
+            if normalized:
+                records.append((symbol, normalized['date'], normalized['open'], normalized['high'],
+                                normalized['low'], normalized['close'], normalized['volume']))
+
+        if records:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO prices (symbol, date, open, high, low, close, volume) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    records
+                )
+        return len(records)
+
+    def last_date(self, symbol):
+        """
+        Get the latest stored date of a symbol.
+
+        Args:
+            symbol (str): Company symbol
+
+        Returns:
+            str or None: Date as YYYY-MM-DD
+        """
+        row = self._connect().execute('SELECT MAX(date) FROM prices WHERE symbol = ?', (symbol,)).fetchone()
+        return row[0] if row else None
+
+    def refresh(self, symbol, fetch_range):
+        """
+        Fetch and store only the days since the latest stored date.
+
+        The latest stored date is fetched again, as a row stored while the
+        market was open has an intraday price rather than the final close.
+
+        Args:
+            symbol (str): Company symbol
+            fetch_range (callable): fetch_range(symbol, start_date, end_date)
+                returning raw rows, or None on failure
+
+        Returns:
+            bool: True if the store is up to date
+        """
+        with self.lock:
+            refresh_lock = self.refresh_locks.setdefault(symbol, threading.Lock())
+
+        with refresh_lock:
+            today = datetime.now().date()
+            last = self.last_date(symbol)
+            if last:
+                start = datetime.strptime(last, '%Y-%m-%d').date()
+            else:
+                start = today - timedelta(days=self.history_days)
+
+            if start > today:
+                return True
+
+            rows = fetch_range(symbol, start, today)
+            if rows is None:
+                return False
+
+            stored = self.upsert(symbol, rows)
+            logger.info(f"Stored {stored} history rows for {symbol} from {start} to {today}")
+            return True
+
+    def get_range(self, symbol, start_date=None, end_date=None):
+        """
+        Get stored rows of a symbol between two dates (inclusive).
+
+        Args:
+            symbol (str): Company symbol
+            start_date (str, optional): First date as YYYY-MM-DD
+            end_date (str, optional): Last date as YYYY-MM-DD
+
+        Returns:
+            list: Rows sorted by date
+        """
+        query = 'SELECT date, open, high, low, close, volume FROM prices WHERE symbol = ?'
+        params = [symbol]
+        if start_date:
+            query += ' AND date >= ?'
+            params.append(start_date)
+        if end_date:
+            query += ' AND date <= ?'
+            params.append(end_date)
+        query += ' ORDER BY date'
+
+        columns = ('date', 'open', 'high', 'low', 'close', 'volume')
+        return [dict(zip(columns, row)) for row in self._connect().execute(query, params)]
+
+    def get_closes(self, symbols=None, start_date=None):
+        """
+        Get high/low/close rows of many symbols in one query.
+
+        Args:
+            symbols (list, optional): Symbols to read, defaults to all stored
+            start_date (str, optional): First date as YYYY-MM-DD
+
+        Returns:
+            list: (symbol, date, high, low, close) tuples
+        """
+        query = 'SELECT symbol, date, high, low, close FROM prices WHERE 1 = 1'
+        params = []
+        if symbols:
+            query += f" AND symbol IN ({','.join('?' * len(symbols))})"
+            params.extend(symbols)
+        if start_date:
+            query += ' AND date >= ?'
+            params.append(start_date)
+        return self._connect().execute(query, params).fetchall()
+
+    def version(self):
+        """
+        Get a marker that changes whenever rows are added.
+
+        Returns:
+            tuple: (latest date, row count)
+        """
+        return tuple(self._connect().execute('SELECT MAX(date), COUNT(*) FROM prices').fetchone())
+
+    def get_window(self, symbol, period='1Y'):
+        """
+        Get the rows of a chart window ending today.
+
+        Args:
+            symbol (str): Company symbol
+            period (str): One of PERIOD_DAYS
+
+        Returns:
+            list: Rows sorted by date
+        """
+        if period not in PERIOD_DAYS:
+            raise ValueError(f"Invalid period: {period}")
+
+        days = PERIOD_DAYS[period]
+        start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d') if days else None
+        return self.get_range(symbol, start_date)
@@ -0,0 +1,165 @@
+import os
+import queue
+import threading
+import logging
+from models.prefetcher import is_market_open
+
+logger = logging.getLogger(__name__)
+
+class Subscription:
+    """A client's queue of quote events for a set of symbols."""
+    def __init__(self, symbols, max_events=100):
+        """
+        Initialize the subscription.
+
+        Args:
+            symbols (list): Symbols the client follows
+            max_events (int): Events buffered before the oldest are dropped
+        """
+        self.symbols = symbols
+        self.events = queue.Queue(maxsize=max_events)
+
+    def put(self, event):
+        """Queue an event, dropping the oldest one if the client is slow."""
+        while True:
+            try:
+                self.events.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.events.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout):
+        """
+        Wait for the next event.
+
+        Args:
+            timeout (float): Seconds to wait
+
+        Returns:
+            dict or None: The event, None on timeout
+        """
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class QuoteStreamHub:
+    """
+    Fans out live quote updates to streaming clients.
+
+    Each symbol with at least one subscriber has a single poller thread, so
+    any number of viewers of a symbol cause one upstream fetch per interval.
+    Clients get a full snapshot when they subscribe and then only the
+    fields that changed.
+    """
+    def __init__(self, model):
+        """
+        Initialize the hub.
+
+        Args:
+            model (InvestmentModel): Model used to fetch quotes
+        """
+        self.model = model
+        self.market_interval = float(os.getenv('NSE_STREAM_INTERVAL', 5))
+        self.closed_interval = float(os.getenv('NSE_STREAM_CLOSED_INTERVAL', 60))
+
+        self.subscribers = {}
+        self.pollers = {}
+        self.latest = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, symbols):
+        """
+        Subscribe to quote updates.
+
+        Args:
+            symbols (list): Symbols to follow
+
+        Returns:
+            Subscription: The subscription to read events from
+        """
+        subscription = Subscription(symbols)
+        with self.lock:
+            for symbol in symbols:
+                self.subscribers.setdefault(symbol, set()).add(subscription)
+                if symbol in self.latest:
+                    subscription.put({'symbol': symbol, 'snapshot': True, 'changes': self.latest[symbol]})
+                if symbol not in self.pollers:
+                    stop_event = threading.Event()
+                    thread = threading.Thread(target=self._poll, args=(symbol, stop_event),
+                                              name=f'quote-stream-{symbol}', daemon=True)
+                    self.pollers[symbol] = stop_event
+                    thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Stop sending updates to a subscription.
+
+        Args:
+            subscription (Subscription): The subscription to remove
+        """
+        with self.lock:
+            for symbol in subscription.symbols:
+                subscribers = self.subscribers.get(symbol)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    # Last viewer left, stop polling the symbol
+                    del self.subscribers[symbol]
+                    self.pollers.pop(symbol).set()
+                    self.latest.pop(symbol, None)
+
+    def _poll(self, symbol, stop_event):
+        """Fetch a symbol's quote every interval and publish the changes."""
+        logger.info(f"Started quote stream poller for {symbol}")
+        while not stop_event.is_set():
+            try:
+                quote = self.model.refresh_section(symbol, 'quote')
+                if quote:
+                    self._publish(symbol, self._flatten(quote))
+            except Exception as e:
+                logger.error(f"Error polling quote for {symbol}: {e}")
+
+            stop_event.wait(self.market_interval if is_market_open() else self.closed_interval)
+        logger.info(f"Stopped quote stream poller for {symbol}")
+
+    def _flatten(self, quote):
+        """Pick the live fields of a quote."""
+        fields = dict(quote.get('priceInfo', {}))
+        fields['lastUpdateTime'] = quote.get('metadata', {}).get('lastUpdateTime')
+        return fields
+
+    def _publish(self, symbol, fields):
+        """Send the fields that changed since the last update."""
+        with self.lock:
+            # The last viewer may have left while the quote was fetched
+            if symbol not in self.subscribers:
+                return
+
+            previous = self.latest.get(symbol)
+            if previous is None:
+                changes = fields
+            else:
+                changes = {key: value for key, value in fields.items() if previous.get(key) != value}
+            if not changes:
+                return
+
+            self.latest[symbol] = fields
+            event = {'symbol': symbol, 'snapshot': previous is None, 'changes': changes}
+            for subscription in self.subscribers.get(symbol, ()):
+                subscription.put(event)
+
+    def get_stats(self):
+        """
+        Get the symbols being streamed.
+
+        Returns:
+            dict: Symbol to number of subscribers
+        """
+        with self.lock:
+            return {symbol: len(subscribers) for symbol, subscribers in self.subscribers.items()}
@@ -0,0 +1,321 @@
+import os
+import io
+import re
+import csv
+import json
+import time
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+def normalize(text):
+    """Lower-case text and collapse everything but letters and digits to spaces."""
+    return re.sub(r'[^a-z0-9]+', ' ', (text or '').lower()).strip()
+
+def trigrams(text):
+    """
+    Get the character trigrams of a text, padded so short words still match.
+
+    Args:
+        text (str): Normalized text
+
+    Returns:
+        set: Trigrams
+    """
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class _TrieNode:
+    """Prefix trie node holding the ids of every record below it."""
+    __slots__ = ('children', 'ids')
+
+    def __init__(self):
+        self.children = {}
+        self.ids = []
+
+class SymbolIndex:
+    """
+    Immutable search index over symbol master records: a prefix trie on
+    symbols and company name words, plus a trigram index for typos.
+    """
+    def __init__(self, records):
+        """
+        Build the index.
+
+        Args:
+            records (list): Records with symbol, name, isin and series
+        """
+        self.records = records
+        self.by_symbol = {normalize(record['symbol']).replace(' ', ''): i for i, record in enumerate(records)}
+        self.root = _TrieNode()
+        self.trigram_index = {}
+
+        for i, record in enumerate(records):
+            keys = {normalize(record['symbol']).replace(' ', '')}
+            name = normalize(record['name'])
+            keys.add(name)
+            keys.update(name.split())
+            for key in keys:
+                self._insert(key, i)
+
+            for gram in trigrams(normalize(record['symbol'])) | trigrams(name):
+                self.trigram_index.setdefault(gram, []).append(i)
+
+    def _insert(self, key, record_id):
+        """Add a record id to every trie node along a key."""
+        node = self.root
+        for char in key:
+            node = node.children.setdefault(char, _TrieNode())
+            if not node.ids or node.ids[-1] != record_id:
+                node.ids.append(record_id)
+
+    def get(self, symbol):
+        """
+        Get the record of a symbol.
+
+        Args:
+            symbol (str): Company symbol
+
+        Returns:
+            dict or None: The record
+        """
+        record_id = self.by_symbol.get(normalize(symbol).replace(' ', ''))
+        return self.records[record_id] if record_id is not None else None
+
+    def prefix_ids(self, prefix):
+        """
+        Get the ids of records with a key starting with a prefix.
+
+        Args:
+            prefix (str): Normalized prefix
+
+        Returns:
+            list: Record ids
+        """
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.ids
+
+    def fuzzy_ids(self, query, min_similarity=0.3):
+        """
+        Get ids of records sharing enough trigrams with the query.
+
+        Args:
+            query (str): Normalized query
+            min_similarity (float): Minimum share of query trigrams matched
+
+        Returns:
+            list: (record id, similarity) pairs, best first
+        """
+        grams = trigrams(query)
+        counts = {}
+        for gram in grams:
+            for record_id in self.trigram_index.get(gram, ()):
+                counts[record_id] = counts.get(record_id, 0) + 1
+
+        scored = [(record_id, count / len(grams)) for record_id, count in counts.items()
+                  if count / len(grams) >= min_similarity]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored
+
+    def search(self, query, limit=10):
+        """
+        Search records by symbol or company name.
+
+        Ranking: exact symbol, then symbol prefix, then name prefix, then
+        fuzzy matches.
+
+        Args:
+            query (str): User input
+            limit (int): Maximum results
+
+        Returns:
+            list: Matching records
+        """
+        query = normalize(query)
+        if not query:
+            return []
+
+        results = []
+        seen = set()
+
+        def add(record_id):
+            if record_id not in seen and len(results) < limit:
+                seen.add(record_id)
+                results.append(self.records[record_id])
+
+        exact = self.by_symbol.get(query.replace(' ', ''))
+        if exact is not None:
+            add(exact)
+
+        # Multi-word queries must match every word
+        words = query.split()
+        candidates = None
+        for word in words:
+            ids = set(self.prefix_ids(word))
+            candidates = ids if candidates is None else candidates & ids
+        full_prefix = self.prefix_ids(query.replace(' ', '')) if len(words) > 1 else []
+
+        prefix_matches = sorted(
+            (candidates or set()) | set(full_prefix),
+            key=lambda i: (not self.records[i]['symbol'].lower().startswith(query.replace(' ', '')),
+                           self.records[i]['series'] != 'EQ',
+                           len(self.records[i]['symbol']))
+        )
+        for record_id in prefix_matches:
+            add(record_id)
+
+        if len(results) < limit:
+            for record_id, _ in self.fuzzy_ids(query):
+                add(record_id)
+
+        return results
+
+class SymbolMaster:
+    """
+    Locally held NSE symbol master for in-process autocomplete, refreshed
+    periodically from the NSE equity list.
+    """
+    def __init__(self, nse, cache_path=None):
+        """
+        Initialize the symbol master from its on-disk copy.
+
+        Args:
+            nse (NSESessionManager): Fetches the list through the shared
+                NSE rate limiter and circuit breaker
+            cache_path (str, optional): Where the list is kept between runs
+        """
+        self.nse = nse
+        self.source_url = os.getenv('NSE_SYMBOL_MASTER_URL', 'https://archives.nseindia.com/content/equities/EQUITY_L.csv')
+        self.cache_path = cache_path or os.getenv('NSE_SYMBOL_MASTER_PATH', './cache/symbol_master.json')
+        self.ttl = int(os.getenv('NSE_SYMBOL_MASTER_TTL', 24 * 60 * 60))
+
+        self.index = SymbolIndex([])
+        self.updated_at = 0
+        self.refresh_lock = threading.Lock()
+        self.load()
+
+    def is_loaded(self):
+        """Check if any symbols are available."""
+        return bool(self.index.records)
+
+    def is_stale(self):
+        """Check if the list should be refreshed."""
+        return time.time() - self.updated_at > self.ttl
+
+    def load(self):
+        """
+        Load the list saved by the last refresh.
+
+        Returns:
+            bool: True if a list was loaded
+        """
+        if not os.path.exists(self.cache_path):
+            return False
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            self.index = SymbolIndex(saved.get('records', []))
+            self.updated_at = saved.get('updated_at', 0)
+            logger.info(f"Loaded {len(self.index.records)} symbols from {self.cache_path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error loading symbol master: {e}")
+            return False
+
+    def parse_csv(self, text):
+        """
+        Parse the NSE equity list CSV.
+
+        Args:
+            text (str): CSV content
+
+        Returns:
+            list: Records with symbol, name, isin and series
+        """
+        records = []
+        reader = csv.DictReader(io.StringIO(text))
+        for row in reader:
+            row = {(key or '').strip().upper(): (value or '').strip() for key, value in row.items()}
+            if not row.get('SYMBOL'):
+                continue
+            records.append({
+                'symbol': row['SYMBOL'],
+                'name': row.get('NAME OF COMPANY', ''),
+                'isin': row.get('ISIN NUMBER', ''),
+                'series': row.get('SERIES', '')
+            })
+        return records
+
+    def refresh(self):
+        """
+        Download the equity list and rebuild the index.
+
+        Returns:
+            bool: True if the list was refreshed
+        """
+        if not self.refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            response = self.nse.get(self.source_url, timeout=30)
+            if response.status_code != 200:
+                logger.error(f"Failed to fetch symbol master: {response.status_code}")
+                return False
+
+            records = self.parse_csv(response.text)
+            if not records:
+                logger.error("Symbol master download contained no symbols")
+                return False
+
+            # Build the new index before swapping it in
+            self.index = SymbolIndex(records)
+            self.updated_at = time.time()
+
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'updated_at': self.updated_at, 'records': records}, f)
+            os.replace(tmp_path, self.cache_path)
+
+            logger.info(f"Refreshed symbol master with {len(records)} symbols")
+            return True
+        except Exception as e:
+            logger.error(f"Error refreshing symbol master: {e}")
+            return False
+        finally:
+            self.refresh_lock.release()
+
+    def refresh_if_stale(self):
+        """Refresh in the background when the list is old."""
+        if self.is_stale() and not self.refresh_lock.locked():
+            threading.Thread(target=self.refresh, name='symbol-master-refresh', daemon=True).start()
+
+    def get(self, symbol):
+        """
+        Get the record of a symbol.
+
+        Args:
+            symbol (str): Company symbol
+
+        Returns:
+            dict or None: Record with symbol, name, isin and series
+        """
+        return self.index.get(symbol)
+
+    def search(self, query, limit=10):
+        """
+        Search symbols by symbol or company name.
+
+        Args:
+            query (str): User input
+            limit (int): Maximum results
+
+        Returns:
+            list: Matching records
+        """
+        self.refresh_if_stale()
+        return self.index.search(query, limit)
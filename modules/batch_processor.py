@@ -0,0 +1,215 @@
+import json
+import time
+import random
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from config import Config
+from modules.query_processor import query_processor, is_rate_limit_error
+from modules.speech_processor import speech_processor
+from utils.helpers import generate_unique_id, sanitize_input
+from utils.rate_limiter import RateLimiter
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class BatchProcessor:
+    """
+    Runs many queries through retrieval and synthesis on a bounded worker
+    pool, for offline evaluation and cache warm-up.
+    """
+    def __init__(self):
+        """Initialize the batch processor."""
+        self.max_workers = Config.BATCH_MAX_WORKERS
+        self.max_retries = Config.BATCH_MAX_RETRIES
+        # Shared across batches so concurrent runs stay within the API limit
+        self.rate_limiter = RateLimiter(
+            rate=Config.BATCH_REQUESTS_PER_MINUTE / 60.0,
+            capacity=self.max_workers
+        )
+
+    def parse_jsonl(self, lines):
+        """
+        Parse batch input lines.
+
+        Each line is a JSON object with a 'query' (or 'user_query', so
+        conversation logs can be replayed as-is) and optional 'id' and
+        'knowledge_base'. Blank and malformed lines are skipped.
+
+        Args:
+            lines (iterable): Lines of JSONL text
+
+        Returns:
+            list: Normalized batch items
+        """
+        items = []
+        for line_number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                logger.warning(f"Skipping malformed batch line {line_number}: {e}")
+                continue
+
+            item = self.normalize_item(record)
+            if item:
+                items.append(item)
+            else:
+                logger.warning(f"Skipping batch line {line_number} without a query")
+        return items
+
+    def normalize_item(self, record):
+        """
+        Normalize one batch input record.
+
+        Args:
+            record (dict or str): A query string or a record with a query
+
+        Returns:
+            dict or None: Item with id, query and knowledge_base
+        """
+        if isinstance(record, str):
+            record = {'query': record}
+        if not isinstance(record, dict):
+            return None
+
+        query = sanitize_input(record.get('query') or record.get('user_query') or '')
+        if not query:
+            return None
+
+        return {
+            'id': record.get('id') or generate_unique_id(),
+            'query': query,
+            'knowledge_base': record.get('knowledge_base')
+        }
+
+    def process_item(self, item, include_audio=False, knowledge_base=None):
+        """
+        Answer a single batch item, retrying when rate limited.
+
+        Args:
+            item (dict): Normalized batch item
+            include_audio (bool): Whether to synthesize speech for the answer
+            knowledge_base (str, optional): Default knowledge base for items
+                that do not name one
+
+        Returns:
+            dict: Result with answer, latency and token usage
+        """
+        knowledge_base = item.get('knowledge_base') or knowledge_base
+        result = {
+            'id': item['id'],
+            'query': item['query'],
+            'knowledge_base': knowledge_base,
+            'success': False
+        }
+
+        started = time.perf_counter()
+        queue_wait = 0.0
+
+        for attempt in range(self.max_retries + 1):
+            queue_wait += self.rate_limiter.acquire()
+            try:
+                answer = query_processor.answer(item['query'], knowledge_base)
+                result.update({
+                    'success': True,
+                    'text': answer['text'],
+                    'source': answer['source'],
+                    'usage': answer['usage']
+                })
+                break
+            except Exception as e:
+                if is_rate_limit_error(e) and attempt < self.max_retries:
+                    wait_time = (2 ** attempt) + random.random()
+                    logger.warning(f"Rate limited on batch item {item['id']}, backing off {wait_time:.2f} seconds")
+                    self.rate_limiter.pause(wait_time)
+                    continue
+                logger.error(f"Error processing batch item {item['id']}: {e}")
+                result['error'] = str(e)
+                break
+
+        result['attempts'] = attempt + 1
+        result['latency_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        result['queue_wait_ms'] = round(queue_wait * 1000, 2)
+
+        if include_audio and result['success']:
+            tts_started = time.perf_counter()
+            result['audio_data'] = speech_processor.text_to_speech_data(result['text'])
+            result['tts_latency_ms'] = round((time.perf_counter() - tts_started) * 1000, 2)
+
+        return result
+
+    def run(self, items, include_audio=False, knowledge_base=None, max_workers=None):
+        """
+        Process batch items concurrently, yielding results as they complete.
+
+        At most twice the worker count is in flight at any time, so large
+        batches do not queue thousands of futures up front.
+
+        Args:
+            items (iterable): Normalized batch items
+            include_audio (bool): Whether to synthesize speech for answers
+            knowledge_base (str, optional): Default knowledge base
+            max_workers (int, optional): Worker pool size
+
+        Yields:
+            dict: One result per item, in completion order
+        """
+        max_workers = max_workers or self.max_workers
+        max_in_flight = max_workers * 2
+        items = iter(items)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = set()
+            exhausted = False
+
+            while pending or not exhausted:
+                while not exhausted and len(pending) < max_in_flight:
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending.add(executor.submit(self.process_item, item, include_audio, knowledge_base))
+
+                if not pending:
+                    break
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+    def summarize(self, results):
+        """
+        Summarize latency and token usage of a finished batch.
+
+        Args:
+            results (list): Results yielded by run()
+
+        Returns:
+            dict: Batch statistics
+        """
+        latencies = sorted(result['latency_ms'] for result in results)
+        succeeded = [result for result in results if result['success']]
+
+        def percentile(p):
+            if not latencies:
+                return 0
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+        return {
+            'total': len(results),
+            'succeeded': len(succeeded),
+            'failed': len(results) - len(succeeded),
+            'latency_p50_ms': percentile(0.5),
+            'latency_p95_ms': percentile(0.95),
+            'total_tokens': sum(result['usage']['total_tokens'] for result in succeeded),
+            'sources': {
+                source: sum(1 for result in succeeded if result['source'] == source)
+                for source in ('rag', 'fallback')
+            }
+        }
+
+# Create a singleton instance
+batch_processor = BatchProcessor()
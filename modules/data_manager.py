@@ -2,6 +2,7 @@ import os
 import pandas as pd
 import logging
 from config import Config
+from modules.knowledge_base import knowledge_base_registry
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -14,19 +15,21 @@ class DataManager:
         """Initialize the data manager."""
         pass
     
-    def load_csv_data(self, csv_path=None):
+    def load_csv_data(self, csv_path=None, knowledge_base=None):
         """
         Load data from a CSV file.
         
         Args:
-            csv_path (str, optional): Path to the CSV file. Defaults to Config.CSV_PATH.
+            csv_path (str, optional): Path to the CSV file. Defaults to the
+                CSV of the given (or default) knowledge base.
+            knowledge_base (str, optional): Knowledge base to load
             
         Returns:
             pandas.DataFrame: The loaded data
         """
         try:
             if csv_path is None:
-                csv_path = Config.CSV_PATH
+                csv_path = knowledge_base_registry.get(knowledge_base).get('csv_path', Config.CSV_PATH)
                 
             if not os.path.exists(csv_path):
                 logger.error(f"CSV file not found at {csv_path}")
@@ -40,15 +43,18 @@ class DataManager:
             logger.error(f"Error loading CSV data: {e}")
             return None
     
-    def get_categories(self):
+    def get_categories(self, knowledge_base=None):
         """
         Get all unique categories from the CSV data.
         
+        Args:
+            knowledge_base (str, optional): Knowledge base to read from
+            
         Returns:
             list: List of unique categories
         """
         try:
-            df = self.load_csv_data()
+            df = self.load_csv_data(knowledge_base=knowledge_base)
             if df is None:
                 return []
             
@@ -63,18 +69,19 @@ class DataManager:
             logger.error(f"Error getting categories: {e}")
             return []
     
-    def get_questions_by_category(self, category):
+    def get_questions_by_category(self, category, knowledge_base=None):
         """
         Get all questions for a specific category.
         
         Args:
             category (str): The category to filter by
+            knowledge_base (str, optional): Knowledge base to read from
             
         Returns:
             list: List of questions in the category
         """
         try:
-            df = self.load_csv_data()
+            df = self.load_csv_data(knowledge_base=knowledge_base)
             if df is None:
                 return []
             
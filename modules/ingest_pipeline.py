@@ -0,0 +1,624 @@
+import os
+import re
+import json
+import time
+import queue
+import random
+import logging
+import argparse
+import threading
+from llama_index.core import Settings
+from llama_index.core.schema import Document, MetadataMode
+from llama_index.core.node_parser import SentenceSplitter
+from config import Config
+from modules.rag_system import rag_system
+from modules.knowledge_base import knowledge_base_registry
+from utils.dedup import FaqDeduplicator
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Passed down the queues to stop the next stage
+_STOP = object()
+
+class IngestPipeline:
+    """
+    Streams scraper changes into the live index of a knowledge base.
+
+    Four stages run in their own threads, connected by bounded queues so a
+    slow stage blocks the ones before it instead of buffering without limit:
+
+        read feed -> clean/dedup/chunk -> batch embed -> insert into index
+
+    Changes are read from the JSONL change feed written by the scraper.
+    Added and updated articles replace the documents of their URL in the
+    loaded index, so running queries see them without a restart or
+    rebuild; removed articles are deleted. Embeddings are requested in
+    batches across articles. The index is saved periodically and the feed
+    offset only advances once the changes before it are saved, so a crash
+    replays changes rather than losing them. Articles held back as
+    duplicates of an indexed URL are saved with the offset, so they can
+    still take its place after a restart. A change that fails, e.g.
+    while OpenAI is down, is retried with backoff and holds back the ones
+    after it; the index stays loaded while the pipeline runs.
+    """
+    def __init__(self, knowledge_base, feed_path, batch_size=None, queue_size=None):
+        """
+        Initialize the pipeline.
+
+        Args:
+            knowledge_base (str): Knowledge base to keep up to date
+            feed_path (str): JSONL change feed to read
+            batch_size (int, optional): Nodes per embedding request
+            queue_size (int, optional): Capacity of each queue
+        """
+        self.knowledge_base = knowledge_base
+        self.feed_path = feed_path
+        self.batch_size = batch_size or Config.INGEST_BATCH_SIZE
+        self.batch_wait = Config.INGEST_BATCH_WAIT
+        self.poll_interval = Config.INGEST_POLL_INTERVAL
+        self.persist_interval = Config.INGEST_PERSIST_INTERVAL
+        self.state_path = os.path.join(Config.STORAGE_DIR, f"{knowledge_base}_ingest.json")
+
+        queue_size = queue_size or Config.INGEST_QUEUE_SIZE
+        self.changes = queue.Queue(maxsize=queue_size)
+        self.chunked = queue.Queue(maxsize=queue_size)
+        self.embedded = queue.Queue(maxsize=queue_size)
+
+        self.splitter = SentenceSplitter(chunk_size=Config.INGEST_CHUNK_SIZE, chunk_overlap=50)
+        self.deduplicator = None
+        self.indexed_urls = set()
+        # Changes held back as duplicates, by the URL they duplicate and
+        # then their own URL, and the URL holding back each of them
+        self.waiting = {}
+        self.held_by = {}
+        # Kept URLs whose waiting changes changed in the current change
+        self.touched = set()
+        # Waiting changes as of the last applied change, saved with the offset
+        self.applied_waiting = {}
+
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.stats = {'read': 0, 'added': 0, 'updated': 0, 'removed': 0, 'duplicates': 0, 'skipped': 0,
+                      'embedded_nodes': 0, 'embedding_batches': 0, 'errors': 0, 'retrying': None,
+                      'offset': 0, 'persisted_at': None}
+
+    def _load_state(self):
+        """Get the saved ingest state of this feed, None if there is none."""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if isinstance(state, dict) and state.get('feed') == os.path.abspath(self.feed_path):
+                return state
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def load_offset(self):
+        """
+        Get the feed offset up to which changes are in the saved index.
+
+        Without a saved offset the pipeline starts at the end of the feed,
+        as the index is built from the CSV the scraper writes after its
+        changes.
+
+        Returns:
+            int: Byte offset in the feed
+        """
+        state = self._load_state()
+        if state is not None:
+            try:
+                return int(state.get('offset', 0))
+            except (TypeError, ValueError):
+                pass
+        return os.path.getsize(self.feed_path) if os.path.exists(self.feed_path) else 0
+
+    def load_waiting(self):
+        """
+        Get the changes held back as duplicates as of the saved offset.
+
+        Returns:
+            dict: Changes by the URL they duplicate and then their own URL
+        """
+        waiting = (self._load_state() or {}).get('waiting')
+        if not isinstance(waiting, dict):
+            return {}
+        return {kept_url: changes for kept_url, changes in waiting.items() if isinstance(changes, dict) and changes}
+
+    def save_offset(self, offset, waiting=None):
+        """
+        Atomically record the feed offset covered by the saved index.
+
+        Args:
+            offset (int): Byte offset in the feed
+            waiting (dict, optional): Changes held back as duplicates as of
+                the offset
+        """
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'feed': os.path.abspath(self.feed_path), 'offset': offset, 'saved_at': time.time(),
+                       'waiting': waiting or {}}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def start(self, follow=True):
+        """
+        Start the stage threads.
+
+        Args:
+            follow (bool): Keep polling the feed for new changes; otherwise
+                stop once the feed is read to the end
+        """
+        if self.threads:
+            return
+        self.stop_event.clear()
+        self.applied_waiting = self.load_waiting()
+        self.waiting = {kept_url: dict(changes) for kept_url, changes in self.applied_waiting.items()}
+        self.held_by = {url: kept_url for kept_url, changes in self.waiting.items() for url in changes}
+        # Unsaved live updates would be lost if the index were evicted
+        rag_system.pin(self.knowledge_base)
+        stages = [
+            (self._read_feed, (follow,)),
+            (self._prepare, ()),
+            (self._embed, ()),
+            (self._insert, ())
+        ]
+        for target, args in stages:
+            thread = threading.Thread(target=target, args=args, daemon=True,
+                                      name=f"ingest-{self.knowledge_base}-{target.__name__.strip('_')}")
+            thread.start()
+            self.threads.append(thread)
+        logger.info(f"Started ingest pipeline for '{self.knowledge_base}' from {self.feed_path}")
+
+    def stop(self, timeout=30):
+        """
+        Stop reading the feed and let queued changes drain.
+
+        Args:
+            timeout (float): Seconds to wait for each stage
+        """
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+
+    def join(self):
+        """Wait for the stages to finish, e.g. after start(follow=False)."""
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def status(self):
+        """
+        Get pipeline statistics and queue depths.
+
+        Returns:
+            dict: Statistics
+        """
+        return dict(self.stats, knowledge_base=self.knowledge_base, feed=self.feed_path,
+                    running=any(thread.is_alive() for thread in self.threads),
+                    queued={'changes': self.changes.qsize(), 'chunked': self.chunked.qsize(),
+                            'embedded': self.embedded.qsize()})
+
+    def _read_feed(self, follow):
+        """Feed stage: tail the change feed into the changes queue."""
+        offset = self.load_offset()
+        self.stats['offset'] = offset
+        try:
+            while not self.stop_event.is_set():
+                if os.path.exists(self.feed_path) and os.path.getsize(self.feed_path) < offset:
+                    logger.warning(f"{self.feed_path} was truncated, reading it from the start")
+                    offset = 0
+
+                offset, count = self._read_changes(offset)
+                if count or follow:
+                    if not count:
+                        self.stop_event.wait(self.poll_interval)
+                    continue
+                break
+        except Exception as e:
+            logger.error(f"Error reading change feed {self.feed_path}: {e}")
+            self.stats['errors'] += 1
+        finally:
+            self.changes.put(_STOP)
+
+    def _read_changes(self, offset):
+        """
+        Queue the complete lines written to the feed after an offset.
+
+        Returns:
+            tuple: (offset after the last complete line, changes queued)
+        """
+        if not os.path.exists(self.feed_path):
+            return offset, 0
+
+        count = 0
+        with open(self.feed_path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                # A line still being written is read on the next poll
+                if not line.endswith(b'\n') or self.stop_event.is_set():
+                    break
+                offset += len(line)
+                try:
+                    change = json.loads(line)
+                except ValueError:
+                    change = None
+                if not isinstance(change, dict):
+                    logger.warning(f"Skipping unreadable change feed line in {self.feed_path}")
+                    continue
+                # Blocks while the pipeline is behind
+                self.changes.put((change, offset))
+                self.stats['read'] += 1
+                count += 1
+        return offset, count
+
+    def _retry(self, action, description):
+        """
+        Run an action until it succeeds, backing off between attempts.
+
+        Args:
+            action (callable): Action to run
+            description (str): What the action does, for the log
+
+        Returns:
+            tuple: (True, result) once it succeeded, or (False, None) if the
+                pipeline was stopped first
+        """
+        delay = 1
+        while True:
+            try:
+                result = action()
+                self.stats['retrying'] = None
+                return True, result
+            except Exception as e:
+                wait_time = delay + random.random()
+                logger.error(f"Error {description}, retrying in {wait_time:.1f} seconds: {e}")
+                self.stats['errors'] += 1
+                self.stats['retrying'] = description
+                if self.stop_event.wait(wait_time):
+                    return False, None
+                delay = min(delay * 2, 60)
+
+    def _seed(self):
+        """Load the FAQs already in the index into the deduplicator."""
+        deduplicator = FaqDeduplicator()
+        indexed_urls = set()
+        for document in rag_system.get_documents(self.knowledge_base).values():
+            deduplicator.add(document)
+            if document['url']:
+                indexed_urls.add(document['url'])
+        deduplicator.dropped.clear()
+        self.deduplicator, self.indexed_urls = deduplicator, indexed_urls
+        logger.info(f"Ingest pipeline for '{self.knowledge_base}' found {len(self.indexed_urls)} indexed URLs")
+
+    def _prepare(self):
+        """Clean, dedup and chunk stage."""
+        stopped = False
+        try:
+            while True:
+                item = self.changes.get()
+                if item is _STOP:
+                    break
+                # Once stopped on a failed change, the ones after it are
+                # dropped too so the saved offset stays before it
+                if stopped:
+                    continue
+                change, offset = item
+
+                def prepare():
+                    if self.deduplicator is None:
+                        self._seed()
+                    return self._prepare_change(change)
+
+                self.touched.clear()
+                ok, operations = self._retry(prepare, f"preparing change for {change.get('url')}")
+                if not ok:
+                    stopped = True
+                    continue
+                # The change is only done, and the offset past it, once its
+                # last operation is applied; that one also carries the new
+                # waiting lists
+                waiting = {kept_url: dict(self.waiting.get(kept_url, {})) for kept_url in self.touched}
+                for position, (prepared_change, nodes) in enumerate(operations):
+                    last = position == len(operations) - 1
+                    self.chunked.put((prepared_change, nodes, offset if last else None, waiting if last else {}))
+        finally:
+            self.chunked.put(_STOP)
+
+    def _prepare_change(self, change):
+        """
+        Turn one change into index operations.
+
+        Args:
+            change (dict): Change with type, url and record
+
+        Returns:
+            list: (change, nodes) pairs where nodes replace the URL's
+                documents, None deletes them and an empty list is a no-op
+        """
+        url = change.get('url')
+        if change.get('type') == 'removed':
+            operations = [(change, None)]
+            # Articles dropped as duplicates of this one take its place,
+            # e.g. when an article moved to a new URL
+            waiting = list(self.waiting.get(url, {}).values())
+            for waiting_change in waiting:
+                operations.append((waiting_change, self._chunk(waiting_change, check_duplicates=False)))
+            self.indexed_urls.discard(url)
+            self._release(url)
+            for waiting_change in waiting:
+                self.held_by.pop(waiting_change.get('url'), None)
+            if self.waiting.pop(url, None) is not None:
+                self.touched.add(url)
+            return operations
+        # A newer version replaces the one held back, if any
+        self._release(url)
+        return [(change, self._chunk(change))]
+
+    def _hold(self, kept_url, change):
+        """Hold back a change as a duplicate of an indexed URL."""
+        url = change.get('url')
+        self._release(url)
+        self.waiting.setdefault(kept_url, {})[url] = change
+        self.held_by[url] = kept_url
+        self.touched.add(kept_url)
+
+    def _release(self, url):
+        """Drop the change held back for a URL, if there is one."""
+        kept_url = self.held_by.pop(url, None)
+        if kept_url is None:
+            return
+        waiting = self.waiting.get(kept_url, {})
+        waiting.pop(url, None)
+        if not waiting:
+            self.waiting.pop(kept_url, None)
+        self.touched.add(kept_url)
+
+    def _chunk(self, change, check_duplicates=True):
+        """
+        Clean, dedup and chunk the record of an added or updated article.
+
+        Args:
+            change (dict): Change with type, url and record
+            check_duplicates (bool): Drop articles repeating another URL
+
+        Returns:
+            list: Nodes to index, empty if the article is dropped
+        """
+        url = change.get('url')
+        record = change.get('record')
+        if not isinstance(record, dict):
+            record = {}
+        question = re.sub(r'\s+', ' ', str(record.get('question') or '')).strip()
+        answer = re.sub(r'\s+', ' ', str(record.get('answer') or '')).strip()
+        if not url or not question or not answer:
+            self.stats['skipped'] += 1
+            return []
+
+        is_new = self.deduplicator.add({'question': question, 'answer': answer, 'url': url})
+        # Only the FAQ it duplicates is needed, and updates of indexed URLs
+        # would otherwise grow the dropped list forever
+        kept = None if is_new else self.deduplicator.dropped.pop()['kept']
+        # New articles repeating one already indexed under another URL are
+        # held back; changes to indexed URLs always replace their documents
+        if check_duplicates and not is_new and url not in self.indexed_urls:
+            kept_url = kept.get('url')
+            if kept_url and kept_url != url:
+                self._hold(kept_url, change)
+            self.stats['duplicates'] += 1
+            return []
+        self.indexed_urls.add(url)
+
+        document = Document(
+            text=answer,
+            id_=url,
+            metadata={
+                'question': question,
+                'category': record.get('category', ''),
+                'url': url,
+                'knowledge_base': self.knowledge_base
+            }
+        )
+        return self.splitter.get_nodes_from_documents([document])
+
+    def _embed(self):
+        """Batch embedding stage."""
+        batch = []
+        batch_nodes = 0
+        stopping = stopped = False
+        while not stopping:
+            try:
+                item = self.chunked.get(timeout=self.batch_wait if batch else None)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                stopping = True
+            elif item is not None:
+                if stopped:
+                    continue
+                batch.append(item)
+                batch_nodes += len(item[1] or [])
+                # Keep collecting while more changes are already waiting
+                if batch_nodes < self.batch_size and not self.chunked.empty():
+                    continue
+                if batch_nodes < self.batch_size and len(batch) < self.batch_size:
+                    continue
+
+            if batch:
+                stopped = not self._embed_batch(batch)
+                for prepared in batch:
+                    # Stopped mid-batch: pass on only the changes before the
+                    # first one left without embeddings
+                    if any(node.embedding is None for node in prepared[1] or []):
+                        break
+                    self.embedded.put(prepared)
+                batch = []
+                batch_nodes = 0
+        self.embedded.put(_STOP)
+
+    def _embed_batch(self, batch):
+        """
+        Embed the nodes of several changes in as few requests as possible.
+
+        Failed requests, e.g. rate limited ones, are retried until they
+        succeed or the pipeline is stopped.
+
+        Args:
+            batch (list): (change, nodes, offset, waiting) items
+
+        Returns:
+            bool: True if every node was embedded
+        """
+        nodes = [node for _, item_nodes, _, _ in batch for node in item_nodes or [] if node.embedding is None]
+        for start in range(0, len(nodes), self.batch_size):
+            chunk = nodes[start:start + self.batch_size]
+            texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in chunk]
+            ok, embeddings = self._retry(lambda: Settings.embed_model.get_text_embedding_batch(texts),
+                                         f"embedding {len(chunk)} nodes")
+            if not ok:
+                return False
+            for node, embedding in zip(chunk, embeddings):
+                node.embedding = embedding
+            self.stats['embedded_nodes'] += len(chunk)
+            self.stats['embedding_batches'] += 1
+        return True
+
+    def _insert(self):
+        """Live index insert stage."""
+        try:
+            self._insert_changes()
+        finally:
+            rag_system.unpin(self.knowledge_base)
+        logger.info(f"Ingest pipeline for '{self.knowledge_base}' stopped: {self.stats}")
+
+    def _insert_changes(self):
+        """Apply embedded changes and save progress until the stop marker."""
+        last_persist = time.time()
+        dirty = stopped = False
+        offset = saved_offset = None
+        while True:
+            pending = offset != saved_offset
+            try:
+                # Save once the stream has been quiet for persist_interval
+                item = self.embedded.get(timeout=self.persist_interval if pending else None)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP or item is None:
+                if pending and self._persist(offset, dirty):
+                    saved_offset, dirty, last_persist = offset, False, time.time()
+                if item is _STOP:
+                    break
+                continue
+
+            if stopped:
+                continue
+            change, nodes, item_offset, waiting = item
+            ok, changed = self._retry(lambda: self._apply(change, nodes), f"indexing change for {change.get('url')}")
+            if not ok:
+                stopped = True
+                continue
+            dirty = changed or dirty
+            for kept_url, changes in waiting.items():
+                if changes:
+                    self.applied_waiting[kept_url] = changes
+                else:
+                    self.applied_waiting.pop(kept_url, None)
+            if item_offset is not None:
+                offset = item_offset
+
+            # Under a steady stream, still save every persist_interval
+            if time.time() - last_persist >= self.persist_interval and self.embedded.empty():
+                if self._persist(offset, dirty):
+                    saved_offset, dirty, last_persist = offset, False, time.time()
+
+    def _apply(self, change, nodes):
+        """
+        Apply one prepared change to the live index, raising any error.
+
+        Returns:
+            bool: True if the index changed
+        """
+        url = change.get('url')
+        if nodes is None:
+            if rag_system.delete_url(self.knowledge_base, url):
+                self.stats['removed'] += 1
+                logger.info(f"Removed {url} from '{self.knowledge_base}'")
+                return True
+            return False
+        if not nodes:
+            return False
+
+        replaced = rag_system.upsert_nodes(self.knowledge_base, url, nodes)
+        self.stats['updated' if replaced else 'added'] += 1
+        logger.info(f"{'Updated' if replaced else 'Added'} {url} in '{self.knowledge_base}'")
+        return True
+
+    def _persist(self, offset, dirty):
+        """
+        Save the index if it changed, then the feed offset it covers.
+
+        Returns:
+            bool: True if saved
+        """
+        try:
+            if dirty and not rag_system.persist(self.knowledge_base):
+                raise RuntimeError("index is not loaded, its unsaved changes are replayed on restart")
+            self.save_offset(offset, self.applied_waiting)
+            self.stats['offset'] = offset
+            self.stats['persisted_at'] = time.time()
+            return True
+        except Exception as e:
+            logger.error(f"Error saving ingest progress for '{self.knowledge_base}': {e}")
+            self.stats['errors'] += 1
+            return False
+
+# Running pipelines by knowledge base
+ingest_pipelines = {}
+
+def start_ingest_pipelines():
+    """
+    Start a pipeline for every knowledge base with a change feed.
+
+    Returns:
+        dict: Pipelines by knowledge base name
+    """
+    for name, definition in knowledge_base_registry.knowledge_bases.items():
+        feed_path = definition.get('change_feed')
+        if feed_path and name not in ingest_pipelines:
+            pipeline = IngestPipeline(name, feed_path)
+            pipeline.start()
+            ingest_pipelines[name] = pipeline
+    return ingest_pipelines
+
+def main():
+    """Apply a change feed to the saved index of a knowledge base and exit."""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Index scraper changes into a knowledge base')
+    parser.add_argument('--knowledge-base', '-k', help='Knowledge base (default: the default knowledge base)')
+    parser.add_argument('--feed', help="Change feed (default: the knowledge base's change_feed)")
+    parser.add_argument('--from-start', action='store_true', help='Replay the whole feed instead of resuming')
+    parser.add_argument('--follow', action='store_true', help='Keep watching the feed for new changes')
+    args = parser.parse_args()
+
+    definition = knowledge_base_registry.get(args.knowledge_base)
+    feed_path = args.feed or definition.get('change_feed')
+    if not feed_path:
+        parser.error(f"Knowledge base '{definition['name']}' has no change feed, pass --feed")
+
+    Config.setup_directories()
+    pipeline = IngestPipeline(definition['name'], feed_path)
+    if args.from_start:
+        pipeline.save_offset(0)
+
+    pipeline.start(follow=args.follow)
+    try:
+        pipeline.join()
+    except KeyboardInterrupt:
+        pipeline.stop()
+    print(json.dumps(pipeline.status(), indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import os
+import json
+import logging
+from config import Config
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class KnowledgeBaseRegistry:
+    """
+    Keeps track of the named knowledge bases the assistant can answer from.
+    """
+    def __init__(self):
+        """Initialize the registry from the config and optional JSON file."""
+        self.knowledge_bases = {}
+        self.reload()
+
+    def reload(self):
+        """
+        Reload knowledge base definitions.
+
+        Returns:
+            int: Number of registered knowledge bases
+        """
+        knowledge_bases = {}
+        for name, definition in Config.KNOWLEDGE_BASES.items():
+            knowledge_bases[name] = dict(definition)
+
+        if Config.KNOWLEDGE_BASES_FILE:
+            try:
+                with open(Config.KNOWLEDGE_BASES_FILE, 'r', encoding='utf-8') as f:
+                    for name, definition in json.load(f).items():
+                        knowledge_bases[name] = dict(definition)
+            except Exception as e:
+                logger.error(f"Error loading knowledge bases from {Config.KNOWLEDGE_BASES_FILE}: {e}")
+
+        self.knowledge_bases = knowledge_bases
+        logger.info(f"Registered {len(knowledge_bases)} knowledge bases")
+        return len(knowledge_bases)
+
+    def resolve(self, name=None):
+        """
+        Resolve a knowledge base name, falling back to the default.
+
+        Args:
+            name (str, optional): Knowledge base name
+
+        Returns:
+            str: The resolved knowledge base name
+
+        Raises:
+            KeyError: If the knowledge base is not registered
+        """
+        name = name or Config.DEFAULT_KNOWLEDGE_BASE
+        if name not in self.knowledge_bases:
+            raise KeyError(f"Unknown knowledge base: {name}")
+        return name
+
+    def get(self, name=None):
+        """
+        Get the definition of a knowledge base.
+
+        Args:
+            name (str, optional): Knowledge base name
+
+        Returns:
+            dict: Knowledge base definition including its name
+        """
+        name = self.resolve(name)
+        definition = dict(self.knowledge_bases[name])
+        definition['name'] = name
+        return definition
+
+    def exists(self, name):
+        """Check if a knowledge base is registered."""
+        return name in self.knowledge_bases
+
+    def list(self):
+        """
+        List all registered knowledge bases.
+
+        Returns:
+            list: Knowledge base names and descriptions
+        """
+        return [
+            {
+                'name': name,
+                'description': definition.get('description', ''),
+                'default': name == Config.DEFAULT_KNOWLEDGE_BASE
+            }
+            for name, definition in self.knowledge_bases.items()
+        ]
+
+    def index_path(self, name=None):
+        """
+        Get the storage directory for a knowledge base index.
+
+        The default knowledge base keeps using the legacy storage/index
+        directory if it was built before knowledge bases existed.
+
+        Args:
+            name (str, optional): Knowledge base name
+
+        Returns:
+            str: Path to the persisted index
+        """
+        name = self.resolve(name)
+        index_path = os.path.join(Config.STORAGE_DIR, name)
+
+        legacy_path = os.path.join(Config.STORAGE_DIR, "index")
+        if (name == Config.DEFAULT_KNOWLEDGE_BASE and not os.path.exists(index_path)
+                and os.path.exists(legacy_path) and os.listdir(legacy_path)):
+            return legacy_path
+
+        return index_path
+
+# Create a singleton instance
+knowledge_base_registry = KnowledgeBaseRegistry()
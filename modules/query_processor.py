@@ -1,7 +1,10 @@
 import logging
+import threading
 import openai
+import tiktoken
 from config import Config
 from modules.rag_system import rag_system
+from modules.knowledge_base import knowledge_base_registry
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -15,13 +18,30 @@ class QueryProcessor:
         """Initialize the query processor."""
         # Set OpenAI API key
         openai.api_key = Config.OPENAI_API_KEY
+        
+        # Shared OpenAI client, created on first use
+        self.client = None
+        self.client_lock = threading.Lock()
     
-    def process_query(self, query_text):
+    def get_client(self):
+        """
+        Get the shared OpenAI client.
+        
+        Returns:
+            openai.OpenAI: The client, reusing one connection pool
+        """
+        with self.client_lock:
+            if self.client is None:
+                self.client = openai.OpenAI(api_key=Config.OPENAI_API_KEY, base_url=Config.OPENAI_BASE_URL)
+            return self.client
+    
+    def process_query(self, query_text, knowledge_base=None):
         """
         Process a user query and generate a response.
         
         Args:
             query_text (str): The user's query text
+            knowledge_base (str, optional): Knowledge base to answer from
             
         Returns:
             str: The response to the query
@@ -30,12 +50,12 @@ class QueryProcessor:
             logger.info(f"Processing query: {query_text}")
             
             # Query the RAG system
-            rag_response = rag_system.query(query_text)
+            rag_response = rag_system.query(query_text, knowledge_base)
             
             # Check if the RAG system provided a meaningful response
-            if not rag_response or rag_response.strip() == "" or "I don't know" in rag_response.lower():
+            if not self._is_meaningful(rag_response):
                 logger.info("No specific information found in knowledge base. Using OpenAI...")
-                response = self.fallback_to_openai(query_text)
+                response = self.fallback_to_openai(query_text, knowledge_base)
             else:
                 response = rag_response
             
@@ -45,44 +65,156 @@ class QueryProcessor:
             logger.error(f"Error processing query: {e}")
             return "I'm sorry, I encountered an error while processing your question."
     
-    def fallback_to_openai(self, query_text):
+    def answer(self, query_text, knowledge_base=None):
+        """
+        Answer a query and report where the answer came from and its token usage.
+        Unlike process_query(), rate limit and fallback errors are raised so
+        callers such as the batch processor can back off and retry.
+        
+        Args:
+            query_text (str): The user's query text
+            knowledge_base (str, optional): Knowledge base to answer from
+            
+        Returns:
+            dict: 'text', 'source' ('rag' or 'fallback') and 'usage'
+        """
+        try:
+            rag_response = rag_system.query_response(query_text, knowledge_base)
+        except Exception as e:
+            if is_rate_limit_error(e):
+                raise
+            logger.error(f"Error querying RAG system: {e}")
+            rag_response = None
+        
+        rag_text = rag_response.response if rag_response is not None else None
+        if self._is_meaningful(rag_text):
+            context = [node.get_content() for node in getattr(rag_response, 'source_nodes', None) or []]
+            return {
+                'text': rag_text,
+                'source': 'rag',
+                'usage': self.estimate_usage(query_text, context, rag_text)
+            }
+        
+        response = self._create_chat_completion(query_text, knowledge_base)
+        usage = getattr(response, 'usage', None)
+        return {
+            'text': response.choices[0].message.content,
+            'source': 'fallback',
+            'usage': {
+                'prompt_tokens': getattr(usage, 'prompt_tokens', 0),
+                'completion_tokens': getattr(usage, 'completion_tokens', 0),
+                'total_tokens': getattr(usage, 'total_tokens', 0),
+                'estimated': False
+            }
+        }
+    
+    def _is_meaningful(self, rag_response):
+        """Check if the RAG system produced a usable answer."""
+        return bool(rag_response) and rag_response.strip() != "" and "I don't know" not in rag_response.lower()
+    
+    def estimate_usage(self, query_text, context, response_text):
+        """
+        Estimate token usage of a RAG answer, since llama-index does not
+        report usage per query.
+        
+        Args:
+            query_text (str): The user's query text
+            context (list): Text of the retrieved source nodes
+            response_text (str): The generated answer
+            
+        Returns:
+            dict: Estimated prompt, completion and total tokens
+        """
+        try:
+            encoding = tiktoken.encoding_for_model(Config.FALLBACK_MODEL)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+        
+        prompt_tokens = len(encoding.encode(query_text)) + sum(len(encoding.encode(text)) for text in context)
+        completion_tokens = len(encoding.encode(response_text or ""))
+        return {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+            'estimated': True
+        }
+    
+    def get_system_prompt(self, knowledge_base=None):
+        """
+        Build the fallback system prompt for a knowledge base.
+        
+        Args:
+            knowledge_base (str, optional): Knowledge base name
+            
+        Returns:
+            str: The system prompt
+        """
+        description = knowledge_base_registry.get(knowledge_base).get('description') or 'the user\'s topic'
+        return f"You are a helpful assistant that answers questions about {description}."
+    
+    def _create_chat_completion(self, query_text, knowledge_base=None):
+        """
+        Ask the fallback model directly, raising any API error.
+        
+        Args:
+            query_text (str): The user's query text
+            knowledge_base (str, optional): Knowledge base the query was for
+            
+        Returns:
+            The chat completion response
+        """
+        messages = [
+            {"role": "system", "content": self.get_system_prompt(knowledge_base)},
+            {"role": "user", "content": query_text}
+        ]
+        
+        # Try newer OpenAI client format (v1.0.0+)
+        try:
+            return self.get_client().chat.completions.create(
+                model=Config.FALLBACK_MODEL,
+                messages=messages
+            )
+        except AttributeError:
+            # Fall back to older format (pre-v1.0.0)
+            return openai.ChatCompletion.create(
+                model=Config.FALLBACK_MODEL,
+                messages=messages
+            )
+    
+    def fallback_to_openai(self, query_text, knowledge_base=None):
         """
         Fallback to OpenAI if RAG doesn't have an answer.
         
         Args:
             query_text (str): The user's query text
+            knowledge_base (str, optional): Knowledge base the query was for
             
         Returns:
             str: The response from OpenAI
         """
         try:
             logger.info(f"Falling back to OpenAI for query: {query_text}")
-            
-            # Try newer OpenAI client format (v1.0.0+)
-            try:
-                client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
-                response = client.chat.completions.create(
-                    model=Config.FALLBACK_MODEL,
-                    messages=[
-                        {"role": "system", "content": "You are a helpful assistant that answers questions about Wise money transfers."},
-                        {"role": "user", "content": query_text}
-                    ]
-                )
-                return response.choices[0].message.content
-            except AttributeError:
-                # Fall back to older format (pre-v1.0.0)
-                response = openai.ChatCompletion.create(
-                    model=Config.FALLBACK_MODEL,
-                    messages=[
-                        {"role": "system", "content": "You are a helpful assistant that answers questions about Wise money transfers."},
-                        {"role": "user", "content": query_text}
-                    ]
-                )
-                return response.choices[0].message.content
+            response = self._create_chat_completion(query_text, knowledge_base)
+            return response.choices[0].message.content
                 
         except Exception as e:
             logger.error(f"Error calling OpenAI API: {e}")
             return "I'm sorry, I'm having trouble connecting to my knowledge base."
 
+def is_rate_limit_error(error):
+    """
+    Check if an exception was caused by an upstream rate limit.
+    
+    Args:
+        error (Exception): The exception to check
+        
+    Returns:
+        bool: True for OpenAI rate limit errors and HTTP 429 responses
+    """
+    rate_limit_error = getattr(openai, 'RateLimitError', None)
+    if rate_limit_error is not None and isinstance(error, rate_limit_error):
+        return True
+    return "429" in str(error)
+
 # Create a singleton instance
-query_processor = QueryProcessor()
\ No newline at end of file
+query_processor = QueryProcessor()
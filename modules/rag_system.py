@@ -1,11 +1,17 @@
 import os
 import logging
+import threading
+from collections import OrderedDict
 from llama_index.core import VectorStoreIndex, Settings
-from llama_index.core.schema import Document
+from llama_index.core.schema import Document, QueryBundle
 from llama_index.core.node_parser import SimpleFileNodeParser
 from llama_index.llms.openai import OpenAI
+from llama_index.embeddings.openai import OpenAIEmbedding
 import pandas as pd
 from config import Config
+from modules.knowledge_base import knowledge_base_registry
+from utils.dedup import FaqDeduplicator
+from utils.rw_lock import ReadWriteLock
 import time
 import random
 from llama_index.core import load_index_from_storage, StorageContext
@@ -16,127 +22,447 @@ logger = logging.getLogger(__name__)
 class RAGSystem:
     """
     Retrieval Augmented Generation (RAG) system for answering queries
-    using a vector store index.
+    using one vector store index per knowledge base.
+
+    Indexes are loaded lazily and kept in an LRU bounded by
+    Config.MAX_LOADED_INDEXES and Config.INDEX_MEMORY_LIMIT_MB. All indexes
+    share the same LLM and embedding clients through llama-index Settings.
+    Each index has a read-write lock: retrieval reads under it, while
+    loading and live updates from the ingest pipeline write under it.
     """
     def __init__(self):
         """Initialize the RAG system."""
-        self.query_engine = None
-        
-    def setup(self):
-        """Set up the RAG system by loading or creating the vector index."""
+        self.settings_configured = False
+        self.loaded_indexes = OrderedDict()
+        self.index_locks = {}
+        # Pin counts of knowledge bases that must not be unloaded
+        self.pinned = {}
+        self.lock = threading.RLock()
+
+    def setup(self, knowledge_base=None):
+        """
+        Set up the RAG system by loading or creating the vector index
+        of a knowledge base.
+
+        Args:
+            knowledge_base (str, optional): Knowledge base name. Defaults to
+                Config.DEFAULT_KNOWLEDGE_BASE.
+
+        Returns:
+            bool: True if successful
+        """
         try:
-        # Configure the global settings
-            Settings.llm = OpenAI(api_key=Config.OPENAI_API_KEY)
-            Settings.node_parser = SimpleFileNodeParser()
-        
-        # Check if the index already exists
-            index_path = os.path.join(Config.STORAGE_DIR, "index")
-            if os.path.exists(index_path) and os.listdir(index_path):
-                logger.info(f"Loading existing index from {index_path}")
-            
-            # Load the existing index
-                storage_context = StorageContext.from_defaults(
-                    persist_dir=index_path
-                )
-            
-                index = load_index_from_storage(
-                    storage_context=storage_context
-                )
-                logger.info("Successfully loaded existing index")
-            else:
-            # Create a fresh index from CSV data
-                logger.info("Creating new index from CSV data...")
-            
-            # Check if CSV file exists
-                if not os.path.exists(Config.CSV_PATH):
-                    logger.error(f"CSV file not found at {Config.CSV_PATH}")
-                    raise FileNotFoundError(f"CSV file not found at {Config.CSV_PATH}")
-            
-            # Load CSV data into a DataFrame
-                df = pd.read_csv(Config.CSV_PATH)
-                logger.info(f"Loaded {len(df)} rows from CSV")
-            
-            # Create documents from DataFrame rows in batches
-                batch_size = 10  # Process 10 documents at a time
-                documents = []
-            
-                for index, row in df.iterrows():
-                    try:
-                        doc = Document(
-                            text=row['answer'],
-                            metadata={
-                                'question': row['question'], 
-                                'category': row.get('category', ''), 
-                                'url': row.get('url', '')
-                            }
-                        )
-                        documents.append(doc)
-                    except Exception as e:
-                        logger.warning(f"Error creating document for row {index}: {e}")
-                
-                # Process in batches with rate limiting
-                    if len(documents) % batch_size == 0:
-                        logger.info(f"Processed {len(documents)} documents so far")
-                    # Add a short delay to respect rate limits
-                        time.sleep(2)  # 2 second pause between batches
-            
-                logger.info(f"Created {len(documents)} documents")
-            
-            # Use exponential backoff for creating the index
-                max_retries = 5
-                for attempt in range(max_retries):
-                    try:
-                    # Create a new index from documents
-                        index = VectorStoreIndex.from_documents(documents)
-                    
-                    # Save the index
-                        if not os.path.exists(Config.STORAGE_DIR):
-                            os.makedirs(Config.STORAGE_DIR)
-                    
-                        index.storage_context.persist(persist_dir=index_path)
-                        logger.info(f"Saved index to {index_path}")
-                        break  # Success, exit the retry loop
-                    except Exception as e:
-                        if "429" in str(e) and attempt < max_retries - 1:
-                        # Calculate wait time with exponential backoff
-                            wait_time = (2 ** attempt) + (random.random() * 2)
-                            logger.warning(f"Rate limited, waiting {wait_time:.2f} seconds (attempt {attempt+1}/{max_retries})...")
-                            time.sleep(wait_time)
-                        else:
-                        # Re-raise on final attempt
-                            logger.error(f"Failed to create index after {max_retries} attempts")
-                            raise
-        
-        # Initialize the query engine
-            self.query_engine = index.as_query_engine()
-        
+            self._configure_settings()
+            self.get_query_engine(knowledge_base)
             return True
-    
         except Exception as e:
             logger.error(f"Error setting up RAG system: {e}")
             raise
-    
-    def query(self, user_query):
+
+    def _configure_settings(self):
+        """Configure the LLM and embedding clients shared by all indexes."""
+        with self.lock:
+            if self.settings_configured:
+                return
+
+            Settings.llm = OpenAI(api_key=Config.OPENAI_API_KEY, api_base=Config.OPENAI_BASE_URL)
+            Settings.embed_model = OpenAIEmbedding(api_key=Config.OPENAI_API_KEY, api_base=Config.OPENAI_BASE_URL)
+            Settings.node_parser = SimpleFileNodeParser()
+            self.settings_configured = True
+
+    def get_query_engine(self, knowledge_base=None):
+        """
+        Get the query engine of a knowledge base, loading its index if needed.
+
+        Args:
+            knowledge_base (str, optional): Knowledge base name
+
+        Returns:
+            BaseQueryEngine: The query engine for the knowledge base
+        """
+        name = knowledge_base_registry.resolve(knowledge_base)
+
+        with self.lock:
+            if name in self.loaded_indexes:
+                self.loaded_indexes.move_to_end(name)
+                return self.loaded_indexes[name]['query_engine']
+            index_lock = self.index_locks.setdefault(name, ReadWriteLock())
+
+        # Load outside the global lock so other knowledge bases stay available
+        with index_lock.write():
+            with self.lock:
+                if name in self.loaded_indexes:
+                    self.loaded_indexes.move_to_end(name)
+                    return self.loaded_indexes[name]['query_engine']
+
+            self._configure_settings()
+            index, size = self._load_or_build_index(name)
+            query_engine = index.as_query_engine()
+
+            with self.lock:
+                self.loaded_indexes[name] = {
+                    'index': index,
+                    'query_engine': query_engine,
+                    'size': size,
+                    'loaded_at': time.time()
+                }
+                self._evict_indexes(keep=name)
+
+            return query_engine
+
+    def _load_or_build_index(self, name):
+        """
+        Load a persisted index or build it from the knowledge base CSV.
+
+        Args:
+            name (str): Knowledge base name
+
+        Returns:
+            tuple: (VectorStoreIndex, estimated size in bytes)
+        """
+        index_path = knowledge_base_registry.index_path(name)
+
+        if os.path.exists(index_path) and os.listdir(index_path):
+            logger.info(f"Loading existing index for '{name}' from {index_path}")
+            storage_context = StorageContext.from_defaults(
+                persist_dir=index_path
+            )
+            index = load_index_from_storage(
+                storage_context=storage_context
+            )
+            logger.info(f"Successfully loaded existing index for '{name}'")
+        else:
+            index = self._build_index(name, index_path)
+
+        return index, self._get_index_size(index_path)
+
+    def _build_index(self, name, index_path):
+        """
+        Create a fresh index from the CSV data of a knowledge base.
+
+        Args:
+            name (str): Knowledge base name
+            index_path (str): Directory to persist the index to
+
+        Returns:
+            VectorStoreIndex: The new index
+        """
+        csv_path = knowledge_base_registry.get(name)['csv_path']
+        logger.info(f"Creating new index for '{name}' from CSV data...")
+
+        # Check if CSV file exists
+        if not os.path.exists(csv_path):
+            logger.error(f"CSV file not found at {csv_path}")
+            raise FileNotFoundError(f"CSV file not found at {csv_path}")
+
+        # Load CSV data into a DataFrame
+        df = pd.read_csv(csv_path)
+        logger.info(f"Loaded {len(df)} rows from CSV")
+
+        # Duplicate FAQs would only cost embedding calls and bloat the index
+        deduplicator = FaqDeduplicator()
+        keep = [deduplicator.add({'question': str(row['question']), 'answer': str(row['answer'])})
+                for _, row in df.iterrows()]
+        df = df[pd.Series(keep, index=df.index, dtype=bool)]
+        counts = deduplicator.counts()
+        if counts['exact'] or counts['near']:
+            logger.info(f"Dropped {counts['exact']} exact and {counts['near']} near-duplicate rows from {csv_path}")
+
+        # Create documents from DataFrame rows in batches
+        batch_size = 10  # Process 10 documents at a time
+        documents = []
+
+        for row_index, row in df.iterrows():
+            try:
+                doc = Document(
+                    text=row['answer'],
+                    metadata={
+                        'question': row['question'],
+                        'category': row.get('category', ''),
+                        'url': row.get('url', ''),
+                        'knowledge_base': name
+                    }
+                )
+                documents.append(doc)
+            except Exception as e:
+                logger.warning(f"Error creating document for row {row_index}: {e}")
+
+            # Process in batches with rate limiting
+            if len(documents) % batch_size == 0:
+                logger.info(f"Processed {len(documents)} documents so far")
+                # Add a short delay to respect rate limits
+                time.sleep(2)  # 2 second pause between batches
+
+        logger.info(f"Created {len(documents)} documents")
+
+        # Use exponential backoff for creating the index
+        max_retries = 5
+        for attempt in range(max_retries):
+            try:
+                # Create a new index from documents
+                index = VectorStoreIndex.from_documents(documents)
+
+                # Save the index
+                os.makedirs(index_path, exist_ok=True)
+                index.storage_context.persist(persist_dir=index_path)
+                logger.info(f"Saved index to {index_path}")
+                return index
+            except Exception as e:
+                if "429" in str(e) and attempt < max_retries - 1:
+                    # Calculate wait time with exponential backoff
+                    wait_time = (2 ** attempt) + (random.random() * 2)
+                    logger.warning(f"Rate limited, waiting {wait_time:.2f} seconds (attempt {attempt+1}/{max_retries})...")
+                    time.sleep(wait_time)
+                else:
+                    # Re-raise on final attempt
+                    logger.error(f"Failed to create index after {max_retries} attempts")
+                    raise
+
+    def _get_index_size(self, index_path):
+        """
+        Estimate the memory footprint of an index from its persisted files.
+
+        Args:
+            index_path (str): Directory of the persisted index
+
+        Returns:
+            int: Size in bytes
+        """
+        total = 0
+        for root, _, files in os.walk(index_path):
+            for filename in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, filename))
+                except OSError:
+                    pass
+        return total
+
+    def _evict_indexes(self, keep=None):
+        """
+        Unload least recently used indexes that exceed the configured limits.
+        Pinned indexes are never unloaded. Must be called with self.lock held.
+
+        Args:
+            keep (str, optional): Knowledge base that must stay loaded
+        """
+        memory_limit = Config.INDEX_MEMORY_LIMIT_MB * 1024 * 1024
+
+        while len(self.loaded_indexes) > 1:
+            total_size = sum(entry['size'] for entry in self.loaded_indexes.values())
+            if len(self.loaded_indexes) <= Config.MAX_LOADED_INDEXES and total_size <= memory_limit:
+                break
+
+            name = next((name for name in self.loaded_indexes if name != keep and name not in self.pinned), None)
+            if name is None:
+                break
+
+            del self.loaded_indexes[name]
+            logger.info(f"Unloaded index for '{name}' (LRU eviction)")
+
+    def get_index(self, knowledge_base=None):
+        """
+        Get the index of a knowledge base, loading it if needed.
+
+        Args:
+            knowledge_base (str, optional): Knowledge base name
+
+        Returns:
+            tuple: (knowledge base name, VectorStoreIndex)
+        """
+        name = knowledge_base_registry.resolve(knowledge_base)
+        while True:
+            self.get_query_engine(name)
+            with self.lock:
+                # May have been evicted in between
+                if name in self.loaded_indexes:
+                    return name, self.loaded_indexes[name]['index']
+
+    def get_documents(self, knowledge_base=None):
+        """
+        Get the FAQs stored in the index of a knowledge base.
+
+        Args:
+            knowledge_base (str, optional): Knowledge base name
+
+        Returns:
+            dict: Document id to dict with question, answer and url
+        """
+        name, index = self.get_index(knowledge_base)
+        with self.index_locks[name].read():
+            documents = {}
+            for ref_doc_id, info in index.ref_doc_info.items():
+                nodes = index.docstore.get_nodes(info.node_ids, raise_error=False)
+                documents[ref_doc_id] = {
+                    'question': info.metadata.get('question', ''),
+                    'answer': ' '.join(node.get_content() for node in nodes if node is not None),
+                    'url': info.metadata.get('url', '')
+                }
+            return documents
+
+    def upsert_nodes(self, knowledge_base, url, nodes):
+        """
+        Replace the documents of a URL in a live index with new nodes.
+
+        The nodes are inserted into the loaded index, so queries see them
+        immediately. Nodes that already carry an embedding are not embedded
+        again.
+
+        Args:
+            knowledge_base (str): Knowledge base name
+            url (str): Source URL of the document
+            nodes (list): Nodes of the new document
+
+        Returns:
+            int: Number of documents replaced
+        """
+        name, index = self.get_index(knowledge_base)
+        with self.index_locks[name].write():
+            replaced = self._delete_url(index, url)
+            index.insert_nodes(nodes)
+            return replaced
+
+    def delete_url(self, knowledge_base, url):
+        """
+        Delete the documents of a URL from a live index.
+
+        Args:
+            knowledge_base (str): Knowledge base name
+            url (str): Source URL of the documents
+
+        Returns:
+            int: Number of documents deleted
+        """
+        name, index = self.get_index(knowledge_base)
+        with self.index_locks[name].write():
+            return self._delete_url(index, url)
+
+    def _delete_url(self, index, url):
+        """Delete the documents with a URL, whatever their ids. Must hold the index write lock."""
+        ref_doc_ids = [ref_doc_id for ref_doc_id, info in index.ref_doc_info.items()
+                       if ref_doc_id == url or info.metadata.get('url') == url]
+        for ref_doc_id in ref_doc_ids:
+            index.delete_ref_doc(ref_doc_id, delete_from_docstore=True)
+        return len(ref_doc_ids)
+
+    def persist(self, knowledge_base=None):
+        """
+        Save a loaded index to its storage directory.
+
+        Args:
+            knowledge_base (str, optional): Knowledge base name
+
+        Returns:
+            bool: True if the index was loaded and saved
+        """
+        name = knowledge_base_registry.resolve(knowledge_base)
+        with self.lock:
+            entry = self.loaded_indexes.get(name)
+        if entry is None:
+            return False
+
+        index_path = knowledge_base_registry.index_path(name)
+        with self.index_locks[name].write():
+            os.makedirs(index_path, exist_ok=True)
+            entry['index'].storage_context.persist(persist_dir=index_path)
+        entry['size'] = self._get_index_size(index_path)
+        logger.info(f"Saved index for '{name}' to {index_path}")
+        return True
+
+    def pin(self, knowledge_base):
+        """
+        Keep the index of a knowledge base loaded until unpinned, e.g. while
+        live updates to it are not yet saved.
+
+        Args:
+            knowledge_base (str): Knowledge base name
+        """
+        name = knowledge_base_registry.resolve(knowledge_base)
+        with self.lock:
+            self.pinned[name] = self.pinned.get(name, 0) + 1
+
+    def unpin(self, knowledge_base):
+        """
+        Release a pin taken with pin().
+
+        Args:
+            knowledge_base (str): Knowledge base name
+        """
+        name = knowledge_base_registry.resolve(knowledge_base)
+        with self.lock:
+            if self.pinned.get(name, 0) > 1:
+                self.pinned[name] -= 1
+            else:
+                self.pinned.pop(name, None)
+            self._evict_indexes()
+
+    def unload(self, knowledge_base):
+        """
+        Unload the index of a knowledge base from memory.
+
+        Args:
+            knowledge_base (str): Knowledge base name
+
+        Returns:
+            bool: True if the index was loaded and not pinned
+        """
+        with self.lock:
+            if knowledge_base in self.pinned:
+                return False
+            return self.loaded_indexes.pop(knowledge_base, None) is not None
+
+    def get_loaded_indexes(self):
+        """
+        Get information about the currently loaded indexes.
+
+        Returns:
+            list: Loaded knowledge bases from least to most recently used
+        """
+        with self.lock:
+            return [
+                {'name': name, 'size': entry['size'], 'loaded_at': entry['loaded_at']}
+                for name, entry in self.loaded_indexes.items()
+            ]
+
+    def query_response(self, user_query, knowledge_base=None):
+        """
+        Send a query to the RAG system and get the full response object.
+        Unlike query(), errors are raised to the caller.
+
+        Args:
+            user_query (str): The user's query text
+            knowledge_base (str, optional): Knowledge base to answer from
+
+        Returns:
+            Response: The llama-index response including source nodes
+        """
+        name = knowledge_base_registry.resolve(knowledge_base)
+        query_engine = self.get_query_engine(name)
+        query_bundle = QueryBundle(user_query)
+
+        # Only retrieval touches the index; the LLM call runs after the lock
+        # is released so live updates do not wait on it
+        with self.index_locks[name].read():
+            nodes = query_engine.retrieve(query_bundle)
+        return query_engine.synthesize(query_bundle, nodes)
+
+    def query(self, user_query, knowledge_base=None):
         """
         Send a query to the RAG system and get a response.
-        
+
         Args:
             user_query (str): The user's query text
-            
+            knowledge_base (str, optional): Knowledge base to answer from
+
         Returns:
             str: The response from the RAG system
         """
         try:
-            if not self.query_engine:
-                logger.warning("Query engine not initialized. Setting up RAG system...")
-                self.setup()
-                
             # Get response from RAG system
-            response = self.query_engine.query(user_query)
+            response = self.query_response(user_query, knowledge_base)
             return response.response
         except Exception as e:
             logger.error(f"Error querying RAG system: {e}")
             return None
-            
+
 # Create a singleton instance
 rag_system = RAGSystem()
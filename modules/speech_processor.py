@@ -39,7 +39,7 @@ class SpeechProcessor:
         """
         try:
             try:
-                client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
+                client = openai.OpenAI(api_key=Config.OPENAI_API_KEY, base_url=Config.OPENAI_BASE_URL)
                 with open(audio_file_path, "rb") as audio_file:
                     transcription = client.audio.transcriptions.create(
                         model=Config.STT_MODEL,
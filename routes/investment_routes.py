@@ -1,6 +1,8 @@
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, render_template, request, jsonify, Response, stream_with_context
+import json
 import logging
 from models.investment_model import investment_model
+from models.indicators import SUMMARY_FIELDS
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -8,6 +10,41 @@ logger = logging.getLogger(__name__)
 # Create blueprint
 investment_bp = Blueprint('investment', __name__, url_prefix='/invest')
 
+# Browser cache lifetime of each company section, in seconds
+SECTION_MAX_AGE = {
+    'quote': investment_model.section_ttls['quote'][0],
+    'orderbook': investment_model.section_ttls['tradeInfo'][0],
+    'info': 60 * 60,
+    'history': 5 * 60
+}
+
+# Symbols a single screen request may list
+MAX_SCREEN_SYMBOLS = 1000
+
+# Symbols a single price stream may follow
+MAX_STREAM_SYMBOLS = 20
+
+# Symbols a single batch quote request may ask for
+MAX_BATCH_SYMBOLS = 50
+
+def cached_json_response(payload, max_age):
+    """
+    Build a JSON response with Cache-Control and ETag headers that answers
+    If-None-Match requests with 304 Not Modified.
+    
+    Args:
+        payload (dict): Response body
+        max_age (int): Cache lifetime in seconds
+        
+    Returns:
+        Response: The (possibly 304) response
+    """
+    response = jsonify(payload)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.add_etag()
+    return response.make_conditional(request)
+
 @investment_bp.route('/')
 def index():
     """Investment landing page"""
@@ -21,8 +58,10 @@ def company_details(symbol):
 @investment_bp.route('/api/company/<symbol>')
 def get_company_data(symbol):
     """API endpoint to get company data"""
+    include_history = request.args.get('history', 'true').lower() != 'false'
+    
     try:
-        data = investment_model.get_company_data(symbol.upper())
+        data = investment_model.get_company_data(symbol.upper(), include_history)
         
         if not data:
             return jsonify({
@@ -42,6 +81,213 @@ def get_company_data(symbol):
             'message': str(e)
         }), 500
 
+@investment_bp.route('/api/company/<symbol>/<any(quote, info, orderbook):section>')
+def get_company_section(symbol, section):
+    """API endpoint to get one independently cached section of company data"""
+    try:
+        data = investment_model.get_company_section(symbol.upper(), section)
+        
+        if data is None:
+            return jsonify({
+                'success': False,
+                'message': f"Could not find {section} data for {symbol}"
+            }), 404
+        
+        return cached_json_response({
+            'success': True,
+            'data': data
+        }, SECTION_MAX_AGE[section])
+    
+    except Exception as e:
+        logger.error(f"Error getting company {section}: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@investment_bp.route('/api/company/<symbol>/history')
+def get_company_history(symbol):
+    """API endpoint to get a downsampled price history series for charts"""
+    period = request.args.get('period', '1Y').upper()
+    interval = request.args.get('interval', 'auto')
+    
+    try:
+        max_points = request.args.get('max_points', type=int)
+        data = investment_model.get_history_series(symbol.upper(), period, interval, max_points)
+        
+        if not data:
+            return jsonify({
+                'success': False,
+                'message': f"Could not find history for {symbol}"
+            }), 404
+        
+        return cached_json_response({
+            'success': True,
+            'data': data
+        }, SECTION_MAX_AGE['history'])
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error getting company history: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@investment_bp.route('/api/company/<symbol>/indicators')
+def get_company_indicators(symbol):
+    """API endpoint to get technical indicators computed from price history"""
+    try:
+        data = investment_model.get_indicators(symbol.upper())
+        
+        if not data or not data.get('summary'):
+            return jsonify({
+                'success': False,
+                'message': f"Could not find history for {symbol}"
+            }), 404
+        
+        return cached_json_response({
+            'success': True,
+            'data': data
+        }, SECTION_MAX_AGE['history'])
+    
+    except Exception as e:
+        logger.error(f"Error getting company indicators: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@investment_bp.route('/api/screen')
+def screen_symbols():
+    """
+    API endpoint to screen stored symbols by technical indicators
+    
+    Query parameters: symbols (comma separated, default all stored),
+    min_<field> / max_<field> filters, sort, order ('asc' or 'desc') and
+    limit.
+    """
+    symbols = [symbol.strip().upper() for symbol in request.args.get('symbols', '').split(',') if symbol.strip()]
+    
+    try:
+        if len(symbols) > MAX_SCREEN_SYMBOLS:
+            raise ValueError(f"Too many symbols (max {MAX_SCREEN_SYMBOLS})")
+        
+        filters = {}
+        for field in SUMMARY_FIELDS:
+            minimum = request.args.get(f"min_{field}", type=float)
+            maximum = request.args.get(f"max_{field}", type=float)
+            if minimum is not None or maximum is not None:
+                filters[field] = (minimum, maximum)
+        
+        data = investment_model.screen_symbols(
+            symbols,
+            filters,
+            sort=request.args.get('sort'),
+            descending=request.args.get('order', 'desc').lower() != 'asc',
+            limit=request.args.get('limit', type=int)
+        )
+        
+        return cached_json_response({
+            'success': True,
+            'count': len(data),
+            'data': data
+        }, SECTION_MAX_AGE['history'])
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"Error screening symbols: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@investment_bp.route('/api/quotes', methods=['GET', 'POST'])
+def get_quotes():
+    """
+    API endpoint to get the quotes of many symbols at once
+    
+    Symbols come from ?symbols=A,B or a JSON body {"symbols": [...]}.
+    Results are streamed as NDJSON, one line per symbol as it resolves.
+    """
+    if request.method == 'POST':
+        payload = request.get_json(silent=True) or {}
+        symbols = (payload.get('symbols') or []) if isinstance(payload, dict) else None
+        if not isinstance(symbols, list):
+            return jsonify({
+                'success': False,
+                'message': "Body must be a JSON object with a 'symbols' list"
+            }), 400
+    else:
+        symbols = request.args.get('symbols', '').split(',')
+    symbols = [str(symbol).strip().upper() for symbol in symbols if str(symbol).strip()]
+    
+    if not symbols:
+        return jsonify({
+            'success': False,
+            'message': "No symbols given"
+        }), 400
+    
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        return jsonify({
+            'success': False,
+            'message': f"Too many symbols (max {MAX_BATCH_SYMBOLS})"
+        }), 400
+    
+    def generate():
+        for result in investment_model.get_quotes(symbols):
+            yield json.dumps(result) + '\n'
+    
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@investment_bp.route('/api/stream')
+def stream_quotes():
+    """Server-Sent Events stream of quote changes for the given symbols"""
+    symbols = [symbol.strip().upper() for symbol in request.args.get('symbols', '').split(',') if symbol.strip()]
+    
+    if not symbols:
+        return jsonify({
+            'success': False,
+            'message': "No symbols given"
+        }), 400
+    
+    if len(symbols) > MAX_STREAM_SYMBOLS:
+        return jsonify({
+            'success': False,
+            'message': f"Too many symbols (max {MAX_STREAM_SYMBOLS})"
+        }), 400
+    
+    subscription = investment_model.quote_stream.subscribe(symbols)
+    
+    def generate():
+        try:
+            # Tell the browser how long to wait before reconnecting
+            yield "retry: 5000\n\n"
+            while True:
+                event = subscription.get(timeout=15)
+                if event is None:
+                    # Keep proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: quote\ndata: {json.dumps(event)}\n\n"
+        finally:
+            investment_model.quote_stream.unsubscribe(subscription)
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @investment_bp.route('/api/search')
 def search_companies():
     """API endpoint to search for companies"""
@@ -77,11 +323,11 @@ def get_market_movers():
     try:
         data = investment_model.get_market_movers(category, count)
         
-        return jsonify({
+        return cached_json_response({
             'success': True,
             'category': category,
             'data': data
-        })
+        }, investment_model.market_movers.market_ttl)
     
     except Exception as e:
         logger.error(f"Error getting market movers: {e}")
@@ -1,12 +1,23 @@
 import requests
-from bs4 import BeautifulSoup
 import csv
-import time
 import re
 import logging
 import argparse
 import os
+import threading
 from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+from utils.html_index import HtmlIndex, parse_html
+from utils.crawler import AsyncCrawler, normalize_url
+from utils.dedup import FaqDeduplicator
+from utils.http_client import HttpClient, HostPolicy
+
+# Ids and classes of FAQ sections
+FAQ_CONTAINER_PATTERN = re.compile(r'faq|frequently-asked|questions-answers|q-and-a')
+
+# Links to files that are never FAQ pages
+SKIPPED_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.zip', '.doc', '.docx',
+                      '.xls', '.xlsx', '.ppt', '.pptx', '.mp3', '.mp4', '.css', '.js', '.xml', '.json')
 
 # Set up logging
 logging.basicConfig(
@@ -38,12 +49,23 @@ class GeneralFaqScraper:
             'Accept-Language': 'en-US,en;q=0.9',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
         })
+        # Per-host rate limit that backs off when the site throttles, and
+        # fails fast when it is down
+        self.http = HttpClient(self.session, policy=HostPolicy(rate=5, burst=8, max_wait=30), max_retries=2)
         self.results = []
-        self.domain = urlparse(base_url).netloc
+        # Same spelling of the host as the normalized links it is compared with
+        self.domain = urlparse(normalize_url(base_url) or base_url).netloc
+        
+        # Per-thread page being extracted, used when crawling a whole site
+        self._local = threading.local()
+        
+        # Strategies overlap, so the same FAQ is often found several times
+        self.deduplicator = FaqDeduplicator()
+        self.dedup_report_file = f"{os.path.splitext(output_file)[0]}_dedup.csv"
         
     def fetch_page(self, url=None):
         """
-        Fetch the page content with error handling and retries.
+        Fetch the page content, retrying within the host's rate limit.
         
         Args:
             url (str, optional): URL to fetch, defaults to base_url if not provided
@@ -54,25 +76,16 @@ class GeneralFaqScraper:
         if url is None:
             url = self.base_url
             
-        max_retries = 3
-        retry_count = 0
-        
-        while retry_count < max_retries:
-            try:
-                logger.info(f"Fetching URL: {url}")
-                response = self.session.get(url, timeout=30)
-                response.raise_for_status()
-                
-                # Create BeautifulSoup object
-                return BeautifulSoup(response.text, 'html.parser')
-            except requests.exceptions.RequestException as e:
-                retry_count += 1
-                wait_time = 2 ** retry_count  # Exponential backoff
-                logger.warning(f"Error fetching {url}: {e}. Retrying in {wait_time} seconds...")
-                time.sleep(wait_time)
-                
-        logger.error(f"Failed to fetch {url} after {max_retries} attempts")
-        return None
+        try:
+            logger.info(f"Fetching URL: {url}")
+            response = self.http.get(url)
+            response.raise_for_status()
+            
+            # Create BeautifulSoup object
+            return parse_html(response.text)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to fetch {url}: {e}")
+            return None
         
     def extract_faqs(self):
         """
@@ -85,43 +98,219 @@ class GeneralFaqScraper:
         if not soup:
             return 0
         
+        self.extract_from_soup(soup)
+        
+        logger.info(f"Extracted {len(self.results)} FAQs in total")
+        return len(self.results)
+    
+    def extract_from_soup(self, soup):
+        """
+        Run the extraction strategies on a parsed page.
+        
+        The page is indexed once and every strategy queries the index
+        instead of scanning the whole tree again.
+        
+        Args:
+            soup (BeautifulSoup): Parsed page
+            
+        Returns:
+            bool: True if any strategy extracted FAQs
+        """
         logger.info("Analyzing page structure to find FAQs...")
+        index = HtmlIndex(soup)
         
         # Apply multiple extraction strategies in order of specificity
-        extracted = self._extract_structured_faqs(soup)
+        extracted = self._extract_structured_faqs(index)
         
         if not extracted:
-            extracted = self._extract_faq_from_accordion(soup)
+            extracted = self._extract_faq_from_accordion(index)
             
         if not extracted:
-            extracted = self._extract_definition_list_faqs(soup)
+            extracted = self._extract_definition_list_faqs(index)
             
         if not extracted:
-            extracted = self._extract_heading_paragraph_faqs(soup)
+            extracted = self._extract_heading_paragraph_faqs(index)
             
         if not extracted:
-            extracted = self._extract_question_like_content(soup)
+            extracted = self._extract_question_like_content(index)
         
-        logger.info(f"Extracted {len(self.results)} FAQs in total")
+        return extracted
+    
+    def extract_page(self, soup, url):
+        """
+        Run the extraction strategies on one page of a site crawl.
+        
+        Safe to call from several threads at once: the FAQs are returned
+        instead of being added to self.results.
+        
+        Args:
+            soup (BeautifulSoup): Parsed page
+            url (str): URL of the page
+            
+        Returns:
+            list: FAQs found on the page
+        """
+        results = []
+        self._local.results = results
+        self._local.url = url
+        try:
+            self.extract_from_soup(soup)
+        finally:
+            del self._local.results
+            del self._local.url
+        return results
+    
+    def load_robots(self):
+        """
+        Fetch the site's robots.txt.
+        
+        Returns:
+            RobotFileParser or None: Parsed rules, None if there are none
+        """
+        parsed = urlparse(self.base_url)
+        robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+        try:
+            response = self.http.get(robots_url, timeout=15)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Could not fetch {robots_url}: {e}")
+            return None
+        
+        if response.status_code != 200:
+            logger.info(f"No robots.txt at {robots_url} ({response.status_code})")
+            return None
+        
+        robots = RobotFileParser(robots_url)
+        robots.parse(response.text.splitlines())
+        return robots
+    
+    def _page_links(self, index, url, path_prefix=None):
+        """
+        Get the same-site links of a page worth crawling.
+        
+        Args:
+            index (HtmlIndex): Index of the page
+            url (str): URL of the page
+            path_prefix (str, optional): Only follow links under this path
+            
+        Returns:
+            list: Normalized URLs
+        """
+        links = []
+        for anchor in index.tags('a'):
+            link = normalize_url(anchor.get('href') or '', url)
+            if not link:
+                continue
+            parsed = urlparse(link)
+            if parsed.netloc != self.domain or parsed.path.lower().endswith(SKIPPED_EXTENSIONS):
+                continue
+            if path_prefix and not parsed.path.startswith(path_prefix):
+                continue
+            links.append(link)
+        return links
+    
+    def crawl_site(self, max_pages=100, max_depth=3, concurrency=8, delay=0.2,
+                   respect_robots=True, path_prefix=None):
+        """
+        Crawl the site breadth-first from base_url and extract FAQs from
+        every page.
+        
+        Only links on the same host are followed. Each depth level is
+        fetched concurrently; pages are parsed in worker threads and their
+        FAQs merged by a single consumer, dropping FAQs that duplicate one
+        already found on another page.
+        
+        Args:
+            max_pages (int): Maximum pages to fetch
+            max_depth (int): Maximum link distance from base_url
+            concurrency (int): Maximum requests in flight
+            delay (float): Minimum seconds between requests, raised to the
+                robots.txt Crawl-delay if that is longer
+            respect_robots (bool): Skip URLs disallowed by robots.txt
+            path_prefix (str, optional): Only follow links under this path
+            
+        Returns:
+            int: Number of FAQs extracted
+        """
+        user_agent = self.session.headers.get('User-Agent', '*')
+        robots = self.load_robots() if respect_robots else None
+        if robots is not None:
+            crawl_delay = robots.crawl_delay(user_agent)
+            if crawl_delay:
+                delay = max(delay, float(crawl_delay))
+        
+        crawler = AsyncCrawler(headers=dict(self.session.headers), max_concurrency=concurrency,
+                               per_host=concurrency, delay=delay)
+        
+        start_url = normalize_url(self.base_url)
+        seen_urls = {start_url}
+        frontier = [start_url]
+        stats = {'pages': 0, 'failed': 0, 'skipped_robots': 0, 'elapsed': 0.0}
+        if robots is not None and not robots.can_fetch(user_agent, start_url):
+            logger.warning(f"robots.txt disallows {start_url}, nothing to crawl")
+            stats['skipped_robots'] += 1
+            frontier = []
+        
+        def parse(item, page):
+            if page['status'] != 200 or page['text'] is None:
+                return None
+            content_type = {key.lower(): value for key, value in page['headers'].items()}.get('content-type', '')
+            if content_type and 'html' not in content_type:
+                return None
+            index = HtmlIndex(parse_html(page['text']))
+            # Read the links before extraction changes the tree
+            links = self._page_links(index, item['url'], path_prefix) if item['depth'] < max_depth else []
+            return {'faqs': self.extract_page(index.soup, item['url']), 'links': links}
+        
+        for depth in range(max_depth + 1):
+            if not frontier:
+                break
+            budget = max_pages - stats['pages'] - stats['failed']
+            if budget <= 0:
+                break
+            
+            level = [{'url': url, 'depth': depth} for url in frontier[:budget]]
+            next_frontier = []
+            
+            def consume(item, page, result):
+                if result is None:
+                    return
+                for faq in result['faqs']:
+                    self._keep_faq(faq)
+                
+                for link in result['links']:
+                    if link in seen_urls:
+                        continue
+                    seen_urls.add(link)
+                    if robots is not None and not robots.can_fetch(user_agent, link):
+                        stats['skipped_robots'] += 1
+                        continue
+                    next_frontier.append(link)
+            
+            logger.info(f"Crawling {len(level)} pages at depth {depth}")
+            level_stats = crawler.crawl(level, parse, consume)
+            stats['pages'] += level_stats['pages']
+            stats['failed'] += level_stats['failed']
+            stats['elapsed'] += level_stats['elapsed']
+            frontier = next_frontier
+        
+        logger.info(f"Site crawl of {self.domain}: {stats['pages']} pages, {stats['failed']} failed, "
+                    f"{stats['skipped_robots']} disallowed by robots.txt, {len(self.results)} FAQs "
+                    f"in {stats['elapsed']:.1f}s")
+        self.crawl_stats = stats
         return len(self.results)
     
-    def _extract_structured_faqs(self, soup):
+    def _extract_structured_faqs(self, index):
         """Extract FAQs from structured FAQ sections."""
-        # Look for common FAQ section identifiers
-        faq_containers = []
-        
         # Method 1: Look for elements with FAQ-related classes or IDs
-        for container in soup.find_all(['div', 'section', 'article']):
-            container_id = container.get('id', '').lower()
-            container_class = ' '.join(container.get('class', [])).lower()
-            
-            if any(term in container_id or term in container_class 
-                  for term in ['faq', 'faqs', 'frequently-asked', 'questions-answers', 'q-and-a']):
-                faq_containers.append(container)
+        container_tags = ['div', 'section', 'article']
+        faq_containers = index.in_order(
+            index.with_class(FAQ_CONTAINER_PATTERN, container_tags) +
+            index.ids_matching(FAQ_CONTAINER_PATTERN, container_tags)
+        )
                 
         # Method 2: Look for FAQ headings
         if not faq_containers:
-            for heading in soup.find_all(['h1', 'h2', 'h3']):
+            for heading in index.tags('h1', 'h2', 'h3'):
                 text = heading.get_text().lower()
                 if any(term in text for term in ['faq', 'frequently asked questions', 'questions & answers']):
                     # Find the parent container
@@ -134,10 +323,14 @@ class GeneralFaqScraper:
             
         extracted = False
         
+        question_elements = index.with_class(re.compile(r'question|faq-q|accordion-header|toggle-header'))
+        answer_elements = index.with_class(re.compile(r'answer|faq-a|accordion-content|toggle-content'))
+        question_tags = index.with_class(re.compile(r'question|faq-q|q-text'), ['h3', 'h4', 'strong', 'p', 'div', 'button'])
+        
         for container in faq_containers:
             # Strategy 1: Look for question/answer pairs with distinct classes
-            q_elements = container.find_all(class_=re.compile(r'question|faq-q|accordion-header|toggle-header'))
-            a_elements = container.find_all(class_=re.compile(r'answer|faq-a|accordion-content|toggle-content'))
+            q_elements = index.within(container, question_elements)
+            a_elements = index.within(container, answer_elements)
             
             if len(q_elements) > 0 and len(q_elements) == len(a_elements):
                 # Matching pairs found
@@ -147,8 +340,7 @@ class GeneralFaqScraper:
                 
             # Strategy 2: Look for question/answer elements that follow each other
             if not extracted:
-                q_tags = container.find_all(['h3', 'h4', 'strong', 'p', 'div', 'button'], 
-                                            class_=re.compile(r'question|faq-q|q-text'))
+                q_tags = index.within(container, question_tags)
                 
                 for q_tag in q_tags:
                     # Find the next sibling or cousin that could be an answer
@@ -159,17 +351,17 @@ class GeneralFaqScraper:
         
         return extracted
     
-    def _extract_faq_from_accordion(self, soup):
+    def _extract_faq_from_accordion(self, index):
         """Extract FAQs from accordion-style elements."""
         # Common accordion patterns
         accordion_patterns = [
             # Bootstrap accordions
-            {'items': soup.find_all('div', class_=re.compile(r'accordion-item'))},
+            {'items': index.with_class(re.compile(r'accordion-item'), 'div')},
             # jQuery UI accordions
-            {'headers': soup.find_all('h3', class_=re.compile(r'ui-accordion-header')),
-             'contents': soup.find_all('div', class_=re.compile(r'ui-accordion-content'))},
+            {'headers': index.with_class(re.compile(r'ui-accordion-header'), 'h3'),
+             'contents': index.with_class(re.compile(r'ui-accordion-content'), 'div')},
             # Generic accordions
-            {'buttons': soup.find_all('button', {'aria-expanded': re.compile(r'true|false')})}
+            {'buttons': index.with_attr('aria-expanded', re.compile(r'true|false'), 'button')}
         ]
         
         extracted = False
@@ -198,13 +390,13 @@ class GeneralFaqScraper:
                     # Find controlled element
                     control_id = button.get('aria-controls')
                     if control_id:
-                        content = soup.find(id=control_id)
+                        content = index.get_by_id(control_id)
                         if content:
                             self._add_faq(button.get_text(), content.get_text(), 'accordion-control')
                             extracted = True
         
         # Look for details/summary elements (HTML5 native accordions)
-        details_elements = soup.find_all('details')
+        details_elements = index.tags('details')
         if details_elements:
             for details in details_elements:
                 summary = details.find('summary')
@@ -224,9 +416,9 @@ class GeneralFaqScraper:
         
         return extracted
     
-    def _extract_definition_list_faqs(self, soup):
+    def _extract_definition_list_faqs(self, index):
         """Extract FAQs from definition lists (dt/dd)."""
-        dl_elements = soup.find_all('dl')
+        dl_elements = index.tags('dl')
         if not dl_elements:
             return False
             
@@ -243,10 +435,10 @@ class GeneralFaqScraper:
         
         return extracted
     
-    def _extract_heading_paragraph_faqs(self, soup):
+    def _extract_heading_paragraph_faqs(self, index):
         """Extract FAQs from heading followed by paragraph pattern."""
         # Find all headings h2-h5 that might be questions
-        headings = soup.find_all(['h2', 'h3', 'h4', 'h5'])
+        headings = index.tags('h2', 'h3', 'h4', 'h5')
         
         if not headings:
             return False
@@ -271,12 +463,12 @@ class GeneralFaqScraper:
         
         return extracted
     
-    def _extract_question_like_content(self, soup):
+    def _extract_question_like_content(self, index):
         """Extract content that looks like questions and answers based on text patterns."""
         # Find elements with text ending in question marks
         potential_questions = []
         
-        for elem in soup.find_all(['p', 'div', 'span', 'strong', 'b']):
+        for elem in index.tags('p', 'div', 'span', 'strong', 'b'):
             text = elem.get_text().strip()
             if text.endswith('?') or self._is_question(text):
                 potential_questions.append(elem)
@@ -348,15 +540,30 @@ class GeneralFaqScraper:
         if len(question) < 5 or len(answer) < 10:
             return
             
-        # Add to results
-        self.results.append({
+        faq = {
             'question': question,
             'answer': answer,
-            'url': self.base_url,
+            'url': getattr(self._local, 'url', self.base_url),
             'source_type': source_type
-        })
+        }
+        
+        # Pages extracted during a crawl are deduplicated by the crawl's consumer
+        page_results = getattr(self._local, 'results', None)
+        if page_results is not None:
+            page_results.append(faq)
+        else:
+            self._keep_faq(faq)
+    
+    def _keep_faq(self, faq):
+        """
+        Add a FAQ to results unless it duplicates one already there.
         
-        logger.debug(f"Added FAQ: {question[:30]}... [{source_type}]")
+        Args:
+            faq (dict): Cleaned FAQ
+        """
+        if self.deduplicator.add(faq):
+            self.results.append(faq)
+            logger.debug(f"Added FAQ: {faq['question'][:30]}... [{faq['source_type']}]")
     
     def _clean_text(self, text):
         """
@@ -395,21 +602,30 @@ class GeneralFaqScraper:
                     writer.writerow(result)
                     
             logger.info(f"Saved {len(self.results)} FAQs to {self.output_file}")
+            
+            counts = self.deduplicator.counts()
+            logger.info(f"Dropped {counts['exact']} exact and {counts['near']} near-duplicate FAQs")
+            if self.deduplicator.dropped:
+                self.deduplicator.write_report(self.dedup_report_file)
             return True
         except Exception as e:
             logger.error(f"Error saving to CSV: {e}")
             return False
     
-    def scrape(self):
+    def scrape(self, crawl=False, **crawl_options):
         """
         Perform the complete scraping process.
         
+        Args:
+            crawl (bool): Crawl the whole site instead of only base_url
+            **crawl_options: Options passed to crawl_site
+        
         Returns:
             bool: True if successful, False otherwise
         """
         try:
             # Extract FAQs
-            count = self.extract_faqs()
+            count = self.crawl_site(**crawl_options) if crawl else self.extract_faqs()
             
             if count == 0:
                 logger.warning(f"No FAQs found on {self.base_url}")
@@ -427,11 +643,29 @@ def main():
     parser = argparse.ArgumentParser(description='General FAQ Scraper')
     parser.add_argument('url', help='The URL of the page containing FAQs')
     parser.add_argument('--output', '-o', default='faqs.csv', help='Output CSV file (default: faqs.csv)')
+    parser.add_argument('--crawl', action='store_true', help='Follow same-site links and scrape every page found')
+    parser.add_argument('--max-pages', type=int, default=200, help='Maximum pages to fetch when crawling (default: 200)')
+    parser.add_argument('--max-depth', type=int, default=3, help='Maximum link depth when crawling (default: 3)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent requests when crawling (default: 8)')
+    parser.add_argument('--delay', type=float, default=0.2, help='Seconds between requests when crawling (default: 0.2)')
+    parser.add_argument('--prefix', help='Only follow links whose path starts with this, e.g. /help')
+    parser.add_argument('--ignore-robots', action='store_true', help='Do not apply robots.txt rules')
     
     args = parser.parse_args()
     
     scraper = GeneralFaqScraper(args.url, args.output)
-    success = scraper.scrape()
+    if args.crawl:
+        success = scraper.scrape(
+            crawl=True,
+            max_pages=args.max_pages,
+            max_depth=args.max_depth,
+            concurrency=args.concurrency,
+            delay=args.delay,
+            respect_robots=not args.ignore_robots,
+            path_prefix=args.prefix
+        )
+    else:
+        success = scraper.scrape()
     
     if success:
         print(f"Successfully extracted {len(scraper.results)} FAQs from {args.url}")
@@ -1,14 +1,16 @@
 import requests
-from bs4 import BeautifulSoup
 import csv
-import time
 import random
 import re
 import logging
 from urllib.parse import urljoin
 import os
-import json
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.crawler import AsyncCrawler
+from utils.crawl_state import CrawlStateStore, ChangeFeed, content_hash
+from utils.checkpoint import CheckpointLog
+from utils.html_index import HtmlIndex, parse_html
+from utils.dedup import FaqDeduplicator
+from utils.http_client import HttpClient, HostPolicy
 
 # Set up logging
 logging.basicConfig(
@@ -21,13 +23,15 @@ logging.basicConfig(
 )
 
 class WiseHelpScraper:
-    def __init__(self, base_url, max_workers=5):
+    def __init__(self, base_url, max_concurrency=100, per_host=8, delay=0.1):
         """
         Initialize the scraper with the base URL.
         
         Args:
             base_url (str): The base URL of the Wise help center
-            max_workers (int): Maximum number of concurrent threads for scraping
+            max_concurrency (int): Maximum question pages in flight
+            per_host (int): Maximum concurrent requests to one host
+            delay (float): Minimum seconds between requests to one host
         """
         self.base_url = base_url
         self.session = requests.Session()
@@ -43,14 +47,34 @@ class WiseHelpScraper:
             'Sec-Fetch-User': '?1',
             'Cache-Control': 'max-age=0',
         })
+        # Shares its per-host rate limit and circuit breaker with the crawler
+        self.http = HttpClient(self.session, policy=HostPolicy(rate=1.0 / delay if delay > 0 else 20.0,
+                                                               burst=per_host, max_wait=60), max_retries=2)
         self.results = []
-        self.max_workers = max_workers
         self.processed_urls = set()  # To avoid processing the same URL twice
-        self.checkpoint_file = "scraper_checkpoint.json"
+        self.checkpoint_file = "scraper_checkpoint.jsonl"
+        self.legacy_checkpoint_file = "scraper_checkpoint.json"
+        self.checkpoint = CheckpointLog(self.checkpoint_file)
+        
+        # Validators and hashes per URL for incremental recrawls, and the
+        # feed of added/updated/removed articles for downstream indexing
+        self.state = CrawlStateStore("scraper_state.db")
+        self.change_feed = ChangeFeed("scraper_changes.jsonl")
+        
+        # Drops duplicate articles from the final results
+        self.deduplicator = None
+        
+        # Question pages are fetched by the async engine with the same headers
+        self.crawler = AsyncCrawler(
+            headers=dict(self.session.headers),
+            max_concurrency=max_concurrency,
+            per_host=per_host,
+            delay=delay
+        )
 
     def fetch_page(self, url):
         """
-        Fetch a page with error handling and retries.
+        Fetch a page, retrying within the host's rate limit.
         
         Args:
             url (str): URL to fetch
@@ -58,56 +82,84 @@ class WiseHelpScraper:
         Returns:
             str or None: The HTML content of the page, or None if failed
         """
-        max_retries = 3
-        retry_count = 0
-        
-        while retry_count < max_retries:
-            try:
-                logging.info(f"Fetching: {url}")
-                response = self.session.get(url, timeout=30)
-                response.raise_for_status()
-                return response.text
-            except requests.exceptions.RequestException as e:
-                retry_count += 1
-                wait_time = 2 ** retry_count  # Exponential backoff
-                logging.warning(f"Error fetching {url}: {e}. Retrying in {wait_time} seconds...")
-                time.sleep(wait_time)
-        
-        logging.error(f"Failed to fetch {url} after {max_retries} attempts")
-        return None
+        try:
+            logging.info(f"Fetching: {url}")
+            response = self.http.get(url)
+            response.raise_for_status()
+            return response.text
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Failed to fetch {url}: {e}")
+            return None
 
     def load_checkpoint(self):
         """
         Load checkpoint data if it exists to resume scraping.
         
+        The log is streamed line by line. A checkpoint in the old single
+        JSON document format is converted first.
+        
         Returns:
             bool: True if checkpoint was loaded, False otherwise
         """
-        if os.path.exists(self.checkpoint_file):
-            try:
-                with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
-                    checkpoint_data = json.load(f)
-                    self.results = checkpoint_data.get('results', [])
-                    self.processed_urls = set(checkpoint_data.get('processed_urls', []))
-                    logging.info(f"Loaded checkpoint with {len(self.results)} results and {len(self.processed_urls)} processed URLs")
-                    return True
-            except Exception as e:
-                logging.error(f"Error loading checkpoint: {e}")
+        try:
+            self.checkpoint.migrate_legacy(self.legacy_checkpoint_file)
+            
+            logged, needs_compaction = self.checkpoint.load()
+            if not logged:
+                return False
+            
+            self.processed_urls = set(logged)
+            self.results = [result for result in logged.values() if result]
+            
+            # Results from before the state store existed
+            known_urls = self.state.urls()
+            for result in self.results:
+                if result['url'] not in known_urls:
+                    self.state.update(result['url'], result)
+                    self.change_feed.emit('added', result['url'], result)
+            
+            # Repeated resumes and crashes leave duplicate or torn lines behind
+            if needs_compaction:
+                self.checkpoint.compact()
+            
+            logging.info(f"Loaded checkpoint with {len(self.results)} results and {len(self.processed_urls)} processed URLs")
+            return True
+        except Exception as e:
+            logging.error(f"Error loading checkpoint: {e}")
         return False
 
+    def clear_checkpoint(self):
+        """Remove the checkpoint after a completed run so the next run recrawls."""
+        self.processed_urls = set()
+        self.checkpoint.clear()
+
     def save_checkpoint(self):
-        """Save checkpoint data to resume scraping later."""
+        """
+        Make sure every processed page is on disk.
+        
+        Pages are appended to the checkpoint as they are processed, so this
+        only flushes the log.
+        """
         try:
-            checkpoint_data = {
-                'results': self.results,
-                'processed_urls': list(self.processed_urls)
-            }
-            with open(self.checkpoint_file, 'w', encoding='utf-8') as f:
-                json.dump(checkpoint_data, f, ensure_ascii=False, indent=2)
-            logging.info(f"Saved checkpoint with {len(self.results)} results")
+            self.checkpoint.flush()
+            logging.info(f"Saved checkpoint with {len(self.processed_urls)} processed URLs")
         except Exception as e:
             logging.error(f"Error saving checkpoint: {e}")
 
+    def _mark_processed(self, url, result=None):
+        """
+        Mark a URL as processed and append it to the checkpoint.
+        
+        Args:
+            url (str): The processed URL
+            result (dict, optional): Its result
+        """
+        self.processed_urls.add(url)
+        try:
+            self.checkpoint.append(url, result)
+        except Exception as e:
+            logging.error(f"Error writing checkpoint for {url}: {e}")
+
     def parse_main_page(self, url):
         """
         Parse the main help page to extract categories and questions.
@@ -119,13 +171,16 @@ class WiseHelpScraper:
         if not html_content:
             return
         
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = parse_html(html_content)
+        index = HtmlIndex(soup)
+        question_links_all = index.with_class(re.compile(r'np-link'), 'a')
         
         # Find all accordion buttons (categories)
-        categories = soup.find_all('button', {'data-testid': re.compile(r'^accordion-button-')})
+        categories = index.with_attr('data-testid', re.compile(r'^accordion-button-'), 'button')
         
         # Create a list to store all question URLs for parallel processing
         question_data = []
+        listed_urls = set()
         
         for category in categories:
             category_name = category.find('h2').text.strip()
@@ -135,54 +190,102 @@ class WiseHelpScraper:
             category_id = category.get('data-testid').replace('accordion-button-', '')
             
             # Find the accordion content for this category
-            content_div = soup.find('div', {'data-testid': f'accordion-content-{category_id}'})
+            content_div = index.attr_equals('data-testid', f'accordion-content-{category_id}', 'div')
             
             # If the category is collapsed, the content might be 'inert'
             # We still try to process it
             if content_div:
                 # Find all question links in this category
-                question_links = content_div.find_all('a', {'class': re.compile(r'np-link')})
+                question_links = index.within(content_div, question_links_all)
                 
                 for question_link in question_links:
                     question_text = question_link.text.strip()
                     question_url = urljoin(self.base_url, question_link['href'])
                     
-                    # Only add if we haven't processed this URL before
+                    # Articles are listed under several categories, keep the first
+                    if question_url in listed_urls:
+                        logging.info(f"Skipping {question_url} already listed under another category")
+                        continue
+                    listed_urls.add(question_url)
+                    
+                    # Only add if we haven't processed this URL in this run
                     if question_url not in self.processed_urls:
                         question_data.append({
                             'category': category_name,
                             'question': question_text,
-                            'url': question_url
+                            'url': question_url,
+                            # Conditional GET for pages seen on earlier runs
+                            'headers': self.state.conditional_headers(question_url),
+                            'page_hash': self.state.page_hash(question_url)
                         })
             else:
                 logging.warning(f"Could not find content for category: {category_name}")
         
         logging.info(f"Found {len(question_data)} new questions to process")
         
-        # Process questions in parallel using ThreadPoolExecutor
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Submit all question processing tasks
-            future_to_question = {
-                executor.submit(self.process_question_page, item['category'], item['question'], item['url']): item
-                for item in question_data
-            }
-            
-            # Process results as they complete
-            for i, future in enumerate(as_completed(future_to_question)):
-                try:
-                    future.result()  # Get the result (or exception)
-                except Exception as e:
-                    question = future_to_question[future]
-                    logging.error(f"Error processing {question['url']}: {e}")
-                
-                # Save checkpoint periodically (every 10 questions)
-                if i > 0 and i % 10 == 0:
-                    self.save_checkpoint()
-                    logging.info(f"Processed {i}/{len(question_data)} questions")
+        self.crawl_questions(question_data)
+        
+        # Articles no longer linked from the help page were removed
+        if listed_urls:
+            for url in self.state.urls() - listed_urls:
+                self.change_feed.emit('removed', url, self.state.remove(url))
+        
+        # Unchanged articles come from the state store. Different articles
+        # can carry the same answer, only the first is kept
+        self.deduplicator = FaqDeduplicator()
+        self.results = self.deduplicator.filter(self.state.records())
+        counts = self.deduplicator.counts()
+        logging.info(f"Dropped {counts['exact']} exact and {counts['near']} near-duplicate articles")
+        logging.info(f"Changes: {self.change_feed.counts}")
         
         # Final checkpoint save
         self.save_checkpoint()
 
+    def crawl_questions(self, question_data):
+        """
+        Fetch and parse question pages concurrently.
+        
+        Pages are parsed in worker threads and every result is recorded from
+        the crawler's single consumer, so results need no locking. Pages that
+        answer a conditional GET with 304, or whose body hash is unchanged,
+        are not parsed again.
+        
+        Args:
+            question_data (list): Dicts with category, question and url, and
+                optionally conditional GET 'headers' and the last 'page_hash'
+            
+        Returns:
+            dict: Crawl statistics including pages_per_sec
+        """
+        def parse(item, page):
+            if page['status'] == 304:
+                return {'status': 'not_modified'}
+            if page['status'] in (404, 410):
+                return {'status': 'gone'}
+            if page['text'] is None or page['status'] != 200:
+                if page['status'] is not None:
+                    logging.warning(f"Got HTTP {page['status']} for {item['url']}")
+                return None
+            
+            page_hash = content_hash(page['text'])
+            if page_hash == item.get('page_hash'):
+                return {'status': 'unchanged'}
+            result = self.parse_question_page(item['category'], item['question'], item['url'], page['text'])
+            return {'status': 'parsed', 'result': result, 'page_hash': page_hash}
+        
+        processed = 0
+        
+        def consume(item, page, outcome):
+            nonlocal processed
+            processed += 1
+            # Failed fetches are retried on the next run
+            if outcome is not None:
+                self._record_page(item, page, outcome)
+            if processed % 10 == 0:
+                logging.info(f"Processed {processed}/{len(question_data)} questions")
+        
+        return self.crawler.crawl(question_data, parse, consume)
+
     def process_question_page(self, category, question, url):
         """
         Process a question page to extract the answer.
@@ -200,7 +303,23 @@ class WiseHelpScraper:
         if not html_content:
             return
         
-        soup = BeautifulSoup(html_content, 'html.parser')
+        self._record_result(url, self.parse_question_page(category, question, url, html_content), question)
+
+    def parse_question_page(self, category, question, url, html_content):
+        """
+        Extract the answer from a question page.
+        
+        Args:
+            category (str): The category name
+            question (str): The question text
+            url (str): The URL of the question page
+            html_content (str): HTML of the page
+            
+        Returns:
+            dict or None: The result, None if no answer was found
+        """
+        # A single lookup, so the page is searched directly rather than indexed
+        soup = parse_html(html_content)
         
         # Find the answer content
         answer_content = None
@@ -225,26 +344,64 @@ class WiseHelpScraper:
                 else:
                     answer_content = content_div
         
-        if answer_content:
-            # Clean up the answer text
-            answer_text = self._clean_text(answer_content.get_text())
-            
-            # Store the result
-            result = {
-                'category': category,
-                'question': question,
-                'answer': answer_text,
-                'url': url
-            }
-            
+        if not answer_content:
+            return None
+        
+        return {
+            'category': category,
+            'question': question,
+            'answer': self._clean_text(answer_content.get_text()),
+            'url': url
+        }
+
+    def _record_page(self, item, page, outcome):
+        """
+        Update the crawl state of a fetched question page.
+        
+        Args:
+            item (dict): Question with category, question and url
+            page (dict): Response from the crawler
+            outcome (dict): What parsing found, see crawl_questions
+        """
+        url = item['url']
+        headers = {key.lower(): value for key, value in page['headers'].items()}
+        
+        if outcome['status'] in ('not_modified', 'unchanged'):
+            self.state.touch(url, headers.get('etag'), headers.get('last-modified'))
+            state = self.state.get(url)
+            self._mark_processed(url, state['record'] if state else None)
+        elif outcome['status'] == 'gone':
+            record = self.state.remove(url)
+            if record is not None:
+                self.change_feed.emit('removed', url, record)
+            self._mark_processed(url)
+        else:
+            self._record_result(url, outcome['result'], item['question'],
+                                headers.get('etag'), headers.get('last-modified'), outcome['page_hash'])
+
+    def _record_result(self, url, result, question, etag=None, last_modified=None, page_hash=None):
+        """
+        Store a parsed result and mark its URL as processed.
+        
+        Args:
+            url (str): The URL of the question page
+            result (dict or None): Parsed result, None if no answer was found
+            question (str): The question text, for logging
+            etag (str, optional): ETag of the response
+            last_modified (str, optional): Last-Modified of the response
+            page_hash (str, optional): Hash of the response body
+        """
+        if result:
             self.results.append(result)
-            self.processed_urls.add(url)
-            
+            change = self.state.update(url, result, etag, last_modified, page_hash)
+            if change:
+                self.change_feed.emit(change, url, result)
             logging.info(f"Processed question: {question}")
         else:
             logging.warning(f"Could not find answer content for question: {question}")
-            # Mark as processed even if we couldn't find the answer
-            self.processed_urls.add(url)
+        
+        # Mark as processed even if we couldn't find the answer
+        self._mark_processed(url, result)
 
     def _clean_text(self, text):
         """
@@ -280,6 +437,9 @@ class WiseHelpScraper:
                 writer.writerow(result)
         
         logging.info(f"Data saved to {filename}")
+        
+        if self.deduplicator is not None and self.deduplicator.dropped:
+            self.deduplicator.write_report(f"{os.path.splitext(filename)[0]}_dedup.csv")
 
 def main():
     """Main function to run the scraper."""
@@ -300,6 +460,9 @@ def main():
         # Save the results to a CSV file
         scraper.save_to_csv("wise_help_content.csv")
         
+        # The run is complete, the next run recrawls incrementally
+        scraper.clear_checkpoint()
+        
         logging.info("Scraping completed successfully")
     except KeyboardInterrupt:
         logging.info("Scraping interrupted by user")
@@ -39,6 +39,10 @@ document.addEventListener('DOMContentLoaded', function() {
     let chart = null;
     let currentPeriod = '1Y';
     let currentOrderBookTab = 'buy';
+    const historyCache = {};
+    const QUOTE_POLL_INTERVAL = 15000;
+    let quotePollTimer = null;
+    let quoteStream = null;
     
     // Initialize
     loadCompanyData();
@@ -49,26 +53,98 @@ document.addEventListener('DOMContentLoaded', function() {
      * Load company data
      */
     function loadCompanyData() {
-        fetch(`/invest/api/company/${COMPANY_SYMBOL}`)
-            .then(response => response.json())
-            .then(result => {
-                if (result.success) {
-                    companyData = result.data;
-                    renderCompanyData();
-                    initializeChartData();
-                    loadOrderBook('buy');
-                    loadAnnouncements();
-                    loadingOverlay.style.display = 'none';
-                } else {
-                    alert('Error loading company data: ' + result.message);
-                }
+        // The order book is optional, the page renders without it
+        const orderBookRequest = fetchSection('orderbook').catch(error => {
+            console.error('Error loading order book:', error);
+            return {};
+        });
+        
+        Promise.all([fetchSection('quote'), fetchSection('info'), orderBookRequest])
+            .then(([quote, info, orderBook]) => {
+                companyData = Object.assign({}, info, quote, { tradeInfo: orderBook || {} });
+                renderCompanyData();
+                initializeChartData();
+                loadOrderBook('buy');
+                loadAnnouncements();
+                loadingOverlay.style.display = 'none';
+                startLiveUpdates();
             })
             .catch(error => {
                 console.error('Error loading company data:', error);
-                alert('Error loading company data. Please try again later.');
+                alert('Error loading company data: ' + error.message);
             });
     }
     
+    /**
+     * Fetch one section of company data
+     * @param {string} section - 'quote', 'info' or 'orderbook'
+     * @returns {Promise<Object>} Section data
+     */
+    function fetchSection(section) {
+        return fetch(`/invest/api/company/${COMPANY_SYMBOL}/${section}`)
+            .then(response => response.json())
+            .then(result => {
+                if (!result.success) {
+                    throw new Error(result.message);
+                }
+                return result.data;
+            });
+    }
+    
+    /**
+     * Stream live price changes from the server, polling where streaming
+     * is not available
+     */
+    function startLiveUpdates() {
+        if (!window.EventSource) {
+            startQuotePolling();
+            return;
+        }
+        
+        quoteStream = new EventSource(`/invest/api/stream?symbols=${encodeURIComponent(COMPANY_SYMBOL)}`);
+        
+        quoteStream.addEventListener('quote', event => {
+            const update = JSON.parse(event.data);
+            const { lastUpdateTime, ...changes } = update.changes;
+            
+            companyData.priceInfo = Object.assign(companyData.priceInfo || {}, changes);
+            if (lastUpdateTime) {
+                companyData.metadata = Object.assign(companyData.metadata || {}, { lastUpdateTime });
+            }
+            renderPrice();
+        });
+        
+        quoteStream.onerror = () => {
+            // The browser reconnects by itself unless the stream was closed for good
+            if (quoteStream.readyState === EventSource.CLOSED) {
+                console.error('Price stream closed, falling back to polling');
+                quoteStream = null;
+                startQuotePolling();
+            }
+        };
+    }
+    
+    /**
+     * Poll the quote section to keep the live price up to date
+     */
+    function startQuotePolling() {
+        if (quotePollTimer) {
+            clearInterval(quotePollTimer);
+        }
+        
+        quotePollTimer = setInterval(() => {
+            if (document.hidden) {
+                return;
+            }
+            fetchSection('quote')
+                .then(quote => {
+                    Object.assign(companyData, quote);
+                    renderPrice();
+                })
+                .catch(error => console.error('Error refreshing quote:', error));
+        }, QUOTE_POLL_INTERVAL);
+    }
+    
     /**
      * Render company data
      */
@@ -82,6 +158,25 @@ document.addEventListener('DOMContentLoaded', function() {
         companyName.textContent = info.companyName || COMPANY_SYMBOL;
         companyCode.textContent = COMPANY_SYMBOL;
         
+        renderPrice();
+        
+        // Company information
+        industry.textContent = metadata.industry || 'N/A';
+        indexElem.textContent = metadata.indices || 'N/A';
+        faceValue.textContent = `₹${metadata.faceValue || 0}`;
+        listingDate.textContent = formatDate(metadata.listingDate) || 'N/A';
+        peRatio.textContent = (priceInfo.pe || 0).toFixed(2);
+        eps.textContent = `₹${(priceInfo.eps || 0).toFixed(2)}`;
+        dividendYield.textContent = `${(priceInfo.dividendYield || 0).toFixed(2)}%`;
+        bookValue.textContent = `₹${(metadata.bookValue || 0).toFixed(2)}`;
+    }
+    
+    /**
+     * Render price and trading information
+     */
+    function renderPrice() {
+        const priceInfo = companyData.priceInfo || {};
+        
         // Price information
         const lastPrice = priceInfo.lastPrice || 0;
         const change = priceInfo.change || 0;
@@ -89,6 +184,7 @@ document.addEventListener('DOMContentLoaded', function() {
         
         currentPrice.textContent = `₹${formatNumber(lastPrice)}`;
         
+        priceChange.classList.remove('positive', 'negative');
         if (change >= 0) {
             priceChange.textContent = `+${change.toFixed(2)} (${changePercent.toFixed(2)}%)`;
             priceChange.classList.add('positive');
@@ -106,16 +202,6 @@ document.addEventListener('DOMContentLoaded', function() {
         weekHigh.textContent = `₹${formatNumber(priceInfo.weekHigh || 0)}`;
         weekLow.textContent = `₹${formatNumber(priceInfo.weekLow || 0)}`;
         marketCapElem.textContent = `₹${formatCrores(priceInfo.marketCap || 0)}`;
-        
-        // Company information
-        industry.textContent = metadata.industry || 'N/A';
-        indexElem.textContent = metadata.indices || 'N/A';
-        faceValue.textContent = `₹${metadata.faceValue || 0}`;
-        listingDate.textContent = formatDate(metadata.listingDate) || 'N/A';
-        peRatio.textContent = (priceInfo.pe || 0).toFixed(2);
-        eps.textContent = `₹${(priceInfo.eps || 0).toFixed(2)}`;
-        dividendYield.textContent = `${(priceInfo.dividendYield || 0).toFixed(2)}%`;
-        bookValue.textContent = `₹${(metadata.bookValue || 0).toFixed(2)}`;
     }
     
     /**
@@ -131,59 +217,40 @@ document.addEventListener('DOMContentLoaded', function() {
      * @param {string} period - Time period for chart
      */
     function updateChart(period) {
-        const historicalData = companyData.historicalData || [];
-        
-        if (historicalData.length === 0) {
+        if (historyCache[period]) {
+            renderChart(period, historyCache[period]);
             return;
         }
         
-        // Filter data based on period
-        let filteredData = [];
-        const now = new Date();
+        fetch(`/invest/api/company/${COMPANY_SYMBOL}/history?period=${period}&max_points=250`)
+            .then(response => response.json())
+            .then(result => {
+                if (result.success) {
+                    historyCache[period] = result.data.series;
+                    // Ignore responses for periods the user already left
+                    if (period === currentPeriod) {
+                        renderChart(period, result.data.series);
+                    }
+                }
+            })
+            .catch(error => {
+                console.error('Error loading price history:', error);
+            });
+    }
+    
+    /**
+     * Render the price chart
+     * @param {string} period - Time period for chart
+     * @param {Object} series - Server-side series in column layout
+     */
+    function renderChart(period, series) {
+        const labels = series.date || [];
+        const prices = series.close || [];
         
-        switch (period) {
-            case '1M':
-                // Last 30 days
-                const oneMonthAgo = new Date();
-                oneMonthAgo.setDate(now.getDate() - 30);
-                filteredData = historicalData.filter(item => new Date(item.date) >= oneMonthAgo);
-                break;
-            case '3M':
-                // Last 90 days
-                const threeMonthsAgo = new Date();
-                threeMonthsAgo.setDate(now.getDate() - 90);
-                filteredData = historicalData.filter(item => new Date(item.date) >= threeMonthsAgo);
-                break;
-            case '6M':
-                // Last 180 days
-                const sixMonthsAgo = new Date();
-                sixMonthsAgo.setDate(now.getDate() - 180);
-                filteredData = historicalData.filter(item => new Date(item.date) >= sixMonthsAgo);
-                break;
-            case '1Y':
-                // Last 365 days
-                const oneYearAgo = new Date();
-                oneYearAgo.setDate(now.getDate() - 365);
-                filteredData = historicalData.filter(item => new Date(item.date) >= oneYearAgo);
-                break;
-            case 'ALL':
-                // All data
-                filteredData = historicalData;
-                break;
-            default:
-                // Default to 1 year
-                const defaultOneYearAgo = new Date();
-                defaultOneYearAgo.setDate(now.getDate() - 365);
-                filteredData = historicalData.filter(item => new Date(item.date) >= defaultOneYearAgo);
+        if (labels.length === 0) {
+            return;
         }
         
-        // Sort data by date
-        filteredData.sort((a, b) => new Date(a.date) - new Date(b.date));
-        
-        // Extract data for chart
-        const labels = filteredData.map(item => item.date);
-        const prices = filteredData.map(item => item.close);
-        
         // Create/update chart
         if (chart) {
             chart.destroy();
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from models.indicators import compute_series, summarize
+
+def _frame(prices):
+    """Closing prices of one symbol, one row per day."""
+    dates = pd.date_range('2024-01-01', periods=len(prices)).strftime('%Y-%m-%d')
+    return pd.DataFrame({'TEST': prices}, index=dates, dtype=float)
+
+def _rsi(prices):
+    """Last RSI from both the series and the summary paths."""
+    close = _frame(prices)
+    return compute_series(close)['rsi_14'].iloc[-1, 0], summarize(close)[0]['rsi_14']
+
+def test_rsi_of_rising_series_is_100():
+    series, summary = _rsi(np.arange(100, 128))
+    assert series == 100
+    assert summary == 100
+
+def test_rsi_of_falling_series_is_0():
+    series, summary = _rsi(np.arange(128, 100, -1))
+    assert series == 0
+    assert summary == 0
+
+def test_rsi_of_flat_series_is_50():
+    series, summary = _rsi(np.full(28, 100))
+    assert series == 50
+    assert summary == 50
+
+def test_rsi_matches_between_series_and_summary():
+    prices = 100 + np.cumsum(np.random.RandomState(7).normal(size=60))
+    series, summary = _rsi(prices)
+    assert 0 < summary < 100
+    assert summary == round(series, 4)
+
+def test_rsi_is_missing_during_warm_up():
+    series, summary = _rsi(np.arange(100, 110))
+    assert np.isnan(series)
+    assert summary is None
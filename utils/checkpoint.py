@@ -0,0 +1,158 @@
+import os
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CheckpointLog:
+    """
+    Append-only JSONL checkpoint for scrapers.
+
+    Every processed URL is written once as one line holding its result (or
+    null when the page had no usable content), so saving costs the same
+    however large the crawl gets. A crash can at worst tear the last line,
+    which is skipped on load. Compaction rewrites the log without
+    duplicates to a temporary file and renames it into place.
+    """
+    def __init__(self, path='scraper_checkpoint.jsonl'):
+        """
+        Initialize the log.
+
+        Args:
+            path (str): JSONL file path
+        """
+        self.path = path
+        self.file = None
+
+    def append(self, url, result=None):
+        """
+        Record a processed URL.
+
+        Args:
+            url (str): Processed URL
+            result (dict, optional): Its result
+        """
+        if self.file is None:
+            self.file = open(self.path, 'a', encoding='utf-8')
+            # Never glue a new entry onto a line torn by a crash
+            if self.file.tell() > 0:
+                with open(self.path, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        self.file.write('\n')
+        self.file.write(json.dumps({'url': url, 'result': result}, ensure_ascii=False) + '\n')
+        # Hand the line to the OS so only a crash of the machine can lose it
+        self.file.flush()
+
+    def entries(self):
+        """
+        Stream the log.
+
+        Yields:
+            dict: Entries with 'url' and 'result' in the order written, or
+                None for each unreadable line
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    entry = None
+                if not isinstance(entry, dict) or not entry.get('url'):
+                    logger.warning(f"Skipping unreadable checkpoint line {line_number} in {self.path}")
+                    yield None
+                    continue
+                yield entry
+
+    def load(self):
+        """
+        Stream the log into processed URLs and their latest results.
+
+        Returns:
+            tuple: (results dict of URL to result, whether the log has
+                duplicate or unreadable lines worth compacting away)
+        """
+        results = {}
+        lines = 0
+        for entry in self.entries():
+            lines += 1
+            if entry is None:
+                continue
+            # The last entry of a URL wins
+            results.pop(entry['url'], None)
+            results[entry['url']] = entry['result']
+        return results, lines > len(results)
+
+    def compact(self):
+        """
+        Atomically rewrite the log with one entry per URL.
+
+        Returns:
+            int: Number of entries kept
+        """
+        self.close()
+        results, _ = self.load()
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for url, result in results.items():
+                f.write(json.dumps({'url': url, 'result': result}, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+        logger.info(f"Compacted checkpoint {self.path} to {len(results)} entries")
+        return len(results)
+
+    def migrate_legacy(self, legacy_path):
+        """
+        Convert a checkpoint written as one JSON document into the log.
+
+        The legacy file is renamed to <name>.migrated once converted.
+
+        Args:
+            legacy_path (str): Path of the old JSON checkpoint
+
+        Returns:
+            int: Number of entries migrated, 0 if there was nothing to do
+        """
+        if not os.path.exists(legacy_path):
+            return 0
+
+        with open(legacy_path, 'r', encoding='utf-8') as f:
+            legacy = json.load(f)
+
+        results = {result['url']: result for result in legacy.get('results', []) if result.get('url')}
+        count = 0
+        for url in dict.fromkeys(list(results) + list(legacy.get('processed_urls', []))):
+            self.append(url, results.get(url))
+            count += 1
+        self.compact()
+
+        os.replace(legacy_path, f"{legacy_path}.migrated")
+        logger.info(f"Migrated {count} entries from {legacy_path} to {self.path}")
+        return count
+
+    def flush(self):
+        """Force written entries to disk."""
+        if self.file is not None:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        """Flush and close the log file."""
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+    def clear(self):
+        """Delete the log."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
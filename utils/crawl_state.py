@@ -0,0 +1,258 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+def content_hash(text):
+    """
+    Hash page or record content.
+
+    Args:
+        text (str): Content to hash
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def record_hash(record):
+    """Hash the fields of a parsed record, independent of key order."""
+    return content_hash(json.dumps(record, sort_keys=True, ensure_ascii=False))
+
+class CrawlStateStore:
+    """
+    Per-URL crawl state in SQLite: HTTP validators (ETag, Last-Modified),
+    hashes of the raw page and of the parsed record, and the record itself.
+
+    Used for conditional GETs on recrawls and to tell added, updated and
+    unchanged pages apart. Not thread-safe; use it from one thread.
+    """
+    def __init__(self, db_path='scraper_state.db'):
+        """
+        Initialize the store.
+
+        Args:
+            db_path (str): SQLite database path
+        """
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    page_hash TEXT,
+                    record_hash TEXT,
+                    record TEXT,
+                    first_seen REAL,
+                    last_seen REAL,
+                    updated_at REAL
+                )
+            ''')
+
+    def get(self, url):
+        """
+        Get the state of a URL.
+
+        Args:
+            url (str): Page URL
+
+        Returns:
+            dict or None: State with the record decoded
+        """
+        row = self.conn.execute(
+            'SELECT url, etag, last_modified, page_hash, record_hash, record, first_seen, last_seen, updated_at '
+            'FROM pages WHERE url = ?', (url,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        columns = ('url', 'etag', 'last_modified', 'page_hash', 'record_hash', 'record',
+                   'first_seen', 'last_seen', 'updated_at')
+        state = dict(zip(columns, row))
+        state['record'] = json.loads(state['record']) if state['record'] else None
+        return state
+
+    def conditional_headers(self, url):
+        """
+        Get the headers for a conditional GET of a URL.
+
+        Args:
+            url (str): Page URL
+
+        Returns:
+            dict: If-None-Match and/or If-Modified-Since, empty for new URLs
+        """
+        row = self.conn.execute('SELECT etag, last_modified FROM pages WHERE url = ?', (url,)).fetchone()
+        headers = {}
+        if row and row[0]:
+            headers['If-None-Match'] = row[0]
+        if row and row[1]:
+            headers['If-Modified-Since'] = row[1]
+        return headers
+
+    def page_hash(self, url):
+        """Get the hash of the last fetched page body of a URL."""
+        row = self.conn.execute('SELECT page_hash FROM pages WHERE url = ?', (url,)).fetchone()
+        return row[0] if row else None
+
+    def touch(self, url, etag=None, last_modified=None):
+        """
+        Mark a URL as seen without a content change.
+
+        Args:
+            url (str): Page URL
+            etag (str, optional): New ETag, if the server sent one
+            last_modified (str, optional): New Last-Modified, if sent
+        """
+        with self.conn:
+            self.conn.execute(
+                'UPDATE pages SET last_seen = ?, etag = COALESCE(?, etag), '
+                'last_modified = COALESCE(?, last_modified) WHERE url = ?',
+                (time.time(), etag, last_modified, url)
+            )
+
+    def update(self, url, record, etag=None, last_modified=None, page_hash=None):
+        """
+        Store a freshly parsed record of a URL.
+
+        Args:
+            url (str): Page URL
+            record (dict): Parsed record
+            etag (str, optional): ETag of the response
+            last_modified (str, optional): Last-Modified of the response
+            page_hash (str, optional): Hash of the response body
+
+        Returns:
+            str or None: 'added', 'updated', or None if the record is unchanged
+        """
+        now = time.time()
+        new_hash = record_hash(record)
+        row = self.conn.execute('SELECT record_hash FROM pages WHERE url = ?', (url,)).fetchone()
+
+        if row is None:
+            change = 'added'
+        elif row[0] != new_hash:
+            change = 'updated'
+        else:
+            change = None
+
+        with self.conn:
+            if row is None:
+                self.conn.execute(
+                    'INSERT INTO pages (url, etag, last_modified, page_hash, record_hash, record, '
+                    'first_seen, last_seen, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (url, etag, last_modified, page_hash, new_hash, json.dumps(record, ensure_ascii=False),
+                     now, now, now)
+                )
+            else:
+                self.conn.execute(
+                    'UPDATE pages SET etag = ?, last_modified = ?, page_hash = ?, record_hash = ?, record = ?, '
+                    'last_seen = ?, updated_at = CASE WHEN ? THEN ? ELSE updated_at END WHERE url = ?',
+                    (etag, last_modified, page_hash, new_hash, json.dumps(record, ensure_ascii=False),
+                     now, change is not None, now, url)
+                )
+        return change
+
+    def remove(self, url):
+        """
+        Forget a URL.
+
+        Args:
+            url (str): Page URL
+
+        Returns:
+            dict or None: The removed record, None if the URL was unknown
+        """
+        state = self.get(url)
+        if state is None:
+            return None
+        with self.conn:
+            self.conn.execute('DELETE FROM pages WHERE url = ?', (url,))
+        return state['record']
+
+    def urls(self):
+        """
+        Get every known URL.
+
+        Returns:
+            set: URLs
+        """
+        return {row[0] for row in self.conn.execute('SELECT url FROM pages')}
+
+    def records(self):
+        """
+        Iterate over the stored records in the order they were first seen.
+
+        Yields:
+            dict: Parsed record
+        """
+        for (record,) in self.conn.execute('SELECT record FROM pages WHERE record IS NOT NULL ORDER BY first_seen, rowid'):
+            yield json.loads(record)
+
+class ChangeFeed:
+    """
+    Append-only JSONL feed of added, updated and removed records, for
+    downstream indexing to consume.
+    """
+    def __init__(self, path='scraper_changes.jsonl'):
+        """
+        Initialize the feed.
+
+        Args:
+            path (str): JSONL file the changes are appended to
+        """
+        self.path = path
+        self.counts = {'added': 0, 'updated': 0, 'removed': 0}
+
+    def emit(self, change, url, record=None):
+        """
+        Append one change.
+
+        Args:
+            change (str): 'added', 'updated' or 'removed'
+            url (str): Page URL
+            record (dict, optional): The new record, or the last known one
+                for removals
+        """
+        event = {'type': change, 'url': url, 'record': record, 'changed_at': time.time()}
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(event, ensure_ascii=False) + '\n')
+        self.counts[change] += 1
+
+    @staticmethod
+    def read(path, since=0):
+        """
+        Read changes from a feed file.
+
+        Args:
+            path (str): JSONL feed file
+            since (float): Only return changes after this timestamp
+
+        Yields:
+            dict: Change with 'type', 'url', 'record' and 'changed_at'
+        """
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # A torn last line from an interrupted write
+                    logger.warning(f"Skipping unreadable change feed line in {path}")
+                    continue
+                if event.get('changed_at', 0) > since:
+                    yield event
@@ -0,0 +1,257 @@
+import time
+import random
+import asyncio
+import logging
+from urllib.parse import urlparse, urlunparse, urljoin, parse_qsl, urlencode
+from concurrent.futures import ThreadPoolExecutor
+import aiohttp
+from utils.http_client import RETRY_STATUSES, HostPolicy, CircuitOpenError, host_registry, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that only track visitors and never change the page
+TRACKING_PARAMS = ('utm_', 'gclid', 'fbclid', 'mc_cid', 'mc_eid')
+
+def normalize_url(url, base=None):
+    """
+    Normalize a URL so that different spellings of a page compare equal.
+
+    Resolves it against a base, lower-cases the scheme and host, drops
+    default ports, fragments and tracking parameters, and sorts the query.
+
+    Args:
+        url (str): URL or relative link
+        base (str, optional): URL the link was found on
+
+    Returns:
+        str or None: Normalized URL, None if it is not an http(s) URL
+    """
+    if base:
+        url = urljoin(base, url)
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    if scheme not in ('http', 'https'):
+        return None
+
+    host = (parsed.hostname or '').lower()
+    if not host:
+        return None
+    if parsed.port and not ((scheme == 'http' and parsed.port == 80) or (scheme == 'https' and parsed.port == 443)):
+        host = f"{host}:{parsed.port}"
+
+    query = sorted((key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+                   if not key.lower().startswith(TRACKING_PARAMS))
+    return urlunparse((scheme, host, parsed.path or '/', '', urlencode(query), ''))
+
+class _HostLimiter:
+    """Concurrency and politeness limits for one host."""
+    def __init__(self, max_concurrency, delay):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.delay = delay
+        self.next_request = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait_turn(self):
+        """Wait until the politeness delay since the last request has passed."""
+        if self.delay <= 0:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            wait = self.next_request - now
+            self.next_request = max(now, self.next_request) + self.delay
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+class AsyncCrawler:
+    """
+    Asyncio crawl engine for many concurrent page fetches.
+
+    A fixed pool of worker coroutines fetches pages with a global limit on
+    in-flight requests, a per-host concurrency limit and a per-host delay
+    between requests. Each host's rate also goes through the shared host
+    state of utils.http_client, so it adapts to 429/503 and Retry-After
+    and a host that is down fails fast. Retries back off with
+    asyncio.sleep, so a waiting retry never holds up other fetches. Parsing runs in worker threads and
+    every result goes through a single consumer coroutine, so the caller's
+    result handling needs no locks.
+    """
+    def __init__(self, headers=None, max_concurrency=100, per_host=8, delay=0.0,
+                 max_retries=3, timeout=30, parse_workers=4, policy=None):
+        """
+        Initialize the crawler.
+
+        Args:
+            headers (dict, optional): Headers sent with every request
+            max_concurrency (int): Maximum requests in flight overall
+            per_host (int): Maximum requests in flight per host
+            delay (float): Minimum seconds between requests to the same host
+            max_retries (int): Attempts per URL
+            timeout (float): Seconds before a request is abandoned
+            parse_workers (int): Threads used for parsing
+            policy (HostPolicy, optional): Rate limit and circuit breaker
+                settings of the crawled hosts, defaults to the delay's rate.
+                Applied to each host on its first request, replacing the
+                settings of other clients that called it before
+        """
+        self.headers = headers or {}
+        self.max_concurrency = max_concurrency
+        self.per_host = per_host
+        self.delay = delay
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.parse_workers = parse_workers
+        self.policy = policy or HostPolicy(rate=1.0 / delay if delay > 0 else 20.0, burst=per_host)
+        self.hosts = {}
+        self.stats = {}
+
+    def _host(self, url):
+        """Get the limiter of a URL's host."""
+        host = urlparse(url).netloc
+        if host not in self.hosts:
+            self.hosts[host] = _HostLimiter(self.per_host, self.delay)
+            # The crawl's own settings win over a policy a client fetching
+            # e.g. robots.txt created the host with
+            host_registry.for_url(url, self.policy, replace=True)
+        return self.hosts[host]
+
+    async def fetch(self, session, url, headers=None):
+        """
+        Fetch a URL, retrying network errors and retryable statuses.
+
+        Args:
+            session (aiohttp.ClientSession): Session to use
+            url (str): URL to fetch
+            headers (dict, optional): Extra request headers
+
+        Returns:
+            dict: 'url', 'status', 'headers', 'text' and 'error'
+        """
+        host = self._host(url)
+        state = host_registry.for_url(url, self.policy)
+        error = None
+
+        for attempt in range(1, self.max_retries + 1):
+            retry_after = None
+            async with host.semaphore:
+                await host.wait_turn()
+                try:
+                    # Waiting here holds no thread, so wait as long as needed
+                    wait_time = state.before_request(max_wait=float('inf'))
+                except CircuitOpenError as e:
+                    # The host is down, retrying now would only fail again
+                    logger.warning(f"Not fetching {url}: {e}")
+                    return {'url': url, 'status': None, 'headers': {}, 'text': None, 'error': str(e)}
+                if wait_time:
+                    await asyncio.sleep(wait_time)
+
+                started = time.monotonic()
+                try:
+                    logger.info(f"Fetching: {url}")
+                    async with session.get(url, headers=headers) as response:
+                        text = await response.text(errors='replace')
+                        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                        state.record_response(response.status, retry_after, time.monotonic() - started)
+                        if response.status not in RETRY_STATUSES:
+                            self.stats['bytes'] += len(text)
+                            return {'url': url, 'status': response.status, 'headers': dict(response.headers),
+                                    'text': text, 'error': None}
+                        error = f"HTTP {response.status}"
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    state.record_error(time.monotonic() - started)
+                    error = str(e) or type(e).__name__
+
+            if attempt < self.max_retries:
+                # A Retry-After also holds back the host's other requests
+                # through its shared limiter
+                wait_time = max(2 ** attempt + random.uniform(0, 1), retry_after or 0)
+                self.stats['retries'] += 1
+                state.record_retry()
+                logger.warning(f"Error fetching {url}: {error}. Retrying in {wait_time:.1f} seconds...")
+                await asyncio.sleep(wait_time)
+
+        logger.error(f"Failed to fetch {url} after {self.max_retries} attempts")
+        return {'url': url, 'status': None, 'headers': {}, 'text': None, 'error': error}
+
+    async def crawl_async(self, items, parse, consume):
+        """
+        Fetch and parse items concurrently, handing results to one consumer.
+
+        Args:
+            items (iterable): Dicts with a 'url' and optional 'headers'
+            parse (callable): parse(item, page) run in a thread, returning
+                the result to consume; page is the dict returned by fetch
+            consume (callable): consume(item, page, result) called for every
+                item from a single coroutine, in completion order
+
+        Returns:
+            dict: Crawl statistics
+        """
+        self.stats = {'pages': 0, 'failed': 0, 'retries': 0, 'bytes': 0, 'elapsed': 0.0, 'pages_per_sec': 0.0}
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+
+        pending = asyncio.Queue()
+        for item in items:
+            pending.put_nowait(item)
+        results = asyncio.Queue(maxsize=self.max_concurrency * 2)
+
+        # Limiters hold asyncio primitives tied to this event loop
+        self.hosts = {}
+        parser_pool = ThreadPoolExecutor(max_workers=self.parse_workers, thread_name_prefix='crawl-parse')
+
+        async def worker(session):
+            while True:
+                try:
+                    item = pending.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                page = await self.fetch(session, item['url'], item.get('headers'))
+                try:
+                    result = await loop.run_in_executor(parser_pool, parse, item, page)
+                except Exception as e:
+                    logger.error(f"Error parsing {item['url']}: {e}")
+                    result = None
+                await results.put((item, page, result))
+
+        async def consumer(total):
+            for _ in range(total):
+                item, page, result = await results.get()
+                if page['error'] is not None:
+                    self.stats['failed'] += 1
+                else:
+                    self.stats['pages'] += 1
+                try:
+                    consume(item, page, result)
+                except Exception as e:
+                    logger.error(f"Error handling result of {item['url']}: {e}")
+
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.per_host)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        try:
+            async with aiohttp.ClientSession(headers=self.headers, connector=connector, timeout=timeout) as session:
+                total = pending.qsize()
+                workers = [asyncio.create_task(worker(session)) for _ in range(min(self.max_concurrency, total))]
+                await asyncio.gather(consumer(total), *workers)
+        finally:
+            parser_pool.shutdown(wait=False)
+
+        self.stats['elapsed'] = time.monotonic() - started
+        if self.stats['elapsed'] > 0:
+            self.stats['pages_per_sec'] = self.stats['pages'] / self.stats['elapsed']
+        logger.info(f"Crawled {self.stats['pages']} pages ({self.stats['failed']} failed) in "
+                    f"{self.stats['elapsed']:.1f}s, {self.stats['pages_per_sec']:.1f} pages/sec")
+        return self.stats
+
+    def crawl(self, items, parse, consume):
+        """
+        Run crawl_async to completion from synchronous code.
+
+        Args:
+            items (iterable): Dicts with a 'url' and optional 'headers'
+            parse (callable): parse(item, page) returning the result to consume
+            consume (callable): consume(item, page, result) for every item
+
+        Returns:
+            dict: Crawl statistics
+        """
+        return asyncio.run(self.crawl_async(items, parse, consume))
@@ -0,0 +1,269 @@
+import re
+import csv
+import hashlib
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_MAX_HASH = (1 << 32) - 1
+
+# Words that phrase a question rather than say what it is about
+_QUESTION_STOPWORDS = frozenset((
+    'a an the how what when where which who whom whose why is are was were be been am do does did '
+    'can could shall should will would may might must i me my we our you your it its this that these '
+    'those to of in on for at by with from about and or if there any some'
+).split())
+
+def normalize_text(text):
+    """
+    Normalize text for duplicate detection: lowercase, punctuation dropped
+    and whitespace collapsed.
+
+    Args:
+        text (str): Text to normalize
+
+    Returns:
+        str: Normalized text
+    """
+    text = re.sub(r'[^\w\s]', ' ', str(text or '').lower())
+    return re.sub(r'\s+', ' ', text).strip()
+
+def shingles(text, size=5):
+    """
+    Get the character shingles of normalized text.
+
+    Used for answers, where character shingles tolerate small wording and
+    spelling changes.
+
+    Args:
+        text (str): Normalized text
+        size (int): Shingle length
+
+    Returns:
+        set: Shingles, the whole text if it is shorter than one shingle
+    """
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+def question_terms(text):
+    """
+    Get the content words of a normalized question.
+
+    Questions are compared on what they ask about rather than on character
+    shingles: "How do I reset my debit card PIN?" and "How can I reset my
+    debit card PIN?" differ in a quarter of their shingles but have the same
+    content words, while "charges for NEFT" and "charges for RTGS" share most
+    shingles but not their content words.
+
+    Args:
+        text (str): Normalized question
+
+    Returns:
+        set: Words of the question, all of them if it is only stopwords
+    """
+    words = set(text.split())
+    return (words - _QUESTION_STOPWORDS) or words
+
+class MinHasher:
+    """
+    MinHash signatures of shingle sets, computed with numpy.
+
+    The fraction of equal positions in two signatures estimates the Jaccard
+    similarity of the two sets. Shingles are hashed with the built-in
+    string hash, so signatures are only comparable within one process.
+    """
+    def __init__(self, num_perm=64, seed=1):
+        """
+        Initialize the hash permutations.
+
+        Args:
+            num_perm (int): Signature length
+            seed (int): Seed of the permutations, signatures are only
+                comparable between hashers with the same seed
+        """
+        self.num_perm = num_perm
+        generator = np.random.RandomState(seed)
+        # Odd multipliers for multiply-shift hashing
+        self.a = generator.randint(0, 1 << 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = generator.randint(0, 1 << 63, size=num_perm, dtype=np.uint64)
+
+    def signature(self, items):
+        """
+        Compute the signature of a set.
+
+        Args:
+            items (set): Shingles
+
+        Returns:
+            numpy.ndarray: uint32 signature, all max values for an empty set
+        """
+        if not items:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        hashes = np.fromiter((hash(item) & _MAX_HASH for item in items), dtype=np.uint64, count=len(items))
+        # High 32 bits of (a * x + b) mod 2^64, for every shingle and
+        # permutation at once
+        permuted = (np.outer(hashes, self.a) + self.b) >> np.uint64(32)
+        return permuted.min(axis=0).astype(np.uint32)
+
+class FaqDeduplicator:
+    """
+    Drop exact and near-duplicate FAQs as they are ingested.
+
+    Exact duplicates are found by hashing the normalized question and
+    answer. Near duplicates are found with MinHash signatures of the
+    question's content words and of the answer's character shingles: LSH
+    buckets over the answer signature give candidate FAQs, which are
+    duplicates when both their question and answer similarity reach the
+    threshold. The first FAQ seen is kept. Every dropped FAQ is recorded
+    for the dedup report. Not thread-safe; feed it from one thread.
+    """
+    def __init__(self, threshold=0.8, num_perm=64, bands=16, shingle_size=5):
+        """
+        Initialize the deduplicator.
+
+        Args:
+            threshold (float): Minimum estimated Jaccard similarity of both
+                the questions and the answers of near duplicates
+            num_perm (int): MinHash signature length
+            bands (int): LSH bands, must divide num_perm. More bands find
+                candidates at lower similarity at the cost of more checks
+            shingle_size (int): Character shingle length of answers
+        """
+        if num_perm % bands:
+            raise ValueError(f"bands ({bands}) must divide num_perm ({num_perm})")
+
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.hasher = MinHasher(num_perm)
+
+        self.exact = {}
+        self.buckets = [{} for _ in range(bands)]
+        self.kept = []
+        self.dropped = []
+        # Signatures of kept FAQs, one row each, grown by doubling
+        self.question_signatures = np.empty((64, num_perm), dtype=np.uint32)
+        self.answer_signatures = np.empty((64, num_perm), dtype=np.uint32)
+
+    def _band_keys(self, signature):
+        """Get the LSH bucket key of each band of a signature."""
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def find_duplicate(self, question, answer):
+        """
+        Look for an already kept FAQ this one duplicates.
+
+        Args:
+            question (str): Question text
+            answer (str): Answer text
+
+        Returns:
+            tuple: (kind, kept position, similarity, key, signatures) where
+                kind is 'exact', 'near' or None
+        """
+        question, answer = normalize_text(question), normalize_text(answer)
+        key = hashlib.sha1(f"{question}\x1f{answer}".encode('utf-8')).hexdigest()
+        if key in self.exact:
+            return 'exact', self.exact[key], 1.0, key, None
+
+        question_signature = self.hasher.signature(question_terms(question))
+        answer_signature = self.hasher.signature(shingles(answer, self.shingle_size))
+        candidates = set()
+        for band, band_key in enumerate(self._band_keys(answer_signature)):
+            candidates.update(self.buckets[band].get(band_key, ()))
+
+        if candidates:
+            positions = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            # Compare with every candidate at once
+            similarities = np.minimum(
+                (self.question_signatures[positions] == question_signature).mean(axis=1),
+                (self.answer_signatures[positions] == answer_signature).mean(axis=1)
+            )
+            best = int(similarities.argmax())
+            if similarities[best] >= self.threshold:
+                return 'near', int(positions[best]), float(similarities[best]), key, None
+        return None, None, 0.0, key, (question_signature, answer_signature)
+
+    def add(self, record):
+        """
+        Ingest one FAQ.
+
+        Args:
+            record (dict): FAQ with 'question' and 'answer'
+
+        Returns:
+            bool: True if the FAQ is new and was kept, False if dropped
+        """
+        kind, position, similarity, key, signatures = self.find_duplicate(record.get('question', ''),
+                                                                          record.get('answer', ''))
+        if kind is not None:
+            self.dropped.append({'kind': kind, 'similarity': similarity, 'record': record,
+                                 'kept': self.kept[position]})
+            logger.debug(f"Dropped {kind} duplicate FAQ: {str(record.get('question', ''))[:30]}...")
+            return False
+
+        position = len(self.kept)
+        if position == len(self.question_signatures):
+            self.question_signatures = np.concatenate([self.question_signatures, np.empty_like(self.question_signatures)])
+            self.answer_signatures = np.concatenate([self.answer_signatures, np.empty_like(self.answer_signatures)])
+        self.question_signatures[position], self.answer_signatures[position] = signatures
+        self.exact[key] = position
+        self.kept.append(record)
+        for band, band_key in enumerate(self._band_keys(signatures[1])):
+            self.buckets[band].setdefault(band_key, []).append(position)
+        return True
+
+    def filter(self, records):
+        """
+        Ingest FAQs and keep the new ones.
+
+        Args:
+            records (iterable): FAQs with 'question' and 'answer'
+
+        Returns:
+            list: The FAQs that were kept, in order
+        """
+        return [record for record in records if self.add(record)]
+
+    def counts(self):
+        """
+        Count kept and dropped FAQs.
+
+        Returns:
+            dict: kept, exact and near counts
+        """
+        exact = sum(1 for drop in self.dropped if drop['kind'] == 'exact')
+        return {'kept': len(self.kept), 'exact': exact, 'near': len(self.dropped) - exact}
+
+    def write_report(self, path):
+        """
+        Write the dropped FAQs and the FAQ each duplicated to a CSV file.
+
+        Args:
+            path (str): Output CSV path
+
+        Returns:
+            int: Number of dropped FAQs written
+        """
+        fieldnames = ['kind', 'similarity', 'question', 'url', 'source', 'kept_question', 'kept_url', 'kept_source']
+        with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer.writeheader()
+            for drop in self.dropped:
+                record, kept = drop['record'], drop['kept']
+                writer.writerow({
+                    'kind': drop['kind'],
+                    'similarity': f"{drop['similarity']:.2f}",
+                    'question': record.get('question', ''),
+                    'url': record.get('url', ''),
+                    'source': record.get('source_type', record.get('category', '')),
+                    'kept_question': kept.get('question', ''),
+                    'kept_url': kept.get('url', ''),
+                    'kept_source': kept.get('source_type', kept.get('category', ''))
+                })
+
+        logger.info(f"Wrote dedup report of {len(self.dropped)} dropped FAQs to {path}")
+        return len(self.dropped)
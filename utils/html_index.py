@@ -0,0 +1,246 @@
+import os
+import logging
+from bs4 import BeautifulSoup, Tag
+
+logger = logging.getLogger(__name__)
+
+# Parser backends in order of preference
+BACKENDS = ('lxml', 'html.parser')
+
+def available_backends():
+    """
+    Get the parser backends that can be used here.
+
+    Returns:
+        list: Backend names, fastest first
+    """
+    backends = []
+    for backend in BACKENDS:
+        try:
+            BeautifulSoup('<p></p>', backend)
+            backends.append(backend)
+        except Exception:
+            continue
+    return backends
+
+def default_backend():
+    """Get the configured backend (SCRAPER_HTML_PARSER) or the fastest available."""
+    configured = os.getenv('SCRAPER_HTML_PARSER')
+    if configured:
+        return configured
+    backends = available_backends()
+    return backends[0] if backends else 'html.parser'
+
+_default_backend = None
+
+def parse_html(html, backend=None):
+    """
+    Parse HTML into a BeautifulSoup tree.
+
+    lxml is used when installed as it parses several times faster than the
+    pure Python html.parser; the resulting tree has the same API either way.
+
+    Args:
+        html (str): HTML to parse
+        backend (str, optional): 'lxml' or 'html.parser', defaults to the
+            fastest available
+
+    Returns:
+        BeautifulSoup: Parsed document
+    """
+    global _default_backend
+    if backend is None:
+        if _default_backend is None:
+            _default_backend = default_backend()
+            logger.info(f"Using {_default_backend} to parse HTML")
+        backend = _default_backend
+    return BeautifulSoup(html, backend)
+
+class HtmlIndex:
+    """
+    Element index of a parsed document, built in one pass over the tree.
+
+    Elements are indexed by tag name, class token, id and by the attributes
+    extraction code filters on (aria-* and data-*), so that extraction
+    strategies query small lists instead of rescanning the whole document
+    with find_all. Results are returned in document order.
+    """
+    def __init__(self, soup):
+        """
+        Build the index.
+
+        Args:
+            soup (BeautifulSoup or Tag): Parsed document
+        """
+        self.soup = soup
+        self.position = {}
+        self.end = {}
+        self.by_tag = {}
+        self.by_class = {}
+        self.by_id = {}
+        self.by_attr = {}
+
+        position = 0
+        self.position[id(soup)] = -1
+        # Depth-first walk recording where each element's subtree ends
+        stack = [(soup, iter(soup.contents))]
+        while stack:
+            parent, children = stack[-1]
+            element = next(children, None)
+            if element is None:
+                self.end[id(parent)] = position - 1
+                stack.pop()
+                continue
+            if not isinstance(element, Tag):
+                continue
+
+            self.position[id(element)] = position
+            position += 1
+            self._add(element)
+            stack.append((element, iter(element.contents)))
+
+    def _add(self, element):
+        """Add an element to the lookup tables."""
+        self.by_tag.setdefault(element.name, []).append(element)
+
+        for name, value in element.attrs.items():
+            if name == 'class':
+                for token in value if isinstance(value, list) else str(value).split():
+                    self.by_class.setdefault(token.lower(), []).append(element)
+            elif name == 'id':
+                self.by_id.setdefault(value, element)
+            elif name.startswith(('aria-', 'data-')):
+                self.by_attr.setdefault(name, []).append(element)
+
+    def within(self, container, elements):
+        """
+        Keep the elements inside a container.
+
+        Args:
+            container (Tag): Indexed element
+            elements (list): Indexed elements
+
+        Returns:
+            list: Descendants of the container, in the given order
+        """
+        start = self.position.get(id(container))
+        end = self.end.get(id(container))
+        if start is None or end is None:
+            return []
+        return [element for element in elements if start < self.position.get(id(element), -2) <= end]
+
+    def in_order(self, elements):
+        """
+        Deduplicate elements and sort them into document order.
+
+        Args:
+            elements (iterable): Indexed elements
+
+        Returns:
+            list: Unique elements in document order
+        """
+        unique = {id(element): element for element in elements}
+        return sorted(unique.values(), key=lambda element: self.position.get(id(element), -1))
+
+    def _filter_names(self, elements, names):
+        """Keep elements with one of the given tag names."""
+        if not names:
+            return elements
+        if isinstance(names, str):
+            names = (names,)
+        return [element for element in elements if element.name in names]
+
+    def tags(self, *names):
+        """
+        Get every element with one of the tag names.
+
+        Args:
+            names (str): Tag names
+
+        Returns:
+            list: Elements in document order
+        """
+        if len(names) == 1:
+            return list(self.by_tag.get(names[0], []))
+        return self.in_order(element for name in names for element in self.by_tag.get(name, []))
+
+    def with_class(self, pattern, names=None):
+        """
+        Get elements with a class token matching a regex, like
+        find_all(names, class_=re.compile(pattern)).
+
+        Args:
+            pattern (re.Pattern): Pattern searched in each class token
+            names (str or list, optional): Tag names to keep
+
+        Returns:
+            list: Elements in document order
+        """
+        matched = [element for token, elements in self.by_class.items() if pattern.search(token)
+                   for element in elements]
+        return self._filter_names(self.in_order(matched), names)
+
+    def with_attr(self, attr, pattern=None, names=None):
+        """
+        Get elements with an aria-* or data-* attribute, optionally with a
+        value matching a regex.
+
+        Args:
+            attr (str): Attribute name
+            pattern (re.Pattern, optional): Pattern searched in the value
+            names (str or list, optional): Tag names to keep
+
+        Returns:
+            list: Elements in document order
+        """
+        elements = self.by_attr.get(attr, [])
+        if pattern is not None:
+            elements = [element for element in elements if pattern.search(str(element.get(attr, '')))]
+        return self._filter_names(list(elements), names)
+
+    def attr_equals(self, attr, value, names=None):
+        """
+        Get the first element whose attribute has an exact value.
+
+        Args:
+            attr (str): Attribute name
+            value (str): Value to match
+            names (str or list, optional): Tag names to keep
+
+        Returns:
+            Tag or None: The element
+        """
+        for element in self._filter_names(self.by_attr.get(attr, []), names):
+            if element.get(attr) == value:
+                return element
+        return None
+
+    def get_by_id(self, element_id):
+        """
+        Get an element by id.
+
+        Args:
+            element_id (str): Element id
+
+        Returns:
+            Tag or None: The element
+        """
+        return self.by_id.get(element_id)
+
+    def ids_matching(self, pattern, names=None):
+        """
+        Get elements whose id matches a regex.
+
+        Args:
+            pattern (re.Pattern): Pattern searched in the id
+            names (str or list, optional): Tag names to keep
+
+        Returns:
+            list: Elements in document order
+        """
+        matched = [element for element_id, element in self.by_id.items() if pattern.search(element_id.lower())]
+        return self._filter_names(self.in_order(matched), names)
+
+    def is_attached(self, element):
+        """Check that an element was not removed from the tree since indexing."""
+        return isinstance(element, Tag) and (element is self.soup or element.parent is not None)
@@ -0,0 +1,449 @@
+import time
+import random
+import logging
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+import requests
+from utils.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Statuses that mean the host wants fewer requests
+THROTTLE_STATUSES = {429, 503}
+
+# Statuses worth retrying
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Methods safe to send again after a failure
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+class CircuitOpenError(requests.RequestException):
+    """Raised without a request while a host's circuit breaker is open."""
+
+class RateLimitedError(requests.RequestException):
+    """Raised instead of waiting longer than allowed for a host's rate limit."""
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header.
+
+    Args:
+        value (str): Seconds or an HTTP date
+
+    Returns:
+        float or None: Seconds to wait, None if missing or invalid
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+class _Timings:
+    """Count, total, max and recent samples of a duration."""
+    def __init__(self, samples=512):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=samples)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def summary(self):
+        recent = sorted(self.recent)
+
+        def percentile(share):
+            return round(recent[min(len(recent) - 1, int(share * len(recent)))], 4) if recent else 0.0
+
+        return {
+            'count': self.count,
+            'avg': round(self.total / self.count, 4) if self.count else 0.0,
+            'p50': percentile(0.5),
+            'p95': percentile(0.95),
+            'max': round(self.max, 4)
+        }
+
+class HostPolicy:
+    """
+    Rate limit, adaptation and circuit breaker settings for a host.
+    """
+    def __init__(self, rate=5.0, burst=None, min_rate=0.2, max_rate=None, increase=0.1, decrease=0.5,
+                 max_wait=5.0, failure_threshold=5, reset_timeout=30.0):
+        """
+        Initialize the policy.
+
+        Args:
+            rate (float): Starting requests per second
+            burst (float, optional): Token bucket capacity, defaults to rate
+            min_rate (float): Lowest rate after repeated throttling
+            max_rate (float, optional): Highest rate reached by additive
+                increase, defaults to rate
+            increase (float): Requests per second added after each success
+            decrease (float): Factor the rate is multiplied by on 429/503
+            max_wait (float or None): Longest a request may wait for the
+                limiter or a retry before failing fast, None to always wait
+            failure_threshold (int): Consecutive failures that open the circuit
+            reset_timeout (float): Seconds the circuit stays open before a
+                single trial request is let through
+        """
+        self.rate = float(rate)
+        self.burst = burst
+        self.min_rate = min(float(min_rate), self.rate)
+        self.max_rate = float(max_rate if max_rate is not None else rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.max_wait = max_wait
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+class HostState:
+    """
+    Outbound request state of one host: an AIMD-adapted token bucket, a
+    circuit breaker and timing metrics. Thread-safe, and usable from
+    asyncio code as it never sleeps itself.
+    """
+    def __init__(self, host, policy):
+        """
+        Initialize the host state.
+
+        Args:
+            host (str): Host name
+            policy (HostPolicy): Settings for the host
+        """
+        self.host = host
+        self.policy = policy
+        self.limiter = RateLimiter(policy.rate, policy.burst)
+        self.lock = threading.Lock()
+
+        self.circuit = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.last_decrease = 0.0
+
+        self.queue_wait = _Timings()
+        self.request_time = _Timings()
+        self.counts = {'requests': 0, 'success': 0, 'throttled': 0, 'failures': 0, 'retries': 0,
+                       'rejected_open': 0, 'rejected_wait': 0, 'circuit_opened': 0}
+
+    def set_policy(self, policy):
+        """
+        Replace the host's settings, restarting its rate limit at the new
+        policy's rate. The circuit breaker state is kept.
+
+        Args:
+            policy (HostPolicy): New settings
+        """
+        with self.lock:
+            self.policy = policy
+            self.limiter = RateLimiter(policy.rate, policy.burst)
+
+    def before_request(self, max_wait=None):
+        """
+        Take a slot for one request.
+
+        Args:
+            max_wait (float, optional): Longest acceptable wait, defaults to
+                the policy's max_wait
+
+        Returns:
+            float: Seconds the caller must wait before sending
+
+        Raises:
+            CircuitOpenError: If the host is considered down
+            RateLimitedError: If the wait would be longer than max_wait
+        """
+        max_wait = self.policy.max_wait if max_wait is None else max_wait
+        with self.lock:
+            if self.circuit == 'open':
+                if time.monotonic() - self.opened_at < self.policy.reset_timeout:
+                    self.counts['rejected_open'] += 1
+                    raise CircuitOpenError(f"Circuit open for {self.host}")
+                self.circuit = 'half_open'
+                self.probing = False
+            if self.circuit == 'half_open':
+                # One trial request at a time decides if the host is back
+                if self.probing:
+                    self.counts['rejected_open'] += 1
+                    raise CircuitOpenError(f"Circuit half-open for {self.host}, trial request in flight")
+                self.probing = True
+
+        wait_time = self.limiter.reserve(1, max_wait)
+        if wait_time is None:
+            with self.lock:
+                self.counts['rejected_wait'] += 1
+                self.probing = False
+            raise RateLimitedError(f"Rate limit for {self.host} would need more than {max_wait:.1f}s of waiting")
+
+        with self.lock:
+            self.counts['requests'] += 1
+            self.queue_wait.add(wait_time)
+        return wait_time
+
+    def record_response(self, status, retry_after=None, seconds=0.0):
+        """
+        Record the response to a request.
+
+        Args:
+            status (int): HTTP status
+            retry_after (float, optional): Parsed Retry-After header
+            seconds (float): Time the request took
+        """
+        with self.lock:
+            self.request_time.add(seconds)
+        if status in THROTTLE_STATUSES:
+            self._throttled(retry_after)
+            # A 503 without Retry-After may as well be an outage
+            if status == 503 and retry_after is None:
+                self._failure()
+            else:
+                self._settle()
+        elif status >= 500:
+            self._failure()
+        else:
+            self._success()
+
+    def record_error(self, seconds=0.0):
+        """
+        Record a request that failed without a response.
+
+        Args:
+            seconds (float): Time until the failure
+        """
+        with self.lock:
+            self.request_time.add(seconds)
+        self._failure()
+
+    def record_retry(self):
+        """Count a retried request."""
+        with self.lock:
+            self.counts['retries'] += 1
+
+    def _success(self):
+        """Close the circuit and additively raise the rate."""
+        with self.lock:
+            self.counts['success'] += 1
+            self.failures = 0
+            self.probing = False
+            if self.circuit != 'closed':
+                logger.info(f"Circuit closed for {self.host}")
+            self.circuit = 'closed'
+            rate = self.limiter.rate
+        if rate < self.policy.max_rate:
+            self.limiter.set_rate(min(self.policy.max_rate, rate + self.policy.increase))
+
+    def _settle(self):
+        """End a trial request that neither failed nor succeeded."""
+        with self.lock:
+            if self.circuit == 'half_open':
+                self.probing = False
+
+    def _throttled(self, retry_after):
+        """Multiplicatively lower the rate and honour Retry-After."""
+        now = time.monotonic()
+        with self.lock:
+            self.counts['throttled'] += 1
+            # Requests in flight together report one congestion event
+            decrease = now - self.last_decrease >= 1.0
+            if decrease:
+                self.last_decrease = now
+            rate = self.limiter.rate
+        if decrease:
+            new_rate = max(self.policy.min_rate, rate * self.policy.decrease)
+            self.limiter.set_rate(new_rate)
+            logger.warning(f"{self.host} is throttling, rate lowered to {new_rate:.2f}/s")
+        if retry_after:
+            self.limiter.pause(retry_after)
+
+    def _failure(self):
+        """Count a failure and open the circuit past the threshold."""
+        with self.lock:
+            self.counts['failures'] += 1
+            self.failures += 1
+            self.probing = False
+            if self.circuit == 'half_open' or (self.circuit == 'closed'
+                                               and self.failures >= self.policy.failure_threshold):
+                self.circuit = 'open'
+                self.opened_at = time.monotonic()
+                self.counts['circuit_opened'] += 1
+                logger.error(f"Circuit opened for {self.host} after {self.failures} failures, "
+                             f"failing fast for {self.policy.reset_timeout:.0f}s")
+
+    def stats(self):
+        """
+        Get the host's metrics.
+
+        Returns:
+            dict: Counts, current rate, circuit state and timings
+        """
+        with self.lock:
+            stats = dict(self.counts, circuit=self.circuit)
+            stats['queue_wait'] = self.queue_wait.summary()
+            stats['request_time'] = self.request_time.summary()
+        stats['rate'] = round(self.limiter.rate, 3)
+        return stats
+
+class HostRegistry:
+    """
+    Process-wide host states, so every client calling a host shares its
+    rate limit and circuit breaker.
+    """
+    def __init__(self):
+        """Initialize the registry."""
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def get(self, host, policy=None, replace=False):
+        """
+        Get the state of a host, creating it with a policy on first use.
+
+        Args:
+            host (str): Host name, with port if not the default
+            policy (HostPolicy, optional): Settings if the host is new
+            replace (bool): Also apply the policy if the host already has a
+                state, e.g. one created by another client with defaults
+
+        Returns:
+            HostState: The host state
+        """
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = HostState(host, policy or HostPolicy())
+            elif replace and policy is not None and self.hosts[host].policy is not policy:
+                self.hosts[host].set_policy(policy)
+            return self.hosts[host]
+
+    def for_url(self, url, policy=None, replace=False):
+        """Get the state of a URL's host."""
+        return self.get(urlparse(url).netloc.lower(), policy, replace)
+
+    def stats(self):
+        """
+        Get the metrics of every host.
+
+        Returns:
+            dict: Metrics by host
+        """
+        with self.lock:
+            hosts = list(self.hosts.values())
+        return {state.host: state.stats() for state in hosts}
+
+# Shared by every client in the process
+host_registry = HostRegistry()
+
+class HttpClient:
+    """
+    Outbound HTTP through a requests session with per-host rate limits,
+    AIMD adaptation on 429/503, Retry-After handling and circuit breaking.
+
+    Requests never wait longer than the policy's max_wait for a rate limit
+    or retry; they fail fast with RateLimitedError or CircuitOpenError,
+    both requests.RequestException subclasses, so a throttled or dead host
+    does not tie up worker threads.
+    """
+    def __init__(self, session=None, policy=None, host_policies=None, max_retries=2, timeout=30,
+                 registry=None):
+        """
+        Initialize the client.
+
+        Args:
+            session (requests.Session, optional): Session to send requests with
+            policy (HostPolicy, optional): Settings for hosts this client is
+                the first to call
+            host_policies (dict, optional): Settings by host name
+            max_retries (int): Extra attempts for idempotent requests
+            timeout (float): Default request timeout in seconds
+            registry (HostRegistry, optional): Host states, defaults to the
+                process-wide registry
+        """
+        self.session = session or requests.Session()
+        self.policy = policy or HostPolicy()
+        self.host_policies = host_policies or {}
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.registry = registry or host_registry
+
+    def host_state(self, url):
+        """Get the state of a URL's host."""
+        host = urlparse(url).netloc.lower()
+        return self.registry.get(host, self.host_policies.get(host, self.policy))
+
+    def get(self, url, **kwargs):
+        """GET a URL, see request()."""
+        return self.request('GET', url, **kwargs)
+
+    def request(self, method, url, max_wait=None, **kwargs):
+        """
+        Send a request within the host's limits.
+
+        Idempotent requests are retried on connection errors and retryable
+        statuses, with exponential backoff or the server's Retry-After,
+        as long as the wait fits in max_wait. Otherwise the last response
+        is returned as is.
+
+        Args:
+            method (str): HTTP method
+            url (str): URL
+            max_wait (float, optional): Longest wait for the rate limit or
+                a retry, defaults to the host policy's max_wait
+            **kwargs: Passed to requests.Session.request
+
+        Returns:
+            requests.Response: The response
+
+        Raises:
+            CircuitOpenError: If the host is down
+            RateLimitedError: If the host's rate limit is exhausted
+            requests.RequestException: If the request failed
+        """
+        state = self.host_state(url)
+        max_wait = state.policy.max_wait if max_wait is None else max_wait
+        kwargs.setdefault('timeout', self.timeout)
+        attempts = 1 + (self.max_retries if method.upper() in IDEMPOTENT_METHODS else 0)
+
+        for attempt in range(1, attempts + 1):
+            wait_time = state.before_request(max_wait)
+            if wait_time:
+                time.sleep(wait_time)
+
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                state.record_error(time.monotonic() - started)
+                backoff = 2 ** (attempt - 1) + random.uniform(0, 0.5)
+                if attempt == attempts or (max_wait is not None and backoff > max_wait):
+                    raise
+                state.record_retry()
+                logger.warning(f"Error fetching {url}: {e}. Retrying in {backoff:.1f} seconds...")
+                time.sleep(backoff)
+                continue
+
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            state.record_response(response.status_code, retry_after, time.monotonic() - started)
+
+            if response.status_code not in RETRY_STATUSES or attempt == attempts:
+                return response
+
+            # A Retry-After pauses the host's limiter, so the next
+            # before_request() waits for it
+            wait = retry_after if retry_after is not None else 2 ** (attempt - 1) + random.uniform(0, 0.5)
+            if max_wait is not None and wait > max_wait:
+                logger.warning(f"{url} returned {response.status_code}, not retrying as it asks for {wait:.1f}s")
+                return response
+            state.record_retry()
+            logger.warning(f"{url} returned {response.status_code}. Retrying in {wait:.1f} seconds...")
+            if retry_after is None:
+                time.sleep(wait)
+
+        return response
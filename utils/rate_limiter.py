@@ -0,0 +1,117 @@
+import time
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RateLimiter:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Tokens refill continuously at `rate` per second up to `capacity`.
+    Callers block in acquire() until a token is available. pause() stops
+    handing out tokens for a while, e.g. after the upstream returned 429.
+    """
+    def __init__(self, rate, capacity=None):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            rate (float): Tokens added per second
+            capacity (float, optional): Maximum burst size. Defaults to rate.
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        """Add the tokens accumulated since the last update."""
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+
+    def reserve(self, tokens=1, max_wait=None):
+        """
+        Take tokens from the bucket, going into debt if necessary.
+
+        Args:
+            tokens (float): Number of tokens to take
+            max_wait (float, optional): Give up, without taking the tokens,
+                if they would not be available within this many seconds
+
+        Returns:
+            float or None: Seconds the caller must wait before proceeding,
+                None if that would exceed max_wait
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            wait_time = max(0.0, self.paused_until - now)
+            if self.tokens < tokens and self.rate > 0:
+                wait_time = max(wait_time, (tokens - self.tokens) / self.rate)
+            if max_wait is not None and wait_time > max_wait:
+                return None
+
+            self.tokens -= tokens
+            return wait_time
+
+    def try_acquire(self, tokens=1):
+        """
+        Take tokens only if they are available right now.
+
+        Args:
+            tokens (float): Number of tokens to take
+
+        Returns:
+            bool: True if the tokens were taken
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.paused_until or self.tokens < tokens:
+                return False
+            self.tokens -= tokens
+            return True
+
+    def acquire(self, tokens=1, max_wait=None):
+        """
+        Block until tokens are available.
+
+        Args:
+            tokens (float): Number of tokens to take
+            max_wait (float, optional): Give up instead of waiting longer
+
+        Returns:
+            float or None: Seconds spent waiting, None if it gave up
+        """
+        wait_time = self.reserve(tokens, max_wait)
+        if wait_time:
+            time.sleep(wait_time)
+        return wait_time
+
+    def pause(self, seconds):
+        """
+        Stop handing out tokens for a number of seconds.
+
+        Args:
+            seconds (float): Length of the pause
+        """
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        logger.warning(f"Rate limiter paused for {seconds:.2f} seconds")
+
+    def set_rate(self, rate):
+        """
+        Change the refill rate.
+
+        Args:
+            rate (float): New tokens per second
+        """
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
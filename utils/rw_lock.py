@@ -0,0 +1,61 @@
+import threading
+from contextlib import contextmanager
+
+class ReadWriteLock:
+    """
+    Lock that lets many readers in at once but writers only alone.
+
+    Phase-fair: waiting writers block new readers, so a steady stream of
+    reads cannot starve a writer, and the readers already waiting when a
+    writer releases go before the next writer, so back-to-back writes
+    cannot starve readers either. Not reentrant.
+    """
+    def __init__(self):
+        """Initialize the lock."""
+        self.condition = threading.Condition(threading.Lock())
+        self.readers = 0
+        self.writer = False
+        self.waiting_readers = 0
+        self.waiting_writers = 0
+        # Set when a writer releases with readers waiting, until they are in
+        self.read_turn = False
+
+    @contextmanager
+    def read(self):
+        """Hold the lock shared for the duration of a with block."""
+        with self.condition:
+            self.waiting_readers += 1
+            try:
+                while self.writer or (self.waiting_writers and not self.read_turn):
+                    self.condition.wait()
+            finally:
+                self.waiting_readers -= 1
+                if not self.waiting_readers:
+                    self.read_turn = False
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.readers -= 1
+                if not self.readers:
+                    self.condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        """Hold the lock exclusively for the duration of a with block."""
+        with self.condition:
+            self.waiting_writers += 1
+            try:
+                while self.writer or self.readers or self.read_turn:
+                    self.condition.wait()
+            finally:
+                self.waiting_writers -= 1
+            self.writer = True
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.writer = False
+                self.read_turn = self.waiting_readers > 0
+                self.condition.notify_all()